@@ -0,0 +1,16 @@
+"""Benchmark — szűrő forward pass (MultiTFKalmanFilter.run) és states DataFrame."""
+
+from __future__ import annotations
+
+
+def test_filter_run(measure, dataset):
+    def setup():
+        return (dataset.make_filter(), dataset.returns)
+
+    arrays = measure(lambda kf, returns: kf.run(returns, progress_interval=0), setup=setup)
+    assert len(arrays) == dataset.rows
+
+
+def test_get_states_df(measure, dataset):
+    states_df = measure(dataset.kf.get_states_df, dataset.index)
+    assert len(states_df) == dataset.rows
@@ -0,0 +1,44 @@
+"""
+Benchmark — párhuzamos-időbeli szűrő, RTS simító és darabolt szűrés (kalman.parallel).
+
+A soros párjuk a bench_filter.py / bench_smoother.py-ban; a worker szám
+1 (helyben) és a CPU-k száma.
+"""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from kalman.parallel import rts_smooth_parallel, run_chunked, run_parallel
+
+WORKERS = sorted({1, os.cpu_count() or 1})
+
+
+@pytest.mark.parametrize("workers", WORKERS)
+def test_run_parallel(measure, dataset, workers):
+    def setup():
+        return (dataset.make_filter(), dataset.returns)
+
+    arrays = measure(lambda kf, returns: run_parallel(kf, returns, workers=workers), setup=setup)
+    assert len(arrays) == dataset.rows
+
+
+@pytest.mark.parametrize("workers", WORKERS)
+def test_rts_smooth_parallel(measure, dataset, workers):
+    smoothed = measure(rts_smooth_parallel, dataset.arrays, dataset.kf.F, workers)
+    assert len(smoothed.x) == dataset.rows
+
+
+@pytest.mark.parametrize("workers", WORKERS)
+def test_run_chunked(measure, dataset, workers):
+    def setup():
+        return (dataset.make_filter(), dataset.returns)
+
+    result = measure(
+        lambda kf, returns: run_chunked(kf, returns, n_chunks=max(workers, 4), workers=workers),
+        setup=setup,
+    )
+    assert len(result.arrays) == dataset.rows
+    assert result.max_deviation <= 1e-6
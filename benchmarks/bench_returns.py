@@ -0,0 +1,10 @@
+"""Benchmark — log hozamok (compute_log_returns) az 1m close-ból."""
+
+from __future__ import annotations
+
+from data.fetcher import compute_log_returns
+
+
+def test_compute_log_returns(measure, dataset):
+    returns = measure(compute_log_returns, dataset.df_1m, dataset.config)
+    assert set(returns) == set(dataset.config.timeframes)
@@ -0,0 +1,27 @@
+"""Benchmark — jelzések: predikciók, trend score, anomália flag-ek."""
+
+from __future__ import annotations
+
+from conftest import HORIZONS
+from signals import compute_anomaly_flags, compute_predictions, compute_trend_score
+
+
+def test_compute_predictions(measure, dataset):
+    predictions = measure(
+        compute_predictions, dataset.states_df, HORIZONS, dataset.config.kalman.h_mode,
+    )
+    assert sorted(predictions) == HORIZONS
+
+
+def test_compute_trend_score(measure, dataset):
+    trend = dataset.config.trend
+    trend_df = measure(
+        compute_trend_score, dataset.states_df,
+        trend.w_mu, trend.w_mu_dot, trend.w_mu_ddot, trend.rolling_window,
+    )
+    assert len(trend_df) == dataset.rows
+
+
+def test_compute_anomaly_flags(measure, dataset):
+    flags = measure(compute_anomaly_flags, dataset.states_df)
+    assert len(flags) == dataset.rows
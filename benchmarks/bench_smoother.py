@@ -0,0 +1,10 @@
+"""Benchmark — RTS simító (rts_smooth) a szűrt history-n."""
+
+from __future__ import annotations
+
+from kalman.smoother import rts_smooth
+
+
+def test_rts_smooth(measure, dataset):
+    smoothed = measure(rts_smooth, dataset.arrays, dataset.kf.F)
+    assert len(smoothed.x) == dataset.rows
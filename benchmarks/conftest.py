@@ -0,0 +1,183 @@
+"""
+pytest-benchmark közös fixture-ök — szintetikus GBM adatkészletek + csúcsmemória.
+
+Az adatkészlet (sorok × TF-készlet) session szintű, paraméterezett
+fixture: a pytest az azonos adatkészletű méréseket egymás után futtatja,
+így egyszerre csak egy készlet (és a szűrt history-ja) van memóriában.
+
+Minden mérés előtt egy külön, tracemalloc alatti futás adja a csúcsmemóriát
+(`extra_info["peak_mem_mb"]` a JSON-ban) — ez egyben a numba JIT bemelegítés.
+`--mem-baseline` egy korábbi `--benchmark-json` kimenettel összeveti, és
+`--mem-tolerance`-nél nagyobb növekedésre a mérés elbukik.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import pandas as pd
+import pytest
+
+# ── Projekt root a path-ra ───────────────────────────────────────────────────
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import Config
+from data.fetcher import compute_log_returns, estimate_sigma2_1m
+from data.returns import SparseReturns
+from data.synthetic import make_gbm_ohlcv
+from kalman.filter import KalmanArrays, MultiTFKalmanFilter
+
+ROWS = (10_000, 100_000, 1_000_000)
+
+TIMEFRAME_SETS: dict[int, list[str]] = {
+    3: ["1m", "15m", "1h"],
+    6: ["1m", "5m", "15m", "1h", "4h", "1d"],
+    10: ["1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "12h", "1d"],
+}
+
+HORIZONS = [5, 15, 60]
+
+# Ismétlések száma ~ 300k lépés / mérés (legalább 3, legfeljebb 30)
+_STEPS_PER_BENCH = 300_000
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("kalman-bench", "Multi-TF Kalman benchmarkok")
+    group.addoption("--bench-rows", default=",".join(map(str, ROWS)),
+                    help="1m sorok száma, vesszővel elválasztva (alap: 10000,100000,1000000)")
+    group.addoption("--bench-tfs", default=",".join(map(str, TIMEFRAME_SETS)),
+                    help=f"TF-készletek (TF-ek száma) a {sorted(TIMEFRAME_SETS)} közül")
+    group.addoption("--mem-baseline", default=None,
+                    help="Korábbi --benchmark-json fájl a csúcsmemória összevetéshez")
+    group.addoption("--mem-tolerance", type=float, default=0.10,
+                    help="Megengedett csúcsmemória növekedés (arány, alap: 0.10)")
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def pytest_generate_tests(metafunc):
+    if "dataset" not in metafunc.fixturenames:
+        return
+    rows = _int_list(metafunc.config.getoption("--bench-rows"))
+    tfs = _int_list(metafunc.config.getoption("--bench-tfs"))
+    unknown = set(tfs) - set(TIMEFRAME_SETS)
+    if unknown:
+        raise pytest.UsageError(f"Ismeretlen TF-készlet: {sorted(unknown)} ({sorted(TIMEFRAME_SETS)})")
+    specs = [(n, k) for n in rows for k in tfs]
+    metafunc.parametrize(
+        "dataset", specs, indirect=True, scope="session",
+        ids=[f"{n // 1000}k-{k}tf" for n, k in specs],
+    )
+
+
+# ── Adatkészlet ──────────────────────────────────────────────────────────────
+
+
+@dataclass
+class Dataset:
+    """Egy szintetikus futás bemenetei és (a downstream mérésekhez) kimenetei."""
+
+    rows: int
+    config: Config
+    df_1m: pd.DataFrame
+    returns: SparseReturns
+    sigma2_1m: float
+    kf: MultiTFKalmanFilter          # lefuttatva
+    arrays: KalmanArrays
+    states_df: pd.DataFrame
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return self.returns.index
+
+    @property
+    def rounds(self) -> int:
+        return max(3, min(30, _STEPS_PER_BENCH // self.rows))
+
+    def make_filter(self) -> MultiTFKalmanFilter:
+        k = self.config.kalman
+        return MultiTFKalmanFilter(
+            self.config.tf_minutes, k.q, self.sigma2_1m,
+            h_mode=k.h_mode, r_mode=k.r_mode, P0_scale=k.P0_scale, backend=k.backend,
+        )
+
+
+@pytest.fixture(scope="session")
+def dataset(request) -> Dataset:
+    rows, n_tfs = request.param
+    config = Config(timeframes=TIMEFRAME_SETS[n_tfs])
+    df_1m = make_gbm_ohlcv(rows, seed=rows + n_tfs)
+    returns = compute_log_returns(df_1m, config)
+    sigma2_1m = estimate_sigma2_1m(returns["1m"])
+    ds = Dataset(rows, config, df_1m, returns, sigma2_1m, None, None, None)
+    ds.kf = ds.make_filter()
+    ds.arrays = ds.kf.run(returns, progress_interval=0)
+    ds.states_df = ds.arrays.to_states_df(ds.index)
+    return ds
+
+
+# ── Mérés + csúcsmemória ─────────────────────────────────────────────────────
+
+
+@lru_cache(maxsize=None)
+def _load_mem_baseline(path: str) -> dict[str, float]:
+    """{fullname: peak_mem_mb} egy pytest-benchmark JSON-ból."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        b["fullname"]: b["extra_info"]["peak_mem_mb"]
+        for b in data.get("benchmarks", [])
+        if "peak_mem_mb" in b.get("extra_info", {})
+    }
+
+
+def peak_memory_mb(fn: Callable, args: tuple = (), kwargs: Optional[dict] = None) -> float:
+    """Egy hívás csúcs memóriafoglalása (tracemalloc, MB) — a bemenetek nélkül."""
+    tracemalloc.start()
+    try:
+        fn(*args, **(kwargs or {}))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+@pytest.fixture
+def measure(benchmark, request, dataset) -> Callable[..., Any]:
+    """
+    measure(fn, *args, setup=None) — csúcsmemória, majd időmérés.
+
+    `setup` (opcionális) minden ismétlés előtt friss argumentumokat ad
+    (pl. új szűrő példány), és nem számít bele sem az időbe, sem a memóriába.
+    """
+    def run(fn: Callable, *args: Any, setup: Optional[Callable[[], tuple]] = None) -> Any:
+        make_args = (lambda: (args, {})) if setup is None else (lambda: (setup(), {}))
+        peak = peak_memory_mb(fn, *make_args())
+        benchmark.extra_info.update(
+            rows=dataset.rows,
+            n_timeframes=len(dataset.config.timeframes),
+            peak_mem_mb=round(peak, 3),
+        )
+        result = benchmark.pedantic(fn, setup=make_args, rounds=dataset.rounds, iterations=1)
+
+        baseline_path = request.config.getoption("--mem-baseline")
+        if baseline_path:
+            base = _load_mem_baseline(baseline_path).get(request.node.nodeid)
+            tol = request.config.getoption("--mem-tolerance")
+            if base is not None and peak > base * (1.0 + tol):
+                pytest.fail(
+                    f"Csúcsmemória regresszió: {peak:.1f} MB > {base:.1f} MB × {1 + tol:.2f}"
+                )
+        return result
+
+    return run
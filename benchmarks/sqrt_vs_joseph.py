@@ -0,0 +1,170 @@
+"""
+Benchmark — sqrt (faktor) vs Joseph kovariancia forma hosszú futáson.
+
+Szintetikus GBM 1m adaton mindkét formával lefuttatja a NumPy batch utat
+(`run_matrix`), és összeveti:
+
+    - sebesség (mp, µs / lépés)
+    - P egészség: legkisebb sajátérték, max |P − Pᵀ|
+    - a két forma eltérése (x, P relatív max)
+    - pontosság egy nagy pontosságú (mpmath) referenciához képest az első
+      `--ref-steps` lépésen — ha az mpmath telepítve van
+
+Használat:
+    python benchmarks/sqrt_vs_joseph.py
+    python benchmarks/sqrt_vs_joseph.py --steps 500000 --q 1e-10 --p0 1e4
+    python benchmarks/sqrt_vs_joseph.py --ref-steps 0          # referencia nélkül
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# ── Projekt root a path-ra ───────────────────────────────────────────────────
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import Config
+from data.fetcher import compute_log_returns, estimate_sigma2_1m
+from data.synthetic import make_gbm_ohlcv
+from kalman.filter import COVARIANCE_FORMS, KalmanArrays, MultiTFKalmanFilter, returns_to_matrix
+
+try:
+    import mpmath
+    HAVE_MPMATH = True
+except ImportError:          # opcionális: csak a referencia futáshoz
+    HAVE_MPMATH = False
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    datefmt="%H:%M:%S",
+)
+logger = logging.getLogger("bench_sqrt")
+
+
+def reference_run(
+    kf: MultiTFKalmanFilter,
+    Z: np.ndarray,
+    active: np.ndarray,
+    n_steps: int,
+    every: int,
+    dps: int = 40,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Tankönyvi (Joseph) szűrő mpmath-tal, `dps` jegyre, regularizáció nélkül.
+
+    Returns:
+        (lépés indexek, x [M x 3], P [M x 3 x 3]) minden `every`. lépésre
+    """
+    mpmath.mp.dps = dps
+    M = lambda a: mpmath.matrix(np.asarray(a).tolist())   # noqa: E731
+    F, Q = M(kf.F), M(kf.Q)
+    x, P = M(kf.x), M(kf.P)
+    I3 = mpmath.eye(3)
+    steps, xs, Ps = [], [], []
+    for t in range(n_steps):
+        x_pred = F * x
+        P_pred = F * P * F.T + Q
+        cols = np.flatnonzero(active[t]).tolist()
+        if cols:
+            pattern = kf.patterns.get(kf.patterns.mask_of([kf.all_tf_values[j] for j in cols]))
+            H, R = M(pattern.H), M(pattern.R)
+            S = H * P_pred * H.T + R
+            K = P_pred * H.T * mpmath.inverse(S)
+            x = x_pred + K * (M(Z[t, cols].reshape(-1, 1)) - H * x_pred)
+            IKH = I3 - K * H
+            P = IKH * P_pred * IKH.T + K * R * K.T
+        else:
+            x, P = x_pred, P_pred
+        if t % every == 0 or t == n_steps - 1:
+            steps.append(t)
+            xs.append(np.array(x.tolist(), dtype=float).ravel())
+            Ps.append(np.array(P.tolist(), dtype=float))
+    return np.array(steps), np.array(xs), np.array(Ps)
+
+
+def rel_err(a: np.ndarray, ref: np.ndarray) -> float:
+    """Lépésenkénti relatív max hiba maximuma (a lépés saját skálájához mérve)."""
+    axes = tuple(range(1, a.ndim))
+    scale = np.abs(ref).max(axis=axes)
+    ok = scale > 0
+    return float((np.abs(a - ref).max(axis=axes)[ok] / scale[ok]).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sqrt vs Joseph kovariancia forma benchmark")
+    parser.add_argument("--config", default="config.yaml", help="Config YAML (timeframes, h/r mód)")
+    parser.add_argument("--steps", type=int, default=200_000, help="Lépések száma (1m gyertya)")
+    parser.add_argument("--q", type=float, default=1e-10, help="Folyamatzaj")
+    parser.add_argument("--p0", type=float, default=1e4, help="P0_scale")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ref-steps", type=int, default=20_000,
+                        help="mpmath referencia hossza (0 = kihagyás)")
+    parser.add_argument("--ref-every", type=int, default=50,
+                        help="Referencia összevetés lépésköze")
+    args = parser.parse_args()
+
+    config = Config.from_yaml(PROJECT_ROOT / args.config)
+    df = make_gbm_ohlcv(args.steps, seed=args.seed)
+    returns = compute_log_returns(df, config)
+    sigma2_1m = estimate_sigma2_1m(returns["1m"])
+    Z, _ = returns_to_matrix(returns, config.tf_minutes)
+    logger.info(
+        f"{len(Z)} lépés, TF-ek: {config.timeframes}, q={args.q:.0e}, "
+        f"P0_scale={args.p0:.0e}, σ²_1m={sigma2_1m:.2e}"
+    )
+
+    def make_filter(form: str) -> MultiTFKalmanFilter:
+        return MultiTFKalmanFilter(
+            config.tf_minutes, args.q, sigma2_1m,
+            h_mode=config.kalman.h_mode, r_mode=config.kalman.r_mode,
+            P0_scale=args.p0, backend="numpy", covariance_form=form,
+        )
+
+    results: dict[str, KalmanArrays] = {}
+    for form in COVARIANCE_FORMS:
+        kf = make_filter(form)
+        t0 = time.perf_counter()
+        arrays = kf.run_matrix(Z, progress_interval=0)
+        elapsed = time.perf_counter() - t0
+        results[form] = arrays
+        eig_min = np.linalg.eigvalsh(arrays.P).min()
+        asym = np.abs(arrays.P - arrays.P.transpose(0, 2, 1)).max()
+        logger.info(
+            f"{form:>7}: {elapsed:7.2f} mp  {elapsed / len(Z) * 1e6:6.1f} µs/lépés  "
+            f"min eig(P)={eig_min:.2e}  max|P−Pᵀ|={asym:.1e}"
+        )
+
+    joseph, sqrt = results["joseph"], results["sqrt"]
+    logger.info(
+        f"Eltérés sqrt vs joseph: x {rel_err(sqrt.x, joseph.x):.1e}  "
+        f"P {rel_err(sqrt.P, joseph.P):.1e}"
+    )
+
+    n_ref = min(args.ref_steps, len(Z))
+    if n_ref <= 0:
+        return
+    if not HAVE_MPMATH:
+        logger.warning("mpmath nincs telepítve → referencia összevetés kihagyva")
+        return
+    logger.info(f"mpmath referencia: {n_ref} lépés ({args.ref_every} lépésenként)...")
+    steps, x_ref, P_ref = reference_run(
+        make_filter("joseph"), Z, joseph.active, n_ref, args.ref_every,
+    )
+    for form, arrays in results.items():
+        logger.info(
+            f"{form:>7} vs referencia: x {rel_err(arrays.x[steps], x_ref):.1e}  "
+            f"P {rel_err(arrays.P[steps], P_ref):.1e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ import re
 from pathlib import Path
 from typing import Literal, Optional
 
+import numpy as np
 import yaml
 from pydantic import BaseModel, field_validator
 
@@ -33,12 +34,25 @@ def tf_to_millis(tf: str) -> int:
     return tf_to_minutes(tf) * 60_000
 
 
+def epoch_minutes(index) -> np.ndarray:
+    """
+    Időbélyegek (DatetimeIndex, tz-vel vagy anélkül) → int64 UTC epoch percek.
+
+    A TF határok ebből adódnak (perc % n == 0), így a kiesett gyertyák nem
+    tolják el a nagyobb TF-ek fázisát.
+    """
+    return np.asarray(index, dtype="datetime64[m]").astype(np.int64)
+
+
 # ── Nested config modellek ───────────────────────────────────────────────────
 
 
 class DataConfig(BaseModel):
     days_back: int = 7
     cache_dir: str = "data/cache"
+    columns: Optional[list[str]] = None   # betöltött OHLCV oszlopok (None = mind)
+    mmap_close: bool = False              # close oszlop memory-mapped Arrow IPC-ből
+    download_workers: int = 8             # párhuzamos letöltő szálak
 
 
 class KalmanConfig(BaseModel):
@@ -47,6 +61,12 @@ class KalmanConfig(BaseModel):
     h_mode: Literal["continuous", "discrete"] = "discrete"
     r_mode: Literal["full", "diagonal"] = "full"
     P0_scale: float = 100.0
+    steady_state: bool = False        # periodikus gain befagyasztás konvergencia után
+    steady_state_tol: float = 1e-9
+    backend: Literal["auto", "numpy", "numba"] = "auto"   # auto = numba, ha telepítve
+    update_mode: Literal["joint", "sequential"] = "joint"  # sequential = fehérített skalár update
+    covariance_form: Literal["joseph", "sqrt"] = "joseph"  # sqrt = P = L Lᵀ faktor propagálás
+    init: Literal["diffuse", "riccati"] = "diffuse"        # riccati = periodikus steady-state P0, burn-in nélkül
 
 
 class TrendConfig(BaseModel):
@@ -69,6 +89,7 @@ class VisualizationConfig(BaseModel):
 
 class Config(BaseModel):
     symbol: str = "BTC/USDT"
+    symbols: Optional[list[str]] = None    # multi-symbol univerzum (None = [symbol])
     exchange: str = "binance"
     timeframes: list[str] = ["1m", "5m", "15m", "1h", "4h", "1d"]
 
@@ -87,11 +108,23 @@ class Config(BaseModel):
             raise ValueError(f"Duplikált timeframe: {v}")
         return v
 
+    @field_validator("symbols")
+    @classmethod
+    def validate_symbols(cls, v: Optional[list[str]]) -> Optional[list[str]]:
+        if v is not None and len(set(v)) != len(v):
+            raise ValueError(f"Duplikált szimbólum: {v}")
+        return v
+
     @property
     def tf_minutes(self) -> dict[str, int]:
         """{'1m': 1, '5m': 5, ...}"""
         return {tf: tf_to_minutes(tf) for tf in self.timeframes}
 
+    @property
+    def universe(self) -> list[str]:
+        """A szűrendő szimbólumok: `symbols`, vagy ha nincs megadva, [symbol]."""
+        return list(self.symbols) if self.symbols else [self.symbol]
+
     @property
     def base_tf(self) -> str:
         return self.timeframes[0]
@@ -0,0 +1,234 @@
+"""
+Párhuzamos OHLCV letöltő — ablakokra bontás + közös token-bucket rate limit.
+
+A [since, until] tartományt független ablakokra bontjuk, az ablakokat egy
+thread pool párhuzamosan lapozza végig, minden REST hívás előtt egy közös
+token-bucketből vesz tokent (a tőzsdei rateLimit betartására). Az
+eredményt összefésüljük és deduplikáljuk.
+
+Az exchange lehet ccxt exchange id (szálanként saját példány) vagy egy
+kész objektum `fetch_ohlcv(symbol, timeframe, since, limit)` metódussal
+(pl. data.synthetic.SyntheticExchange offline futtatáshoz).
+
+Használat:
+    df = fetch_ohlcv_concurrent("binance", "BTC/USDT", "1m", since_ms, until_ms)
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import ccxt
+import pandas as pd
+
+from config import tf_to_millis
+
+logger = logging.getLogger(__name__)
+
+Interval = tuple[int, int]
+
+OHLCV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+class TokenBucket:
+    """
+    Szálbiztos token-bucket rate limiter.
+
+    rate: tokenek / mp (tartós kérési ráta), capacity: max. löket.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError(f"A rate pozitív kell legyen: {rate}")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Blokkol, amíg `tokens` token elérhető."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                # Tolerancia: a lebegőpontos feltöltés 0.999…-nél megállhat, a
+                # ~1e-17 mp-es várakozás pedig nem lépteti az órát (livelock)
+                if self._tokens >= tokens - 1e-9:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+def split_windows(
+    since_ms: int,
+    until_ms: int,
+    tf_ms: int,
+    window_candles: int,
+) -> list[Interval]:
+    """[since, until] felosztása legfeljebb `window_candles` gyertyás zárt ablakokra."""
+    span = window_candles * tf_ms
+    windows = []
+    start = since_ms
+    while start <= until_ms:
+        end = min(start + span - tf_ms, until_ms)
+        windows.append((start, end))
+        start = end + tf_ms
+    return windows
+
+
+def rows_to_df(rows: list[list], since_ms: int, until_ms: int) -> pd.DataFrame:
+    """Nyers ccxt sorok → deduplikált, rendezett, [since, until]-ra vágott DataFrame."""
+    df = pd.DataFrame(rows, columns=OHLCV_COLUMNS)
+    df = df.drop_duplicates(subset=["timestamp"], keep="last")
+    df = df.sort_values("timestamp")
+    df = df[(df["timestamp"] >= since_ms) & (df["timestamp"] <= until_ms)].copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms", utc=True)
+    df = df.set_index("timestamp")
+    return df
+
+
+def _fetch_window(
+    get_exchange: Callable[[], Any],
+    bucket: TokenBucket,
+    symbol: str,
+    timeframe: str,
+    window: Interval,
+    limit: int,
+) -> list[list]:
+    """Egy ablak végiglapozása (ablakon belül szekvenciális)."""
+    exchange = get_exchange()
+    tf_ms = tf_to_millis(timeframe)
+    since_ms, until_ms = window
+    rows: list[list] = []
+    cursor = since_ms
+    while cursor <= until_ms:
+        bucket.acquire()
+        batch = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=cursor, limit=limit)
+        if not batch:
+            break
+        rows.extend(batch)
+        last_ts = int(batch[-1][0])
+        cursor = max(last_ts + tf_ms, cursor + tf_ms)
+        if len(batch) < limit or last_ts >= until_ms:
+            break
+    return rows
+
+
+def download_ranges(
+    exchange: str | Any,
+    symbol: str,
+    timeframe: str,
+    ranges: list[Interval],
+    limit: int = 1000,
+    max_workers: int = 8,
+    pages_per_window: int = 4,
+    rate_per_sec: Optional[float] = None,
+    bucket: Optional[TokenBucket] = None,
+) -> pd.DataFrame:
+    """
+    Több tartomány párhuzamos letöltése közös rate limittel.
+
+    Args:
+        exchange: ccxt exchange id vagy kész exchange objektum
+        ranges: zárt [since_ms, until_ms] tartományok
+        limit: gyertya / REST hívás
+        max_workers: párhuzamos szálak
+        pages_per_window: lapok (hívások) száma egy ablakban
+        rate_per_sec: kérés / mp (None = az exchange rateLimit-jéből)
+        bucket: kívülről adott (pl. több szimbólum letöltése között megosztott)
+                rate limiter; ilyenkor a rate_per_sec figyelmen kívül marad
+
+    Returns:
+        összefésült, deduplikált DataFrame (üres, ha nem jött adat)
+    """
+    local = threading.local()
+    if isinstance(exchange, str):
+        exchange_class = getattr(ccxt, exchange, None)
+        if exchange_class is None:
+            raise ValueError(f"Ismeretlen exchange: {exchange}")
+        # A ccxt beépített throttle-je nem szálbiztos → a token-bucket szabályoz
+        rate_limit_ms = exchange_class().rateLimit
+        instances: list = []
+
+        def get_exchange():
+            if not hasattr(local, "exchange"):
+                local.exchange = exchange_class({"enableRateLimit": False})
+                instances.append(local.exchange)
+            return local.exchange
+    else:
+        rate_limit_ms = getattr(exchange, "rateLimit", 50)
+        instances = []
+
+        def get_exchange():
+            return exchange
+
+    if bucket is None:
+        if rate_per_sec is None:
+            rate_per_sec = 1000.0 / max(rate_limit_ms, 1)
+        bucket = TokenBucket(rate_per_sec, capacity=max_workers)
+
+    tf_ms = tf_to_millis(timeframe)
+    windows = [
+        w for since_ms, until_ms in ranges
+        for w in split_windows(since_ms, until_ms, tf_ms, limit * pages_per_window)
+    ]
+    if not windows:
+        return rows_to_df([], 0, 0)
+
+    logger.info(f"  Párhuzamos letöltés: {len(windows)} ablak, {max_workers} szál, "
+                f"{rate_per_sec:.1f} kérés/s")
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(
+                lambda w: _fetch_window(get_exchange, bucket, symbol, timeframe, w, limit),
+                windows,
+            )
+            rows = [row for window_rows in results for row in window_rows]
+    finally:
+        for inst in instances:
+            if hasattr(inst, "close"):
+                inst.close()
+
+    lo = min(a for a, _ in ranges)
+    hi = max(b for _, b in ranges)
+    df = rows_to_df(rows, lo, hi)
+    # Csak a kért tartományokba eső sorok (ablakok közti résekből ne szivárogjon)
+    ts = df.index.as_unit("ms").asi8
+    inside = pd.Series(False, index=df.index)
+    for since_ms, until_ms in ranges:
+        inside |= (ts >= since_ms) & (ts <= until_ms)
+    return df[inside.to_numpy()]
+
+
+def fetch_ohlcv_concurrent(
+    exchange: str | Any,
+    symbol: str,
+    timeframe: str,
+    since_ms: int,
+    until_ms: int,
+    limit: int = 1000,
+    max_workers: int = 8,
+    pages_per_window: int = 4,
+    rate_per_sec: Optional[float] = None,
+) -> pd.DataFrame:
+    """Egyetlen [since, until] tartomány párhuzamos letöltése (lásd download_ranges)."""
+    return download_ranges(
+        exchange, symbol, timeframe, [(since_ms, until_ms)],
+        limit=limit, max_workers=max_workers,
+        pages_per_window=pages_per_window, rate_per_sec=rate_per_sec,
+    )
@@ -1,23 +1,28 @@
 """
-Adat letöltés — Binance OHLCV (ccxt) + parquet cache + log return számítás.
+Adat letöltés — Binance OHLCV (ccxt) + inkrementális parquet tároló + log return számítás.
 
 Használat:
     config = Config.from_yaml()
     df_1m = fetch_or_load(config)
-    returns = compute_log_returns(df_1m, config)
+    returns = compute_log_returns(df_1m, config)     # SparseReturns
+
+    symbols, index, Z = load_universe_returns(config)    # [S x N x k]
 """
 
 from __future__ import annotations
 
 import logging
 import time
-from pathlib import Path
+from typing import Optional
 
-import ccxt
 import numpy as np
 import pandas as pd
 
-from config import Config, tf_to_minutes
+from config import Config, epoch_minutes
+from data.downloader import TokenBucket, download_ranges, fetch_ohlcv_concurrent
+from data.returns import SparseReturns
+from data.store import OHLCVStore
+from profiling import profiled
 
 logger = logging.getLogger(__name__)
 
@@ -29,118 +34,176 @@ def fetch_ohlcv(
     since_ms: int,
     until_ms: int,
     limit: int = 1000,
+    max_workers: int = 8,
 ) -> pd.DataFrame:
-    """Paginált OHLCV letöltés ccxt-vel."""
-    exchange_class = getattr(ccxt, exchange_id, None)
-    if exchange_class is None:
-        raise ValueError(f"Ismeretlen exchange: {exchange_id}")
-
-    exchange = exchange_class({"enableRateLimit": True})
-    tf_ms = tf_to_minutes(timeframe) * 60_000
-
-    rows: list[list] = []
-    cursor = since_ms
-
-    try:
-        while cursor <= until_ms:
-            batch = exchange.fetch_ohlcv(
-                symbol, timeframe=timeframe, since=cursor, limit=limit,
-            )
-            if not batch:
-                break
-
-            rows.extend(batch)
-            last_ts = int(batch[-1][0])
-            next_cursor = last_ts + tf_ms
-
-            if next_cursor <= cursor:
-                next_cursor = cursor + tf_ms
-            cursor = next_cursor
-
-            if len(batch) < limit:
-                break
-
-            time.sleep(exchange.rateLimit / 1000.0)
-            logger.info(f"  Letöltve: {len(rows)} sor eddig...")
-    finally:
-        if hasattr(exchange, "close"):
-            exchange.close()
-
-    if not rows:
+    """Egy [since, until] tartomány letöltése (a párhuzamos letöltőre épül)."""
+    df = fetch_ohlcv_concurrent(
+        exchange_id, symbol, timeframe, since_ms, until_ms,
+        limit=limit, max_workers=max_workers,
+    )
+    if df.empty:
         raise RuntimeError("Nem érkezett OHLCV adat.")
-
-    df = pd.DataFrame(rows, columns=["timestamp", "open", "high", "low", "close", "volume"])
-    df = df.drop_duplicates(subset=["timestamp"], keep="last")
-    df = df.sort_values("timestamp")
-    df = df[(df["timestamp"] >= since_ms) & (df["timestamp"] <= until_ms)].copy()
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms", utc=True)
-    df = df.set_index("timestamp")
     return df
 
 
-def fetch_or_load(config: Config) -> pd.DataFrame:
-    """1m OHLCV adat: cache-ből betölti vagy letölti."""
-    cache_dir = Path(config.data.cache_dir)
-    cache_dir.mkdir(parents=True, exist_ok=True)
+@profiled("data.fetch_or_load")
+def fetch_or_load(config: Config, bucket: Optional[TokenBucket] = None) -> pd.DataFrame:
+    """
+    1m OHLCV adat az inkrementális tárolóból.
 
-    now_ms = int(time.time() * 1000)
-    since_ms = now_ms - config.data.days_back * 24 * 3600 * 1000
+    Csak a hiányzó (fej / farok / rés) tartományokat tölti le — ablakokra
+    bontva, `download_workers` szálon párhuzamosan, közös rate limittel —,
+    a kért `days_back` ablakot a tárolóból szeletelve adja vissza. A még nyitott
+    (le nem zárt) utolsó gyertyát nem kéri le, így a farok lefedettsége
+    mindig lezárt gyertyákra vonatkozik.
 
-    safe_symbol = config.symbol.replace("/", "")
-    cache_file = cache_dir / f"{safe_symbol}_1m_{config.data.days_back}d.parquet"
-
-    if cache_file.exists():
-        logger.info(f"Cache betöltés: {cache_file}")
-        df = pd.read_parquet(cache_file)
-        # Ellenőrzés: elég friss-e (max 2 óra régi)
-        if len(df) > 0:
-            last_ts = df.index[-1].timestamp() * 1000
-            age_hours = (now_ms - last_ts) / 3_600_000
-            if age_hours < 2:
-                logger.info(f"  Cache friss ({age_hours:.1f}h régi), {len(df)} sor")
-                return df
-            logger.info(f"  Cache elavult ({age_hours:.1f}h régi), újratöltés...")
-
-    logger.info(f"Letöltés: {config.symbol} 1m, {config.data.days_back} nap...")
-    df = fetch_ohlcv(
-        exchange_id=config.exchange,
-        symbol=config.symbol,
-        timeframe="1m",
-        since_ms=since_ms,
-        until_ms=now_ms,
-    )
-    logger.info(f"  Letöltve: {len(df)} sor")
+    A `bucket` több egyidejű letöltés (szimbólum) közös rate limitere lehet.
 
-    df.to_parquet(cache_file)
-    logger.info(f"  Cache mentve: {cache_file}")
+    Raises:
+        RuntimeError: ha a kért ablakra sem a tárolóban, sem letöltve nincs adat
+    """
+    store = OHLCVStore(config.data.cache_dir, config.symbol, "1m")
+
+    now_ms = int(time.time() * 1000)
+    since_ms = now_ms - config.data.days_back * 24 * 3600 * 1000
+    last_closed_ms = now_ms // store.tf_ms * store.tf_ms - store.tf_ms
+
+    gaps = store.missing(since_ms, last_closed_ms)
+    if gaps:
+        n_missing = sum((b - a) // store.tf_ms + 1 for a, b in gaps)
+        logger.info(f"Letöltés: {config.symbol} 1m, {len(gaps)} hiányzó tartomány "
+                    f"(~{n_missing} gyertya)...")
+    else:
+        logger.info(f"Tároló teljes: {store.root}")
+
+    if gaps:
+        df_new = download_ranges(
+            config.exchange,
+            config.symbol,
+            "1m",
+            gaps,
+            max_workers=config.data.download_workers,
+            bucket=bucket,
+        )
+        for start_ms, end_ms in gaps:
+            # Üres tartomány (pl. tőzsdei kiesés) is lefedettnek jelölődik
+            lo = pd.Timestamp(start_ms, unit="ms", tz="UTC")
+            hi = pd.Timestamp(end_ms, unit="ms", tz="UTC")
+            store.append(df_new.loc[lo:hi], start_ms, end_ms)
+        logger.info(f"  Letöltve: {len(df_new)} sor")
+
+    if config.data.mmap_close:
+        # Csak a close oszlop, memory-mapped Arrow IPC-ből (zero-copy)
+        df = store.read_close(since_ms, now_ms).to_frame()
+    else:
+        df = store.read(since_ms, now_ms, columns=config.data.columns)
+    if df.empty:
+        raise RuntimeError("Nem érkezett OHLCV adat.")
+    logger.info(f"  Tárolóból: {len(df)} sor ({store.root})")
     return df
 
 
-def compute_log_returns(df_1m: pd.DataFrame, config: Config) -> dict[str, pd.Series]:
+@profiled("data.compute_log_returns")
+def compute_log_returns(df_1m: pd.DataFrame, config: Config) -> SparseReturns:
     """
-    1m close-ból log hozamok minden konfigurált TF-re.
+    1m close-ból log hozamok minden konfigurált TF-re, ritka formában.
+
+    Időbélyeg alapú: az n perces TF a t percben ad mérést, ha t epoch perc
+    % n == 0 és a t − n perces gyertya is megvan. Kiesett gyertyák (rések)
+    így csak az őket átfedő hozamokat ejtik ki, a többi TF fázisát nem
+    tolják el; az index nem töltődik sűrű rácsra. A nem véges (pl.
+    univerzum igazításnál NaN close-ú) hozamok kimaradnak.
 
     Returns:
-        dict: {'1m': Series, '5m': Series, ...}
-        Minden Series az 1m index-szel, NaN ahol a TF mérés nem elérhető.
+        SparseReturns: TF-enként a mérések (sor pozíció, érték) tömbjei és
+        egy [N] ütemezési bitmaszk; `returns["5m"]` a kompakt Series.
     """
-    log_price = np.log(df_1m["close"])
-    returns: dict[str, pd.Series] = {}
-
-    for tf_label, n_min in config.tf_minutes.items():
-        # Log hozam: log(P_t) - log(P_{t - n_min})
-        ret = log_price - log_price.shift(n_min)
-        # Csak ott legyen érték, ahol a TF ténylegesen frissül
-        # (percindex mod n_min == 0)
-        mask = pd.Series(range(len(ret)), index=ret.index) % n_min != 0
-        ret = ret.copy()
-        ret.loc[mask] = np.nan
-        returns[tf_label] = ret
-
-    return returns
+    log_price = np.log(df_1m["close"].to_numpy(dtype=float))
+    minutes = epoch_minutes(df_1m.index)
+    labels = sorted(config.tf_minutes, key=config.tf_minutes.get)
+    rows: dict[str, np.ndarray] = {}
+    data: dict[str, np.ndarray] = {}
+    # A legkisebb elég széles bitmaszk típus (≤ 8 TF → uint8)
+    mask = np.zeros(len(minutes), dtype=np.min_scalar_type(1 << max(len(labels) - 1, 0)))
+
+    for bit, tf_label in enumerate(labels):
+        n_min = config.tf_minutes[tf_label]
+        # Csak ott van mérés, ahol a TF ténylegesen frissül (epoch perc % n_min == 0)
+        cand = np.flatnonzero(minutes % n_min == 0)
+        # Log hozam: log(P_t) - log(P_{t - n_min}), a t - n_min perc sorát keresve
+        prev_min = minutes[cand] - n_min
+        pos = np.searchsorted(minutes, prev_min)
+        found = pos < len(minutes)
+        found[found] = minutes[pos[found]] == prev_min[found]
+        ret = log_price[cand[found]] - log_price[pos[found]]
+        keep = np.isfinite(ret)
+        rows[tf_label] = cand[found][keep]
+        data[tf_label] = ret[keep]
+        mask[rows[tf_label]] |= mask.dtype.type(1 << bit)
+
+    return SparseReturns(
+        index=df_1m.index,
+        minutes=minutes,
+        tf_minutes={label: config.tf_minutes[label] for label in labels},
+        rows=rows,
+        data=data,
+        mask=mask,
+    )
 
 
 def estimate_sigma2_1m(returns_1m: pd.Series) -> float:
     """1 perces log hozam varianciájának becslése."""
     clean = returns_1m.dropna()
     return float(clean.var())
+
+
+# ── Multi-symbol univerzum ───────────────────────────────────────────────────
+
+
+def load_universe_returns(
+    config: Config,
+    symbols: Optional[list[str]] = None,
+) -> tuple[list[str], pd.DatetimeIndex, np.ndarray]:
+    """
+    Több szimbólum 1m adata közös indexre igazítva → [S x N x k] mérés tenzor.
+
+    Szimbólumonként `fetch_or_load` (ugyanazzal a data configgal); a közös
+    index az összes 1m index uniója, a hiányzó gyertya NaN close, így az
+    azt átfedő TF hozamok is NaN-ok (a szűrő ott nem frissít). Adat nélküli
+    szimbólum figyelmeztetéssel kimarad.
+
+    Args:
+        symbols: felülírja a `config.universe` listát
+
+    Returns:
+        (szimbólumok, közös index, Z [S x N x k] TF percek szerinti oszlopokkal)
+    """
+    symbols = config.universe if symbols is None else list(symbols)
+    closes: dict[str, pd.Series] = {}
+    for symbol in symbols:
+        try:
+            df = fetch_or_load(config.model_copy(update={"symbol": symbol}))
+        except RuntimeError:
+            logger.warning(f"{symbol}: nincs adat, kimarad")
+            continue
+        closes[symbol] = df["close"]
+    if not closes:
+        raise ValueError(f"Egyik szimbólumhoz sincs adat: {symbols}")
+
+    index = closes[next(iter(closes))].index
+    for close in closes.values():
+        index = index.union(close.index)
+
+    labels = sorted(config.tf_minutes, key=lambda t: config.tf_minutes[t])
+    Z = np.empty((len(closes), len(index), len(labels)))
+    for s, close in enumerate(closes.values()):
+        returns = compute_log_returns(close.reindex(index).to_frame(), config)
+        Z[s] = returns.to_matrix(labels)
+
+    logger.info(f"Univerzum: {len(closes)} szimbólum × {len(index)} lépés")
+    return list(closes), index, Z
+
+
+def estimate_sigma2_universe(Z: np.ndarray) -> np.ndarray:
+    """Szimbólumonkénti σ²_1m becslés a tenzor 1m oszlopából (Z[:, :, 0])."""
+    return np.nanvar(Z[:, :, 0], axis=1, ddof=1)
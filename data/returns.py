@@ -0,0 +1,131 @@
+"""
+Ritka (sparse) multi-TF log hozamok — TF-enként csak a mérési pontok.
+
+A teljes 1m indexre kiterített, TF-enként egy-egy Series helyett (az 1d
+sorozat > 99.9%-a NaN) TF-enként két összefüggő tömb: a mérések sor
+pozíciói és értékei, plusz egy [N] ütemezési bitmaszk, amelynek j. bitje
+jelzi, hogy a TF-ek percek szerint növekvő sorrendjében j. TF-nek van-e
+mérése az adott sorban (a `kalman.patterns` bitsorrendje).
+
+A memória így ~k·N helyett ~N + Σ n_tf, és a szűrő a mérésmátrixot és
+az aktív maszkot közvetlenül ebből tölti, NaN-keresés nélkül.
+
+Használat:
+    returns = compute_log_returns(df_1m, config)     # SparseReturns
+    returns["5m"]                                    # kompakt Series (csak mérési pontok)
+    returns[50:]                                     # sorszeletelés (pl. burn-in)
+    Z = returns.to_matrix(labels)                    # [N x k], NaN ahol nincs mérés
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class SparseReturns(Mapping):
+    """
+    TF címke → kompakt log hozam Series nézet, a tömbök felett.
+
+    Mapping-ként a régi dict interfészt adja (`returns["1m"]`, `in`,
+    `items()`), de a Series-ek csak a mérési pontokat tartalmazzák
+    (a hozzájuk tartozó időbélyegekkel), NaN kitöltés nélkül.
+    """
+
+    index: pd.DatetimeIndex                # [N] az 1m sorok időbélyegei
+    minutes: np.ndarray                    # [N] epoch perc (a szűrő lépés indexe)
+    tf_minutes: dict[str, int]             # TF címke → perc
+    rows: dict[str, np.ndarray]            # TF → [n_tf] növekvő sor pozíciók
+    data: dict[str, np.ndarray]            # TF → [n_tf] log hozam (a `rows` soraiban)
+    mask: np.ndarray                       # [N] unsigned bitmaszk (bit j: j. TF percek szerint)
+
+    @property
+    def labels(self) -> list[str]:
+        """TF címkék percek szerint növekvő sorrendben (a bitmaszk bitsorrendje)."""
+        return sorted(self.tf_minutes, key=self.tf_minutes.get)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.index)
+
+    @property
+    def nbytes(self) -> int:
+        """A tömbök (index nélküli) memóriája bájtban."""
+        arrays = [self.minutes, self.mask, *self.rows.values(), *self.data.values()]
+        return sum(a.nbytes for a in arrays)
+
+    # ── Mapping interfész ────────────────────────────────────────────────────
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.slice_rows(key)
+        if key not in self.rows:
+            raise KeyError(key)
+        return pd.Series(self.data[key], index=self.index[self.rows[key]], name=key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, key) -> bool:
+        return key in self.rows
+
+    # ── Sorszeletelés ────────────────────────────────────────────────────────
+
+    def slice_rows(self, key: slice) -> SparseReturns:
+        """Egybefüggő sortartomány (lépésköz nélkül); a tömbök nézetek, nem másolatok."""
+        start, stop, step = key.indices(self.n_rows)
+        if step != 1:
+            raise ValueError("SparseReturns csak lépésköz nélkül szeletelhető")
+        rows: dict[str, np.ndarray] = {}
+        data: dict[str, np.ndarray] = {}
+        for label, r in self.rows.items():
+            lo, hi = np.searchsorted(r, [start, stop])
+            rows[label] = r[lo:hi] - start
+            data[label] = self.data[label][lo:hi]
+        return SparseReturns(
+            index=self.index[start:stop],
+            minutes=self.minutes[start:stop],
+            tf_minutes=self.tf_minutes,
+            rows=rows,
+            data=data,
+            mask=self.mask[start:stop],
+        )
+
+    # ── Sűrű nézetek a szűrőnek / vizualizációknak ──────────────────────────
+
+    def count(self, label: str) -> int:
+        """A TF mérési pontjainak száma."""
+        return len(self.rows[label])
+
+    def dense(self, label: str) -> pd.Series:
+        """A TF teljes 1m indexre kiterítve (NaN ahol nincs mérés)."""
+        out = np.full(self.n_rows, np.nan)
+        out[self.rows[label]] = self.data[label]
+        return pd.Series(out, index=self.index, name=label)
+
+    def to_matrix(self, labels: Optional[list[str]] = None) -> np.ndarray:
+        """[N x k] mérésmátrix a `labels` oszlopsorrendben, NaN ahol nincs mérés."""
+        labels = self.labels if labels is None else labels
+        Z = np.full((self.n_rows, len(labels)), np.nan)
+        for j, label in enumerate(labels):
+            if label in self.rows:
+                Z[self.rows[label], j] = self.data[label]
+        return Z
+
+    def active(self, labels: Optional[list[str]] = None) -> np.ndarray:
+        """[N x k] bool aktív maszk a bitmaszkból, a `labels` oszlopsorrendben."""
+        labels = self.labels if labels is None else labels
+        bit_of = {label: j for j, label in enumerate(self.labels)}
+        active = np.zeros((self.n_rows, len(labels)), dtype=bool)
+        for j, label in enumerate(labels):
+            if label in bit_of:
+                active[:, j] = (self.mask >> bit_of[label]) & 1
+        return active
@@ -0,0 +1,246 @@
+"""
+Inkrementális, particionált OHLCV tároló — szimbólum / nap parquet fájlok.
+
+Könyvtárszerkezet:
+    {cache_dir}/{SYMBOL}/{tf}/2024-01-31.parquet   — egy fájl naponta
+    {cache_dir}/{SYMBOL}/{tf}/_covered.json        — lefedett tartományok
+    {cache_dir}/{SYMBOL}/{tf}/close/2024-01-31.arrow — a nap (timestamp, close) Arrow IPC szegmense
+
+A tároló nyilvántartja a már lekért (lefedett) időtartományokat, így egy
+új kérésnél csak a hiányzó fej / farok / belső rés tartományokat kell
+letölteni. Tőzsdei kiesés miatt üres tartomány is lefedettnek számít.
+
+Olvasáskor csak a kért napok fájljai nyílnak meg (partíció-metszés), a
+pyarrow dataset a timestamp predikátumot és az oszlopválasztást a parquet
+szintjére tolja le. A `read_close()` a close oszlopot a napi memory-mapped
+Arrow IPC szegmensekből adja: egy append csak az érintett napok
+szegmenseit írja újra, olvasáskor csak a kért napok szegmensei nyílnak meg.
+
+Használat:
+    store = OHLCVStore("data/cache", "BTC/USDT")
+    for start, end in store.missing(since_ms, until_ms):
+        store.append(fetch_ohlcv(...), start, end)
+    df = store.read(since_ms, until_ms, columns=["close"])
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from config import tf_to_millis
+
+logger = logging.getLogger(__name__)
+
+Interval = tuple[int, int]   # [start_ms, end_ms] zárt, gyertya nyitási időkre
+
+_DAY_MS = 24 * 3600 * 1000
+
+_OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+class OHLCVStore:
+    """Append-only, naponként particionált OHLCV tároló lefedettség nyilvántartással."""
+
+    def __init__(self, cache_dir: str | Path, symbol: str, timeframe: str = "1m"):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.tf_ms = tf_to_millis(timeframe)
+
+        safe_symbol = symbol.replace("/", "")
+        self.root = Path(cache_dir) / safe_symbol / timeframe
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.meta_path = self.root / "_covered.json"
+        self.ipc_dir = self.root / "close"
+
+    # ── Lefedettség ──────────────────────────────────────────────────────
+
+    def covered(self) -> list[Interval]:
+        """A már lekért tartományok (rendezett, összefésült)."""
+        if not self.meta_path.exists():
+            return []
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return [(int(a), int(b)) for a, b in meta.get("covered", [])]
+
+    def _save_covered(self, intervals: list[Interval]) -> None:
+        meta = {"symbol": self.symbol, "timeframe": self.timeframe,
+                "covered": [list(iv) for iv in intervals]}
+        tmp = self.meta_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        tmp.replace(self.meta_path)
+
+    def _merge(self, intervals: list[Interval]) -> list[Interval]:
+        """Átfedő / szomszédos tartományok összefésülése."""
+        merged: list[Interval] = []
+        for a, b in sorted(intervals):
+            if merged and a <= merged[-1][1] + self.tf_ms:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+            else:
+                merged.append((a, b))
+        return merged
+
+    def _align(self, since_ms: int, until_ms: int) -> Interval:
+        """Kérés igazítása gyertyahatárokra (since felfelé, until lefelé)."""
+        start = -(-since_ms // self.tf_ms) * self.tf_ms
+        end = until_ms // self.tf_ms * self.tf_ms
+        return start, end
+
+    def missing(self, since_ms: int, until_ms: int) -> list[Interval]:
+        """A [since, until] kérésből még le nem fedett tartományok."""
+        start, end = self._align(since_ms, until_ms)
+        gaps: list[Interval] = []
+        cursor = start
+        for a, b in self.covered():
+            if b < cursor:
+                continue
+            if a > end:
+                break
+            if a > cursor:
+                gaps.append((cursor, a - self.tf_ms))
+            cursor = max(cursor, b + self.tf_ms)
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    # ── Partíciók ────────────────────────────────────────────────────────
+
+    def _day_path(self, day: pd.Timestamp) -> Path:
+        return self.root / f"{day:%Y-%m-%d}.parquet"
+
+    def _ipc_path(self, day_path: Path) -> Path:
+        return self.ipc_dir / f"{day_path.stem}.arrow"
+
+    def _day_files(self, since_ms: int, until_ms: int) -> list[Path]:
+        """A [since, until] tartományt érintő, létező napi fájlok."""
+        first = since_ms // _DAY_MS * _DAY_MS
+        days = pd.date_range(
+            pd.Timestamp(first, unit="ms", tz="UTC"),
+            pd.Timestamp(until_ms, unit="ms", tz="UTC"),
+            freq="D",
+        )
+        return [p for p in map(self._day_path, days) if p.exists()]
+
+    # ── Olvasás / írás ───────────────────────────────────────────────────
+
+    def read(
+        self,
+        since_ms: int,
+        until_ms: int,
+        columns: Optional[list[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        A tárolt adat [since, until] szelete.
+
+        Args:
+            columns: csak ezek az oszlopok (None = mind); a timestamp index mindig jön
+        """
+        files = self._day_files(since_ms, until_ms)
+        if not files:
+            # Üres, de a nem üres olvasással azonos sémájú keret
+            index = pd.DatetimeIndex([], tz="UTC", name="timestamp")
+            return pd.DataFrame(columns=columns or _OHLCV_COLUMNS, index=index, dtype=float)
+
+        lo = pd.Timestamp(since_ms, unit="ms", tz="UTC")
+        hi = pd.Timestamp(until_ms, unit="ms", tz="UTC")
+        ts = ds.field("timestamp")
+        dataset = ds.dataset([str(p) for p in files], format="parquet")
+        table = dataset.to_table(
+            columns=None if columns is None else ["timestamp", *columns],
+            filter=(ts >= pa.scalar(lo)) & (ts <= pa.scalar(hi)),
+        )
+        return table.to_pandas().set_index("timestamp").sort_index()
+
+    def append(self, df: pd.DataFrame, since_ms: int, until_ms: int) -> None:
+        """
+        Új sorok hozzáfűzése és a [since, until] tartomány lefedettként jelölése.
+
+        Csak az érintett napok partíciói íródnak újra.
+
+        Args:
+            df: fetch_ohlcv() output (UTC DatetimeIndex), lehet üres
+            since_ms, until_ms: a lekért tartomány (akkor is lefedett, ha üres)
+        """
+        if len(df):
+            for day, day_df in df.groupby(df.index.floor("D")):
+                path = self._day_path(day)
+                if path.exists():
+                    stored = pq.read_table(path).to_pandas().set_index("timestamp")
+                    day_df = pd.concat([stored, day_df])
+                day_df = day_df[~day_df.index.duplicated(keep="last")].sort_index()
+                day_df.index.name = "timestamp"
+                table = pa.Table.from_pandas(day_df.reset_index(), preserve_index=False)
+                tmp = path.with_suffix(".parquet.tmp")
+                pq.write_table(table, tmp)
+                tmp.replace(path)
+                if "close" in table.column_names:
+                    self._write_ipc(path, table)
+
+        start, end = self._align(since_ms, until_ms)
+        if start <= end:
+            self._save_covered(self._merge(self.covered() + [(start, end)]))
+
+    # ── Memory-mapped close réteg ────────────────────────────────────────
+
+    def _write_ipc(self, day_path: Path, table: pa.Table) -> None:
+        """Egy nap (timestamp, close) oszlopainak kiírása a napi Arrow IPC szegmensbe."""
+        table = table.select(["timestamp", "close"]).sort_by("timestamp").combine_chunks()
+        self.ipc_dir.mkdir(exist_ok=True)
+        path = self._ipc_path(day_path)
+        tmp = path.with_suffix(".arrow.tmp")
+        with pa.OSFile(str(tmp), "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=max(len(table), 1))
+        tmp.replace(path)
+
+    def _read_ipc(self, day_path: Path) -> Optional[pa.RecordBatch]:
+        """A nap memory-mapped szegmense; hiányzó / elavult szegmens a parquetből épül."""
+        path = self._ipc_path(day_path)
+        if not path.exists() or path.stat().st_mtime < day_path.stat().st_mtime:
+            self._write_ipc(day_path, pq.read_table(day_path, columns=["timestamp", "close"]))
+        reader = ipc.open_file(pa.memory_map(str(path), "r"))
+        return reader.get_batch(0) if reader.num_record_batches else None
+
+    def read_close(self, since_ms: int, until_ms: int) -> pd.Series:
+        """
+        Close oszlop [since, until] szelete a napi memory-mapped Arrow IPC szegmensekből.
+
+        Csak a kért napok szegmensei nyílnak meg, és azokból csak az
+        érintett lapok töltődnek be; egyetlen napon belül a visszaadott
+        Series a leképezett pufferre mutat (zero-copy, csak olvasható),
+        több napnál a szeletek egyetlen tömbbe fűződnek.
+        """
+        ts_parts, close_parts = [], []
+        for day_path in self._day_files(since_ms, until_ms):
+            batch = self._read_ipc(day_path)
+            if batch is None:
+                continue
+            # Rendezett timestamp → bináris keresés (csak log N lapot érint)
+            ts = batch.column("timestamp").to_numpy(zero_copy_only=True)
+            lo = np.datetime64(since_ms, "ms").astype(ts.dtype)
+            hi = np.datetime64(until_ms, "ms").astype(ts.dtype)
+            start = int(np.searchsorted(ts, lo, side="left"))
+            stop = int(np.searchsorted(ts, hi, side="right"))
+            if stop > start:
+                ts_parts.append(ts[start:stop])
+                close_parts.append(batch.column("close").to_numpy(zero_copy_only=True)[start:stop])
+        if not ts_parts:
+            index = pd.DatetimeIndex([], tz="UTC", name="timestamp")
+            return pd.Series(index=index, dtype=float, name="close")
+
+        if len(ts_parts) == 1:
+            ts, close = ts_parts[0], close_parts[0]
+        else:
+            ts, close = np.concatenate(ts_parts), np.concatenate(close_parts)
+        index = pd.DatetimeIndex(ts, name="timestamp").tz_localize("UTC")
+        return pd.Series(close, index=index, name="close", copy=False)
@@ -0,0 +1,117 @@
+"""
+Szintetikus 1m OHLCV adat — GBM drifttel + offline „tőzsde".
+
+Hálózat nélküli futtatáshoz (letöltő, streaming replay, benchmarkok):
+a `SyntheticExchange` a ccxt `fetch_ohlcv` interfészét utánozza egy
+előre generált, determinisztikus gyertyasoron.
+
+Használat:
+    df = make_gbm_ohlcv(n_candles=100_000, seed=1)
+    exchange = SyntheticExchange(start_ms, n_candles=10_000)
+    fetch_ohlcv_concurrent(exchange, "BTC/USDT", "1m", since_ms, until_ms)
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+_MINUTE_MS = 60_000
+
+
+def make_gbm_ohlcv(
+    n_candles: int,
+    start: str | pd.Timestamp = "2024-01-01",
+    seed: int = 0,
+    s0: float = 40_000.0,
+    drift: float = 1e-6,
+    vol: float = 5e-4,
+    missing: Optional[list[tuple[int, int]]] = None,
+) -> pd.DataFrame:
+    """
+    Geometriai Brown-mozgás 1m gyertyák (log hozam ~ N(drift, vol²)).
+
+    Args:
+        n_candles: gyertyák száma (kiesések előtt)
+        start: első gyertya nyitási ideje (UTC)
+        drift, vol: 1 perces log hozam várható értéke és szórása
+        missing: [(i, j), ...] kiejtett gyertya-index tartományok (tőzsdei kiesés)
+
+    Returns:
+        DataFrame (open, high, low, close, volume), UTC DatetimeIndex 'timestamp'
+    """
+    rng = np.random.default_rng(seed)
+    log_ret = drift + vol * rng.standard_normal(n_candles)
+    close = s0 * np.exp(np.cumsum(log_ret))
+    open_ = np.concatenate([[s0], close[:-1]])
+    wick = np.abs(vol * rng.standard_normal(n_candles))
+    high = np.maximum(open_, close) * np.exp(wick)
+    low = np.minimum(open_, close) * np.exp(-wick)
+    volume = rng.gamma(2.0, 5.0, n_candles)
+
+    start = pd.Timestamp(start)
+    start = start.tz_localize("UTC") if start.tzinfo is None else start.tz_convert("UTC")
+    index = pd.date_range(start, periods=n_candles,
+                          freq="1min", name="timestamp")
+    df = pd.DataFrame(
+        {"open": open_, "high": high, "low": low, "close": close, "volume": volume},
+        index=index,
+    )
+    if missing:
+        keep = np.ones(n_candles, dtype=bool)
+        for i, j in missing:
+            keep[i:j] = False
+        df = df[keep]
+    return df
+
+
+class SyntheticExchange:
+    """
+    Offline ccxt-szerű exchange: `fetch_ohlcv(symbol, timeframe, since, limit)`.
+
+    Szálbiztos; a hívásokat számolja (`n_calls`), opcionálisan hálózati
+    késleltetést szimulál (`latency` mp / hívás).
+    """
+
+    def __init__(
+        self,
+        start_ms: int,
+        n_candles: int,
+        seed: int = 0,
+        latency: float = 0.0,
+        rate_limit_ms: int = 50,
+        missing: Optional[list[tuple[int, int]]] = None,
+    ):
+        start = pd.Timestamp(start_ms // _MINUTE_MS * _MINUTE_MS, unit="ms", tz="UTC")
+        df = make_gbm_ohlcv(n_candles, start=start, seed=seed, missing=missing)
+        self._ts = (df.index.as_unit("ms").asi8).astype(np.int64)
+        self._rows = df[["open", "high", "low", "close", "volume"]].to_numpy()
+        self.latency = latency
+        self.rateLimit = rate_limit_ms
+        self.n_calls = 0
+        self._lock = threading.Lock()
+
+    def fetch_ohlcv(
+        self,
+        symbol: str,
+        timeframe: str = "1m",
+        since: Optional[int] = None,
+        limit: int = 1000,
+    ) -> list[list]:
+        if timeframe != "1m":
+            raise ValueError(f"SyntheticExchange csak 1m-et szolgál ki: {timeframe}")
+        with self._lock:
+            self.n_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        i = int(np.searchsorted(self._ts, since or 0, side="left"))
+        ts = self._ts[i:i + limit]
+        rows = self._rows[i:i + limit]
+        return [[int(t), *map(float, r)] for t, r in zip(ts, rows)]
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,385 @@
+"""
+Opcionális numba JIT backend — a teljes forward pass fordított kódban.
+
+Az állapot dimenzió fix 3, a mérés dimenzió legfeljebb len(timeframes),
+így a NumPy útvonal költsége szinte teljesen dispatch overhead apró
+mátrixokon. Itt a predict / update / P stabilizálás kézzel kiírt 3x3
+algebrával fut, az S inverze Cholesky faktorból jön (joint), illetve
+fehérített skalár frissítésekkel inverz nélkül (sequential).
+
+Ha a numba nincs telepítve, `HAVE_NUMBA = False` és a szűrő a NumPy
+útvonalat használja.
+"""
+
+from __future__ import annotations
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:          # opcionális függőség
+    HAVE_NUMBA = False
+
+BACKENDS = ("auto", "numpy", "numba")
+
+_EPS_P = 1e-12               # _stabilize_P küszöb / regularizáció
+
+
+def resolve_backend(backend: str) -> str:
+    """'auto' / 'numpy' / 'numba' → a ténylegesen használt backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Ismeretlen backend: {backend} ({BACKENDS})")
+    if backend == "numpy":
+        return "numpy"
+    if not HAVE_NUMBA:
+        if backend == "numba":
+            logger.warning("numba nincs telepítve → NumPy backend")
+        return "numpy"
+    return "numba"
+
+
+if HAVE_NUMBA:
+
+    @njit(cache=True)
+    def _chol_inplace(A, n):
+        """A alsó háromszögébe írt Cholesky faktor; False ha nem pozitív definit."""
+        for j in range(n):
+            d = A[j, j]
+            for m in range(j):
+                d -= A[j, m] * A[j, m]
+            if not d > 0.0:
+                return False
+            d = np.sqrt(d)
+            A[j, j] = d
+            for i in range(j + 1, n):
+                s = A[i, j]
+                for m in range(j):
+                    s -= A[i, m] * A[j, m]
+                A[i, j] = s / d
+        return True
+
+    @njit(cache=True)
+    def _psd_above(P, eps):
+        """min eig(P) ≥ eps ⇔ P − eps·I pozitív (szemi)definit — 3x3 Cholesky próba."""
+        a00 = P[0, 0] - eps
+        if not a00 > 0.0:
+            return False
+        l00 = np.sqrt(a00)
+        l10 = P[1, 0] / l00
+        l20 = P[2, 0] / l00
+        a11 = P[1, 1] - eps - l10 * l10
+        if not a11 > 0.0:
+            return False
+        l11 = np.sqrt(a11)
+        l21 = (P[2, 1] - l20 * l10) / l11
+        a22 = P[2, 2] - eps - l20 * l20 - l21 * l21
+        return a22 > 0.0
+
+    @njit(cache=True)
+    def forward_pass(
+        Z, active, F, Q, H_all, R_all, x0, P0,
+        x_out, P_out, x_pred_out, P_pred_out, innov_out, S_out, K_out, mahal_out,
+    ):
+        """
+        Teljes forward pass a [N x k] mérésmátrixon.
+
+        A kimeneti tömbök (KalmanArrays mezői) előre lefoglaltak; csak az
+        aktív TF-ek innovation / S / K elemei íródnak.
+
+        Returns:
+            -1 ha sikeres, különben a lépés indexe ahol S nem pozitív definit
+        """
+        n_steps, k = Z.shape
+        x = x0.copy()
+        P = P0.copy()
+        xp = np.empty(3)
+        Pp = np.empty((3, 3))
+        FP = np.empty((3, 3))
+        cols = np.empty(k, dtype=np.int64)
+        H = np.empty((k, 3))
+        PHt = np.empty((3, k))
+        S = np.empty((k, k))
+        Sinv = np.empty((k, k))
+        Linv = np.empty((k, k))
+        K = np.empty((3, k))
+        KR = np.empty((3, k))
+        nu = np.empty(k)
+        IKH = np.empty((3, 3))
+        T = np.empty((3, 3))
+        Pn = np.empty((3, 3))
+
+        for t in range(n_steps):
+            # ── Predikció: x⁻ = F x, P⁻ = F P Fᵀ + Q ──
+            for i in range(3):
+                xp[i] = F[i, 0] * x[0] + F[i, 1] * x[1] + F[i, 2] * x[2]
+                for j in range(3):
+                    FP[i, j] = F[i, 0] * P[0, j] + F[i, 1] * P[1, j] + F[i, 2] * P[2, j]
+            for i in range(3):
+                for j in range(3):
+                    Pp[i, j] = (FP[i, 0] * F[j, 0] + FP[i, 1] * F[j, 1]
+                                + FP[i, 2] * F[j, 2] + Q[i, j])
+
+            na = 0
+            for j in range(k):
+                if active[t, j]:
+                    cols[na] = j
+                    na += 1
+
+            if na == 0:
+                for i in range(3):
+                    x[i] = xp[i]
+                    for j in range(3):
+                        P[i, j] = Pp[i, j]
+                mahal = 0.0
+            else:
+                # ── Innováció és S = H P⁻ Hᵀ + R ──
+                for a in range(na):
+                    c = cols[a]
+                    for m in range(3):
+                        H[a, m] = H_all[c, m]
+                    nu[a] = Z[t, c] - (H[a, 0] * xp[0] + H[a, 1] * xp[1] + H[a, 2] * xp[2])
+                for i in range(3):
+                    for a in range(na):
+                        PHt[i, a] = Pp[i, 0] * H[a, 0] + Pp[i, 1] * H[a, 1] + Pp[i, 2] * H[a, 2]
+                for a in range(na):
+                    for b in range(na):
+                        S[a, b] = (H[a, 0] * PHt[0, b] + H[a, 1] * PHt[1, b]
+                                   + H[a, 2] * PHt[2, b] + R_all[cols[a], cols[b]])
+                        Sinv[a, b] = S[a, b]
+
+                # ── S⁻¹ Cholesky faktorból: S⁻¹ = L⁻ᵀ L⁻¹ ──
+                if not _chol_inplace(Sinv, na):
+                    return t
+                for a in range(na):
+                    for b in range(na):
+                        Linv[a, b] = 0.0
+                for b in range(na):
+                    Linv[b, b] = 1.0 / Sinv[b, b]
+                    for a in range(b + 1, na):
+                        s = 0.0
+                        for m in range(b, a):
+                            s -= Sinv[a, m] * Linv[m, b]
+                        Linv[a, b] = s / Sinv[a, a]
+                for a in range(na):
+                    for b in range(a, na):
+                        s = 0.0
+                        for m in range(b, na):
+                            s += Linv[m, a] * Linv[m, b]
+                        Sinv[a, b] = s
+                        Sinv[b, a] = s
+
+                # ── K = P⁻ Hᵀ S⁻¹ ──
+                for i in range(3):
+                    for b in range(na):
+                        s = 0.0
+                        for a in range(na):
+                            s += PHt[i, a] * Sinv[a, b]
+                        K[i, b] = s
+
+                # ── x = x⁻ + K ν ──
+                for i in range(3):
+                    s = xp[i]
+                    for a in range(na):
+                        s += K[i, a] * nu[a]
+                    x[i] = s
+
+                # ── Joseph-forma: P = (I−KH) P⁻ (I−KH)ᵀ + K R Kᵀ ──
+                for i in range(3):
+                    for j in range(3):
+                        s = 1.0 if i == j else 0.0
+                        for a in range(na):
+                            s -= K[i, a] * H[a, j]
+                        IKH[i, j] = s
+                for i in range(3):
+                    for j in range(3):
+                        T[i, j] = IKH[i, 0] * Pp[0, j] + IKH[i, 1] * Pp[1, j] + IKH[i, 2] * Pp[2, j]
+                for i in range(3):
+                    for b in range(na):
+                        s = 0.0
+                        for a in range(na):
+                            s += K[i, a] * R_all[cols[a], cols[b]]
+                        KR[i, b] = s
+                for i in range(3):
+                    for j in range(3):
+                        s = T[i, 0] * IKH[j, 0] + T[i, 1] * IKH[j, 1] + T[i, 2] * IKH[j, 2]
+                        for b in range(na):
+                            s += KR[i, b] * K[j, b]
+                        Pn[i, j] = s
+                for i in range(3):
+                    for j in range(3):
+                        P[i, j] = Pn[i, j]
+
+                # ── Mahalanobis: νᵀ S⁻¹ ν ──
+                mahal = 0.0
+                for a in range(na):
+                    s = 0.0
+                    for b in range(na):
+                        s += Sinv[a, b] * nu[b]
+                    mahal += nu[a] * s
+
+                for a in range(na):
+                    ca = cols[a]
+                    innov_out[t, ca] = nu[a]
+                    for i in range(3):
+                        K_out[t, i, ca] = K[i, a]
+                    for b in range(na):
+                        S_out[t, ca, cols[b]] = S[a, b]
+
+            # ── _stabilize_P: szimmetrizálás + regularizáció ──
+            for i in range(3):
+                for j in range(i + 1, 3):
+                    s = (P[i, j] + P[j, i]) / 2.0
+                    P[i, j] = s
+                    P[j, i] = s
+            if not _psd_above(P, _EPS_P):
+                for i in range(3):
+                    P[i, i] += _EPS_P
+
+            for i in range(3):
+                x_out[t, i] = x[i]
+                x_pred_out[t, i] = xp[i]
+                for j in range(3):
+                    P_out[t, i, j] = P[i, j]
+                    P_pred_out[t, i, j] = Pp[i, j]
+            mahal_out[t] = mahal
+
+        return -1
+
+    @njit(cache=True)
+    def forward_pass_sequential(
+        Z, active, F, Q, H_all, R_all, tf_n, sigma, r_full, x0, P0,
+        x_out, P_out, x_pred_out, P_pred_out, innov_out, S_out, K_out, mahal_out,
+    ):
+        """
+        Forward pass fehérített skalár frissítésekkel (update_mode="sequential").
+
+        A fehérítés zárt alakú (lásd `build_R_whitening`): full R esetén
+        a fehérített mérés az egymást követő aktív TF-ek különbsége osztva
+        σ√(n_a − n_{a−1})-gyel, diagonal esetén z_a / (σ√n_a). Mátrix
+        inverz nincs; az S és a K = P⁺ H̃ᵀ W csak a kimenethez számolódik.
+
+        Returns:
+            -1 ha sikeres, különben a lépés indexe ahol egy skalár s ≤ 0
+        """
+        n_steps, k = Z.shape
+        x = x0.copy()
+        P = P0.copy()
+        xp = np.empty(3)
+        Pp = np.empty((3, 3))
+        FP = np.empty((3, 3))
+        cols = np.empty(k, dtype=np.int64)
+        scale = np.empty(k)
+        Hwt = np.empty((3, k))
+        PHt = np.empty((3, k))
+        a = np.empty(3)
+        h = np.empty(3)
+
+        for t in range(n_steps):
+            # ── Predikció: x⁻ = F x, P⁻ = F P Fᵀ + Q ──
+            for i in range(3):
+                xp[i] = F[i, 0] * x[0] + F[i, 1] * x[1] + F[i, 2] * x[2]
+                for j in range(3):
+                    FP[i, j] = F[i, 0] * P[0, j] + F[i, 1] * P[1, j] + F[i, 2] * P[2, j]
+            for i in range(3):
+                for j in range(3):
+                    Pp[i, j] = (FP[i, 0] * F[j, 0] + FP[i, 1] * F[j, 1]
+                                + FP[i, 2] * F[j, 2] + Q[i, j])
+                x[i] = xp[i]
+            for i in range(3):
+                for j in range(3):
+                    P[i, j] = Pp[i, j]
+
+            na = 0
+            for j in range(k):
+                if active[t, j]:
+                    cols[na] = j
+                    na += 1
+
+            mahal = 0.0
+            for b in range(na):
+                c = cols[b]
+                # ── Fehérített sor: h̃ = W H, z̃ = W z (W alsó bidiagonális) ──
+                if r_full:
+                    prev = tf_n[cols[b - 1]] if b > 0 else 0.0
+                    scale[b] = 1.0 / (sigma * np.sqrt(tf_n[c] - prev))
+                else:
+                    scale[b] = 1.0 / (sigma * np.sqrt(tf_n[c]))
+                zi = Z[t, c]
+                for m in range(3):
+                    h[m] = H_all[c, m]
+                if r_full and b > 0:
+                    cp = cols[b - 1]
+                    zi -= Z[t, cp]
+                    for m in range(3):
+                        h[m] -= H_all[cp, m]
+                zi *= scale[b]
+                for m in range(3):
+                    h[m] *= scale[b]
+
+                # ── Skalár frissítés: s = h̃ P h̃ᵀ + 1, g = P h̃ᵀ / s ──
+                for i in range(3):
+                    a[i] = P[i, 0] * h[0] + P[i, 1] * h[1] + P[i, 2] * h[2]
+                s = h[0] * a[0] + h[1] * a[1] + h[2] * a[2] + 1.0
+                if not s > 0.0:
+                    return t
+                nu = zi - (h[0] * x[0] + h[1] * x[1] + h[2] * x[2])
+                for i in range(3):
+                    x[i] += a[i] / s * nu
+                for i in range(3):
+                    for j in range(3):
+                        P[i, j] -= a[i] * a[j] / s
+                mahal += nu * nu / s
+                for m in range(3):
+                    Hwt[m, b] = h[m]
+
+            if na > 0:
+                # ── Kimenet: ν, S = H P⁻ Hᵀ + R, K = P⁺ H̃ᵀ W ──
+                for b in range(na):
+                    c = cols[b]
+                    innov_out[t, c] = Z[t, c] - (H_all[c, 0] * xp[0] + H_all[c, 1] * xp[1]
+                                                 + H_all[c, 2] * xp[2])
+                    for i in range(3):
+                        PHt[i, b] = (Pp[i, 0] * H_all[c, 0] + Pp[i, 1] * H_all[c, 1]
+                                     + Pp[i, 2] * H_all[c, 2])
+                for b in range(na):
+                    cb = cols[b]
+                    for d in range(na):
+                        cd = cols[d]
+                        S_out[t, cb, cd] = (H_all[cb, 0] * PHt[0, d] + H_all[cb, 1] * PHt[1, d]
+                                            + H_all[cb, 2] * PHt[2, d] + R_all[cb, cd])
+                # P⁺ H̃ᵀ oszloponként (a fenti h̃ sorokból)
+                for b in range(na):
+                    for i in range(3):
+                        PHt[i, b] = P[i, 0] * Hwt[0, b] + P[i, 1] * Hwt[1, b] + P[i, 2] * Hwt[2, b]
+                for b in range(na):
+                    c = cols[b]
+                    for i in range(3):
+                        v = PHt[i, b] * scale[b]
+                        if r_full and b + 1 < na:
+                            v -= PHt[i, b + 1] * scale[b + 1]
+                        K_out[t, i, c] = v
+
+            # ── _stabilize_P: szimmetrizálás + regularizáció ──
+            for i in range(3):
+                for j in range(i + 1, 3):
+                    s = (P[i, j] + P[j, i]) / 2.0
+                    P[i, j] = s
+                    P[j, i] = s
+            if not _psd_above(P, _EPS_P):
+                for i in range(3):
+                    P[i, i] += _EPS_P
+
+            for i in range(3):
+                x_out[t, i] = x[i]
+                x_pred_out[t, i] = xp[i]
+                for j in range(3):
+                    P_out[t, i, j] = P[i, j]
+                    P_pred_out[t, i, j] = Pp[i, j]
+            mahal_out[t] = mahal
+
+        return -1
@@ -0,0 +1,380 @@
+"""
+Batch-elt multi-TF Kalman-szűrő — vezető paraméter-tengellyel.
+
+M különböző (q, σ²_1m, h_mode, r_mode, P0_scale) kombinációt egyetlen
+menetben szűr ugyanazon a mérésmátrixon: az állapot [M x 3 x 1], a
+kovariancia [M x 3 x 3], a predict/update matmul-lal fut a teljes
+paraméter-tengelyen. A q-érzékenységi és H-mód összehasonlító futások
+így egyetlen adatbejárásra zsugorodnak.
+
+A mérés tagonként is megadható ([M x N x k], pl. szimbólumonként —
+lásd `multi_symbol.py`): a lépés mintája ekkor a tagok aktív TF-einek
+uniója, a mérést nem kapó tag sorában H nulla, R egységnyi diagonális
+és z = 0, így arra a tagra a sor nem hat.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import epoch_minutes
+from data.returns import SparseReturns
+from profiling import annotate, profiled
+
+from .filter import INIT_MODES, KalmanArrays, returns_to_matrix
+from .matrices import build_F, build_Q
+from .patterns import PatternRegistry, active_to_masks
+from .riccati import PeriodicRiccati, solve_periodic
+
+logger = logging.getLogger(__name__)
+
+_I3 = np.eye(3)
+_LOG_2PI = float(np.log(2.0 * np.pi))
+
+
+def _psd_above(P: np.ndarray, eps: float) -> np.ndarray:
+    """
+    [M] bool: min eig(P_m) ≥ eps ⇔ P_m − eps·I pozitív definit.
+
+    Zárt alakú 3x3 Cholesky pivotok a teljes stacken — sok tagnál
+    nagyságrenddel olcsóbb a stackelt eigvalsh-nál.
+    """
+    a00 = P[:, 0, 0] - eps
+    with np.errstate(invalid="ignore", divide="ignore"):
+        l00 = np.sqrt(a00)
+        l10 = P[:, 1, 0] / l00
+        l20 = P[:, 2, 0] / l00
+        a11 = P[:, 1, 1] - eps - l10 * l10
+        l21 = (P[:, 2, 1] - l20 * l10) / np.sqrt(a11)
+        a22 = P[:, 2, 2] - eps - l20 * l20 - l21 * l21
+    return (a00 > 0.0) & (a11 > 0.0) & (a22 > 0.0)
+
+
+@dataclass(frozen=True)
+class FilterParams:
+    """Egy szűrő-konfiguráció a paraméter-tengely mentén."""
+
+    q: float
+    sigma2_1m: float
+    h_mode: str = "discrete"
+    r_mode: str = "full"
+    P0_scale: float = 100.0
+    init: str = "diffuse"       # "riccati" = periodikus steady-state P0 (lásd kalman.riccati)
+
+
+class BatchedMultiTFKalmanFilter:
+    """
+    M paraméter-kombináció párhuzamos szűrése egy adatbejárással.
+
+    Az aktív-TF minták a mérésekből adódnak, így minden tagra közösek;
+    mintánként a tagok H / R mátrixai egy [M x k x 3] / [M x k x k]
+    stackbe kerülnek.
+    """
+
+    def __init__(
+        self,
+        tf_minutes: dict[str, int],
+        params: list[FilterParams],
+        dt: float = 1.0,
+    ):
+        if not params:
+            raise ValueError("Legalább egy FilterParams szükséges")
+        self.tf_minutes = tf_minutes
+        self.all_tf_values = sorted(tf_minutes.values())
+        self.params = list(params)
+        self.dt = dt
+
+        M = len(self.params)
+        self.F = build_F(dt)
+        self.Q = np.stack([build_Q(p.q, dt) for p in self.params])   # [M x 3 x 3]
+        # Lépésköz (perc) → (F, Fᵀ, Q stack); rés után egyetlen ugrás
+        self._transitions: dict[int, tuple[np.ndarray, np.ndarray, np.ndarray]] = {
+            1: (self.F, self.F.T, self.Q),
+        }
+
+        self._registries = [
+            PatternRegistry(self.all_tf_values, p.sigma2_1m, p.h_mode, p.r_mode)
+            for p in self.params
+        ]
+        self._stacked: dict[int, tuple[list[int], np.ndarray, np.ndarray, np.ndarray]] = {}
+
+        self.x = np.zeros((M, 3, 1))
+        self.P = np.stack([_I3 * p.P0_scale for p in self.params])
+        # Riccati init tagonként; az első futás első lépésének fázisában alkalmazva
+        for p in self.params:
+            if p.init not in INIT_MODES:
+                raise ValueError(f"Ismeretlen init mód: {p.init} ({INIT_MODES})")
+        self._riccati: list[Optional[PeriodicRiccati]] = [
+            solve_periodic(tuple(self.all_tf_values), p.q, p.sigma2_1m, p.h_mode, p.r_mode, dt)
+            if p.init == "riccati" else None
+            for p in self.params
+        ]
+
+        # Az utolsó feldolgozott lépés indexe (None = még nem futott); a
+        # következő futás első lépése előtti rés innen számolódik
+        self.last_step: Optional[int] = None
+        # [M x N] lépésenkénti Gauss log-likelihood hozzájárulás (utolsó futás)
+        self.loglik = np.zeros((M, 0))
+
+    def __len__(self) -> int:
+        return len(self.params)
+
+    def _pattern(self, mask: int) -> tuple[list[int], np.ndarray, np.ndarray, np.ndarray]:
+        """(cols, H, Hᵀ, R) stack a bitmaszkhoz, tagonként a saját regiszterből."""
+        entry = self._stacked.get(mask)
+        if entry is None:
+            pats = [reg.get(mask) for reg in self._registries]
+            H = np.stack([p.H for p in pats])                       # [M x k x 3]
+            entry = (
+                pats[0].cols,
+                H,
+                np.ascontiguousarray(H.transpose(0, 2, 1)),       # [M x 3 x k]
+                np.stack([p.R for p in pats]),                      # [M x k x k]
+            )
+            self._stacked[mask] = entry
+        return entry
+
+    def _transition(self, n_steps: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(F(n·dt), Fᵀ, [M x 3 x 3] Q(n·dt)) — lásd MultiTFKalmanFilter.transition."""
+        entry = self._transitions.get(n_steps)
+        if entry is None:
+            F = build_F(n_steps * self.dt)
+            Q = np.stack([build_Q(p.q, n_steps * self.dt) for p in self.params])
+            entry = self._transitions[n_steps] = (F, F.T, Q)
+        return entry
+
+    def _stabilize_P(self) -> None:
+        """P pozitív definitség tagonként (szimmetrizálás + min. sajátérték)."""
+        self.P = (self.P + self.P.transpose(0, 2, 1)) / 2.0
+        low = ~_psd_above(self.P, 1e-12)
+        if low.any():
+            self.P[low] += _I3 * 1e-12
+
+    def run(
+        self,
+        returns: SparseReturns | dict[str, pd.Series],
+        progress_interval: int = 1000,
+        store_gain: bool = False,
+    ) -> list[KalmanArrays]:
+        """
+        Futtatás a compute_log_returns() outputján.
+
+        Returns:
+            tagonként egy KalmanArrays (a params sorrendjében)
+        """
+        Z, _ = returns_to_matrix(returns, self.tf_minutes)
+        if isinstance(returns, SparseReturns):
+            labels = sorted(self.tf_minutes, key=self.tf_minutes.get)
+            return self.run_matrix(
+                Z, progress_interval, store_gain,
+                minutes=returns.minutes, active=returns.active(labels),
+            )
+        base_tf = min(self.tf_minutes, key=self.tf_minutes.get)
+        minutes = epoch_minutes(returns[base_tf].index)
+        return self.run_matrix(Z, progress_interval, store_gain, minutes=minutes)
+
+    @profiled("kalman.batched.run_matrix")
+    def run_matrix(
+        self,
+        Z: np.ndarray,
+        progress_interval: int = 1000,
+        store_gain: bool = False,
+        store_pred: bool = True,
+        minutes: Optional[np.ndarray] = None,
+        active: Optional[np.ndarray] = None,
+        store_states: bool = True,
+    ) -> list[KalmanArrays]:
+        """
+        Batch futtatás egy [N x k] (közös) vagy [M x N x k] (tagonkénti)
+        mérésmátrixon.
+
+        Args:
+            Z: mérések `all_tf_values` oszlopsorrendben, NaN ahol nincs mérés
+            progress_interval: hány lépésenként logoljon
+            store_gain: innováció / S / K tárolása is (különben csak
+                        x, P, x_pred, P_pred, mahalanobis, aktív maszk)
+            store_pred: x_pred / P_pred tárolása (simításhoz kell; nélküle
+                        sok tagnál a kimenet memóriája közel a felére csökken)
+            minutes: [N] szigorúan növekvő lépés indexek (epoch perc);
+                     None = 0..N-1. Rés után (és az előző futás óta eltelt
+                     idő előtt) a predikció F(dt) / Q(dt)-vel ugrik (lásd
+                     MultiTFKalmanFilter.run_matrix)
+            active: Z alakú bool aktív maszk (pl. SparseReturns.active());
+                    None = ütemezés ÉS véges mérés Z-ből
+            store_states: False = csak log-likelihood mód: semmilyen
+                          lépésenkénti állapot nem tárolódik (store_gain /
+                          store_pred figyelmen kívül), csak `self.loglik`
+                          [M x N]; a visszatérési érték üres lista
+
+        Returns:
+            tagonként egy KalmanArrays (a params sorrendjében)
+        """
+        M = len(self.params)
+        tf_values = self.all_tf_values
+        per_member = Z.ndim == 3
+        if per_member and Z.shape[0] != M:
+            raise ValueError(f"Z tag-tengelye ({Z.shape[0]}) != konfigurációk száma ({M})")
+        n_steps, k = Z.shape[-2:]
+        if k != len(tf_values):
+            raise ValueError(f"Z oszlopszáma ({k}) != TF-ek száma ({len(tf_values)})")
+
+        logger.info(f"Batch szűrő futtatás: {M} konfiguráció × {n_steps} lépés")
+        annotate(members=M)
+
+        if minutes is None:
+            steps = np.arange(n_steps, dtype=np.int64)
+        else:
+            steps = np.asarray(minutes, dtype=np.int64)
+            if steps.shape != (n_steps,):
+                raise ValueError(f"minutes hossza ({steps.size}) != lépések száma ({n_steps})")
+        step_dt = np.ones(n_steps, dtype=np.int64)
+        step_dt[1:] = np.diff(steps)
+        if n_steps and self.last_step is not None:
+            step_dt[0] = steps[0] - self.last_step
+        if np.any(step_dt <= 0):
+            raise ValueError("A lépés indexeknek szigorúan növekvőnek kell lenniük")
+
+        if active is None:
+            schedule = steps[:, None] % np.asarray(tf_values)[None, :] == 0
+            active = schedule & np.isfinite(Z)                      # [(M x) N x k]
+        elif active.shape != Z.shape:
+            raise ValueError(f"active alakja ({active.shape}) != Z alakja ({Z.shape})")
+        if per_member:
+            # Lépésminta: a tagok aktív TF-einek uniója; részleges lépés, ahol
+            # valamelyik tagnál hiányzik egy a mintában szereplő mérés
+            union = active.any(axis=0)
+            partial = (active != union[None]).any(axis=(0, 2))
+            Z_m = np.nan_to_num(Z)
+        else:
+            union = active
+            partial = np.zeros(n_steps, dtype=bool)
+            Z_m = Z[None]
+        masks = active_to_masks(union)
+
+        store_pred = store_pred and store_states
+        store_gain = store_gain and store_states
+        if store_states:
+            X = np.zeros((M, n_steps, 3))
+            P_all = np.zeros((M, n_steps, 3, 3))
+            mahal_all = np.zeros((M, n_steps))
+        if store_pred:
+            X_pred = np.zeros((M, n_steps, 3))
+            P_pred_all = np.zeros((M, n_steps, 3, 3))
+        loglik = np.zeros((M, n_steps))
+        if store_gain:
+            innov_all = np.full((M, n_steps, k), np.nan)
+            S_all = np.zeros((M, n_steps, k, k))
+            K_all = np.zeros((M, n_steps, 3, k))
+
+        if n_steps and self.last_step is None:
+            for m, sol in enumerate(self._riccati):
+                if sol is not None:
+                    self.P[m] = sol.posterior(int(steps[0]) - 1)
+            self._riccati = [None] * M
+
+        for i in range(n_steps):
+            F, F_T, Q = self._transition(int(step_dt[i]))
+            x_pred = F @ self.x                                     # [M x 3 x 1]
+            P_pred = F @ self.P @ F_T + Q                           # [M x 3 x 3]
+
+            mask = int(masks[i])
+            if mask:
+                cols, H, H_T, R = self._pattern(mask)
+                z = Z_m[:, i, cols, None]                           # [(M|1) x k x 1]
+                n_active = len(cols)
+                if partial[i]:
+                    # Hiányzó tag-mérés: H sor = 0, R sor/oszlop = egységvektor
+                    act = active[:, i, cols]                        # [M x k]
+                    both = act[:, :, None] & act[:, None, :]
+                    H = H * act[:, :, None]
+                    H_T = H.transpose(0, 2, 1)
+                    R = np.where(both, R, 0.0) + (~act)[:, :, None] * np.eye(len(cols))
+                    n_active = act.sum(axis=1)
+
+                innovation = z - H @ x_pred                         # [M x k x 1]
+                S = H @ P_pred @ H_T + R                            # [M x k x k]
+                try:
+                    S_inv = np.linalg.inv(S)
+                except np.linalg.LinAlgError:
+                    S_inv = np.linalg.pinv(S)
+                K = P_pred @ H_T @ S_inv                            # [M x 3 x k]
+
+                I_KH = _I3 - K @ H
+                self.x = x_pred + K @ innovation
+                self.P = (
+                    I_KH @ P_pred @ I_KH.transpose(0, 2, 1)
+                    + K @ R @ K.transpose(0, 2, 1)
+                )
+                mahal = (innovation.transpose(0, 2, 1) @ S_inv @ innovation)[:, 0, 0]
+                if store_states:
+                    mahal_all[:, i] = mahal
+
+                # log N(ν; 0, S) = -½ (k·log 2π + log|S| + νᵀS⁻¹ν)
+                logdet = np.linalg.slogdet(S)[1]
+                loglik[:, i] = -0.5 * (n_active * _LOG_2PI + logdet + mahal)
+
+                if store_gain:
+                    if partial[i]:
+                        # A hiányzó tag-mérések nem kerülnek a history-ba
+                        innovation = np.where(act[:, :, None], innovation, np.nan)
+                        S = np.where(both, S, 0.0)
+                    innov_all[:, i, cols] = innovation[:, :, 0]
+                    idx = np.ix_(cols, cols)
+                    S_all[:, i][:, idx[0], idx[1]] = S
+                    K_all[:, i][:, :, cols] = K
+            else:
+                self.x = x_pred
+                self.P = P_pred
+
+            self._stabilize_P()
+
+            if store_states:
+                X[:, i] = self.x[:, :, 0]
+                P_all[:, i] = self.P
+            if store_pred:
+                X_pred[:, i] = x_pred[:, :, 0]
+                P_pred_all[:, i] = P_pred
+
+            if progress_interval and (i + 1) % progress_interval == 0:
+                logger.info(f"  {i + 1}/{n_steps} lépés kész")
+
+        if n_steps:
+            self.last_step = int(steps[-1])
+        self.loglik = loglik
+        logger.info(f"Batch szűrő kész: {M} × {n_steps} állapot")
+
+        results = []
+        if not store_states:
+            return results
+        for m in range(M):
+            # Nem tárolt mezők: nulla-stride nézetek (nem foglalnak memóriát)
+            if store_gain:
+                innov_m, S_m, K_m = innov_all[m], S_all[m], K_all[m]
+            else:
+                innov_m = np.broadcast_to(np.nan, (n_steps, k))
+                S_m = np.broadcast_to(0.0, (n_steps, k, k))
+                K_m = np.broadcast_to(0.0, (n_steps, 3, k))
+            if store_pred:
+                x_pred_m, P_pred_m = X_pred[m], P_pred_all[m]
+            else:
+                x_pred_m = np.broadcast_to(0.0, (n_steps, 3))
+                P_pred_m = np.broadcast_to(0.0, (n_steps, 3, 3))
+            results.append(KalmanArrays(
+                tf_values=list(tf_values),
+                step_idx=steps,
+                x=X[m],
+                P=P_all[m],
+                x_pred=x_pred_m,
+                P_pred=P_pred_m,
+                innovation=innov_m,
+                S=S_m,
+                K=K_m,
+                mahalanobis=mahal_all[m],
+                active=active[m] if per_member else active,
+            ))
+        return results
@@ -0,0 +1,344 @@
+"""
+Szűrő checkpoint és tárolt állapotok — inkrementális (napi) futásokhoz.
+
+A szűrő egy futás végén egy kompakt checkpointot ír (x, P, az utolsó
+időbélyeg / lépés, az ütemezés fázisa, a paraméterek hash-e), az
+állapotokat (KalmanArrays) pedig naponként particionálva tárolja. A
+következő futás a checkpointból folytatja: a tárolt állapotokat
+beolvassa, és csak az új perceket szűri.
+
+Könyvtárszerkezet:
+    {cache_dir}/{SYMBOL}/kalman/checkpoint.json    — FilterCheckpoint
+    {cache_dir}/{SYMBOL}/kalman/2024-01-31.npz     — egy nap KalmanArrays sorai + időbélyegek
+
+A lépés index az epoch perc, így az ütemezés fázisa (perc mod lcm(TF))
+a folytatásnál magától helyes; a checkpoint fázisa ellenőrzésre szolgál.
+Ha a paraméterek (hash), a TF-ek vagy a tárolt sorok az aktuális adattal
+nem egyeznek, nincs folytatás — teljes futás jön, és a tároló az első
+eltérő naptól íródik újra.
+
+Használat:
+    store = StateStore(config.data.cache_dir, config.symbol)
+    start = resume(kf, returns, store)                 # None → teljes futás kell
+    if start is None:
+        kf.run(returns)
+        start = 0
+    store.save_run(kf, returns.index, start)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import shutil
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import epoch_minutes
+from data.returns import SparseReturns
+
+from .filter import KalmanArrays, MultiTFKalmanFilter, _ARRAY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+_DAY_NS = 24 * 3600 * 10**9
+
+
+def param_hash(kf: MultiTFKalmanFilter) -> str:
+    """A szűrő kimenetét meghatározó paraméterek hash-e (a backend nem számít)."""
+    params = {
+        "tf_values": kf.all_tf_values,
+        "q": kf.q,
+        "sigma2_1m": kf.sigma2_1m,
+        "h_mode": kf.h_mode,
+        "r_mode": kf.r_mode,
+        "dt": kf.dt,
+        "P0_scale": kf.P0_scale,
+        "init": kf.init,
+        "steady_state": kf.steady_state,
+        "update_mode": kf.update_mode,
+        "covariance_form": kf.covariance_form,
+    }
+    blob = json.dumps(params, sort_keys=True, default=repr).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+# ── Checkpoint ───────────────────────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class FilterCheckpoint:
+    """A szűrő állapota egy futás végén."""
+
+    x: list[float]              # [3]
+    P: list[list[float]]        # [3 x 3]
+    last_step: int              # az utolsó szűrt lépés (epoch perc)
+    last_timestamp: str         # ... időbélyege (ISO, UTC)
+    phase: int                  # last_step mod period
+    period: int                 # az ütemezés periódusa (lcm(TF))
+    tf_values: list[int]
+    sigma2_1m: float            # a folytatás ezt használja, ha a config nem ad meg σ²_1m-et
+    params_hash: str
+
+    @classmethod
+    def from_filter(cls, kf: MultiTFKalmanFilter, last_timestamp: pd.Timestamp) -> FilterCheckpoint:
+        if kf.last_step is None:
+            raise ValueError("A szűrő még nem futott — nincs menthető állapot")
+        period = kf.patterns.period
+        return cls(
+            x=[float(v) for v in kf.x.ravel()],
+            P=[[float(v) for v in row] for row in kf.P],
+            last_step=int(kf.last_step),
+            last_timestamp=pd.Timestamp(last_timestamp).isoformat(),
+            phase=int(kf.last_step % period),
+            period=int(period),
+            tf_values=list(kf.all_tf_values),
+            sigma2_1m=float(kf.sigma2_1m),
+            params_hash=param_hash(kf),
+        )
+
+    def matches(self, kf: MultiTFKalmanFilter) -> Optional[str]:
+        """None, ha a checkpoint a szűrőhöz illik; különben az eltérés oka."""
+        if self.params_hash != param_hash(kf):
+            return "eltérő szűrő paraméterek"
+        if self.tf_values != list(kf.all_tf_values) or self.period != kf.patterns.period:
+            return "eltérő TF ütemezés"
+        if self.phase != self.last_step % self.period:
+            return "hibás ütemezési fázis"
+        if int(epoch_minutes(pd.DatetimeIndex([self.last_timestamp]))[0]) != self.last_step:
+            return "az időbélyeg és a lépés index eltér"
+        return None
+
+    def restore(self, kf: MultiTFKalmanFilter) -> None:
+        """(x, P, utolsó lépés) visszaállítása; a következő lépés előtti rés innen számolódik."""
+        reason = self.matches(kf)
+        if reason is not None:
+            raise ValueError(f"A checkpoint nem illik a szűrőhöz: {reason}")
+        kf.set_state(np.array(self.x), np.array(self.P), self.last_step)
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        tmp = path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=2)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Optional[FilterCheckpoint]:
+        path = Path(path)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+# ── Állapot tároló ───────────────────────────────────────────────────────────
+
+
+class StateStore:
+    """Naponként particionált KalmanArrays tároló + checkpoint egy szimbólumhoz."""
+
+    def __init__(self, cache_dir: str | Path, symbol: str):
+        self.symbol = symbol
+        self.root = Path(cache_dir) / symbol.replace("/", "") / "kalman"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_path = self.root / "checkpoint.json"
+
+    def load_checkpoint(self) -> Optional[FilterCheckpoint]:
+        return FilterCheckpoint.load(self.checkpoint_path)
+
+    def clear(self) -> None:
+        """Minden tárolt állapot és a checkpoint törlése."""
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    # ── Partíciók ────────────────────────────────────────────────────────
+
+    def _day_path(self, day: pd.Timestamp) -> Path:
+        return self.root / f"{day:%Y-%m-%d}.npz"
+
+    def _day_files(self) -> list[Path]:
+        return sorted(self.root.glob("*.npz"))
+
+    @staticmethod
+    def _read_file(path: Path) -> tuple[np.ndarray, KalmanArrays]:
+        with np.load(path) as f:
+            arrays = KalmanArrays(
+                tf_values=[int(v) for v in f["tf_values"]],
+                **{name: f[name] for name in _ARRAY_FIELDS},
+            )
+            return f["timestamp"], arrays
+
+    @staticmethod
+    def _write_file(path: Path, timestamp: np.ndarray, arrays: KalmanArrays) -> None:
+        tmp = path.with_suffix(".npz.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f, timestamp=timestamp, tf_values=np.asarray(arrays.tf_values),
+                **{name: getattr(arrays, name) for name in _ARRAY_FIELDS},
+            )
+        tmp.replace(path)
+
+    def first_timestamp(self) -> Optional[pd.Timestamp]:
+        files = self._day_files()
+        if not files:
+            return None
+        timestamp, _ = self._read_file(files[0])
+        return pd.Timestamp(int(timestamp[0]), tz="UTC") if len(timestamp) else None
+
+    def read(self, since: pd.Timestamp, until: pd.Timestamp) -> tuple[pd.DatetimeIndex, Optional[KalmanArrays]]:
+        """A tárolt sorok [since, until] szelete (csak az érintett napok fájljai nyílnak meg)."""
+        lo, hi = pd.Timestamp(since).value, pd.Timestamp(until).value
+        stamps, parts = [], []
+        for path in self._day_files():
+            day = pd.Timestamp(path.stem, tz="UTC").value
+            if day + _DAY_NS <= lo or day > hi:
+                continue
+            timestamp, arrays = self._read_file(path)
+            a = np.searchsorted(timestamp, lo)
+            b = np.searchsorted(timestamp, hi, side="right")
+            stamps.append(timestamp[a:b])
+            parts.append(arrays[a:b])
+        if not parts:
+            return pd.DatetimeIndex([], tz="UTC"), None
+        index = pd.DatetimeIndex(np.concatenate(stamps), tz="UTC")
+        return index, KalmanArrays.concatenate(parts)
+
+    def _partitions(self, index: pd.DatetimeIndex) -> tuple[np.ndarray, list[tuple[Path, int, int]]]:
+        """Időbélyegek (ns) és a napi partíciók (fájl, [a, b) sor tartomány)."""
+        timestamp = np.asarray(index, dtype="datetime64[ns]").astype(np.int64)
+        days = timestamp // _DAY_NS
+        bounds = np.flatnonzero(np.diff(days)) + 1
+        parts = [
+            (self._day_path(pd.Timestamp(int(days[a]) * _DAY_NS, tz="UTC")), int(a), int(b))
+            for a, b in zip(np.r_[0, bounds], np.r_[bounds, len(days)])
+        ]
+        return timestamp, parts
+
+    def append(self, index: pd.DatetimeIndex, arrays: KalmanArrays) -> None:
+        """
+        Sorok hozzáfűzése; egy érintett nap meglévő sorai közül az első új
+        időbélyegtől kezdődők felülíródnak.
+        """
+        if not len(arrays):
+            return
+        timestamp, parts = self._partitions(index)
+        for path, a, b in parts:
+            stamp, part = timestamp[a:b], arrays[a:b]
+            if path.exists():
+                stored_stamp, stored = self._read_file(path)
+                keep = int(np.searchsorted(stored_stamp, stamp[0]))
+                stamp = np.concatenate([stored_stamp[:keep], stamp])
+                part = KalmanArrays.concatenate([stored[:keep], part])
+            self._write_file(path, stamp, part)
+
+    def replace(self, index: pd.DatetimeIndex, arrays: KalmanArrays) -> int:
+        """
+        A tároló tartalma egy teljes futás sorai legyenek.
+
+        A szűrő kauzális, így az első eltérő nap előtti partíciók változatlanok:
+        csak az első eltérő naptól íródnak újra a fájlok, a futáson kívüli
+        napok törlődnek.
+
+        Returns:
+            az újraírt napok száma
+        """
+        timestamp, parts = self._partitions(index) if len(arrays) else (None, [])
+        wanted = {path for path, _, _ in parts}
+        for path in self._day_files():
+            if path not in wanted:
+                path.unlink()
+
+        changed = False
+        n_written = 0
+        for path, a, b in parts:
+            stamp, part = timestamp[a:b], arrays[a:b]
+            if not changed:
+                changed = not (path.exists() and self._file_equals(path, stamp, part))
+            if changed:
+                self._write_file(path, stamp, part)
+                n_written += 1
+        return n_written
+
+    def _file_equals(self, path: Path, timestamp: np.ndarray, arrays: KalmanArrays) -> bool:
+        stored_stamp, stored = self._read_file(path)
+        return (
+            np.array_equal(stored_stamp, timestamp)
+            and stored.tf_values == list(arrays.tf_values)
+            and all(
+                np.array_equal(getattr(stored, name), getattr(arrays, name), equal_nan=True)
+                for name in _ARRAY_FIELDS
+            )
+        )
+
+    def save_run(self, kf: MultiTFKalmanFilter, index: pd.DatetimeIndex, start: int = 0) -> FilterCheckpoint:
+        """
+        Egy futás eredményének mentése: kf.arrays[start:] a tárolóba, majd
+        a checkpoint. start = 0 (teljes futás) esetén csak az első eltérő
+        naptól íródik újra a tároló (lásd `replace`).
+        """
+        # Írás közbeni megszakadásnál ne maradjon a tárolóhoz nem illő checkpoint
+        self.checkpoint_path.unlink(missing_ok=True)
+        if start == 0:
+            n_days = self.replace(index, kf.arrays)
+            logger.info(f"Állapot tároló: {n_days} nap újraírva")
+        else:
+            self.append(index[start:], kf.arrays[start:])
+        checkpoint = FilterCheckpoint.from_filter(kf, index[-1])
+        checkpoint.save(self.checkpoint_path)
+        logger.info(f"Checkpoint mentve: {checkpoint.last_timestamp} "
+                    f"(fázis {checkpoint.phase}/{checkpoint.period}, {len(index) - start} új sor)")
+        return checkpoint
+
+
+# ── Folytatás ────────────────────────────────────────────────────────────────
+
+
+def resume(
+    kf: MultiTFKalmanFilter,
+    returns: SparseReturns,
+    store: StateStore,
+    checkpoint: Optional[FilterCheckpoint] = None,
+) -> Optional[int]:
+    """
+    Folytatás a checkpointból: a tárolt állapotok az ablak elejétől a
+    checkpointig, utána csak az új sorok szűrése.
+
+    Siker esetén kf.arrays a teljes ablak (tárolt + új sorok), kf állapota
+    a soros teljes futáséval azonos módon frissül.
+
+    Returns:
+        Az első újonnan szűrt sor indexe (len(returns.index), ha nincs új
+        sor), vagy None, ha nem folytatható — ilyenkor teljes futás kell.
+    """
+    checkpoint = checkpoint or store.load_checkpoint()
+    if checkpoint is None:
+        logger.info("Inkrementális futás: nincs checkpoint → teljes futás")
+        return None
+    reason = checkpoint.matches(kf)
+    if reason is None:
+        first = store.first_timestamp()
+        if first is None or first > returns.index[0]:
+            reason = "a tárolt állapotok nem fedik az ablak elejét"
+    if reason is None:
+        start = int(np.searchsorted(returns.minutes, checkpoint.last_step, side="right"))
+        stored_index, stored = store.read(returns.index[0], pd.Timestamp(checkpoint.last_timestamp))
+        if stored is None or not np.array_equal(stored.step_idx, returns.minutes[:start]):
+            reason = "a tárolt sorok nem egyeznek az aktuális adattal"
+    if reason is not None:
+        logger.info(f"Inkrementális futás: {reason} → teljes futás")
+        return None
+
+    checkpoint.restore(kf)
+    parts = [stored]
+    if start < returns.n_rows:
+        parts.append(kf.run(returns[start:], progress_interval=0))
+    kf.arrays = KalmanArrays.concatenate(parts)
+    logger.info(f"Inkrementális futás: {start} tárolt + {returns.n_rows - start} új sor "
+                f"(checkpoint: {checkpoint.last_timestamp})")
+    return start
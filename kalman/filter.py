@@ -6,18 +6,41 @@ Ref: KALMAN_LOG_MULTI_TF.md 5. fejezet (teljes algoritmus)
 
 from __future__ import annotations
 
+import logging
 from dataclasses import dataclass, field
 from typing import Optional
 
 import numpy as np
 import pandas as pd
 
-from .matrices import build_F, build_H_matrix, build_Q, build_R_matrix
+from . import _numba_kernel
+from .history import StateHistory
+from .matrices import build_F, build_Q
+from .patterns import (
+    ObservationPattern,
+    PatternRegistry,
+    active_to_masks,
+    schedule_masks,
+)
+from .riccati import PeriodicRiccati, solve_periodic
+from .sqrt import sqrt_predict, sqrt_update
+from .steady import PeriodicGain
+from config import epoch_minutes
+from data.returns import SparseReturns
+from profiling import annotate, profiled
+
+logger = logging.getLogger(__name__)
+
+_I3 = np.eye(3)
+
+UPDATE_MODES = ("joint", "sequential")
+COVARIANCE_FORMS = ("joseph", "sqrt")
+INIT_MODES = ("diffuse", "riccati")
 
 
 @dataclass
 class KalmanState:
-    """Egy időlépés teljes állapota (history-hoz)."""
+    """Egy időlépés teljes állapota (step() kimenete, history sor)."""
 
     x: np.ndarray                          # [3x1] szűrt állapot
     P: np.ndarray                          # [3x3] kovariancia
@@ -31,6 +54,210 @@ class KalmanState:
     step_idx: int = 0
 
 
+# A KalmanArrays [N x ...] tömb mezői (a tf_values lista nélkül)
+_ARRAY_FIELDS = (
+    "step_idx", "x", "P", "x_pred", "P_pred", "innovation", "S", "K", "mahalanobis", "active",
+)
+
+
+@dataclass
+class KalmanArrays:
+    """
+    Oszlopos (columnar) history: minden mező egy előre lefoglalt tömb.
+
+    A `k` tengely a szűrő összes TF-jét tartalmazza (`tf_values` sorrendben);
+    az inaktív TF-ek oszlopai az `innovation`-ben NaN, `S`/`K`-ban 0.
+    """
+
+    tf_values: list[int]                   # TF-ek percben, a k tengely sorrendje
+    step_idx: np.ndarray                   # [N] lépés index
+    x: np.ndarray                          # [N x 3] szűrt állapot
+    P: np.ndarray                          # [N x 3 x 3] kovariancia
+    x_pred: np.ndarray                     # [N x 3] predikált állapot
+    P_pred: np.ndarray                     # [N x 3 x 3] predikált kovariancia
+    innovation: np.ndarray                 # [N x k] innováció (NaN ha inaktív)
+    S: np.ndarray                          # [N x k x k] innováció kovariancia
+    K: np.ndarray                          # [N x 3 x k] Kalman gain
+    mahalanobis: np.ndarray                # [N] χ² anomália metrika
+    active: np.ndarray                     # [N x k] bool — mely TF-ek frissültek
+
+    @classmethod
+    def allocate(cls, n_steps: int, tf_values: list[int]) -> KalmanArrays:
+        """Üres (előre lefoglalt) tároló N lépésre."""
+        k = len(tf_values)
+        return cls(
+            tf_values=list(tf_values),
+            step_idx=np.arange(n_steps),
+            x=np.zeros((n_steps, 3)),
+            P=np.zeros((n_steps, 3, 3)),
+            x_pred=np.zeros((n_steps, 3)),
+            P_pred=np.zeros((n_steps, 3, 3)),
+            innovation=np.full((n_steps, k), np.nan),
+            S=np.zeros((n_steps, k, k)),
+            K=np.zeros((n_steps, 3, k)),
+            mahalanobis=np.zeros(n_steps),
+            active=np.zeros((n_steps, k), dtype=bool),
+        )
+
+    @classmethod
+    def from_history(
+        cls,
+        history: list[KalmanState],
+        tf_values: Optional[list[int]] = None,
+    ) -> KalmanArrays:
+        """
+        KalmanState lista → oszlopos tároló.
+
+        tf_values=None esetén a history-ban előforduló aktív TF-ekből áll össze.
+        """
+        if tf_values is None:
+            tf_values = sorted({n for st in history for n in st.active_tf_minutes})
+        arrays = cls.allocate(len(history), tf_values)
+        col_of = {n: j for j, n in enumerate(arrays.tf_values)}
+        for i, st in enumerate(history):
+            arrays.write(
+                i, st.step_idx, st.x, st.P, st.x_pred, st.P_pred,
+                [col_of[n] for n in st.active_tf_minutes],
+                st.innovation, st.S, st.K, st.mahalanobis,
+            )
+        return arrays
+
+    @classmethod
+    def concatenate(cls, parts: list[KalmanArrays]) -> KalmanArrays:
+        """Egymást követő szakaszok összefűzése (azonos tf_values mellett)."""
+        if not parts:
+            raise ValueError("Legalább egy szakasz szükséges")
+        tf_values = parts[0].tf_values
+        if any(p.tf_values != tf_values for p in parts):
+            raise ValueError("A szakaszok TF-jei eltérnek")
+        return cls(tf_values=list(tf_values), **{
+            name: np.concatenate([getattr(p, name) for p in parts])
+            for name in _ARRAY_FIELDS
+        })
+
+    def write(
+        self,
+        i: int,
+        step_idx: int,
+        x: np.ndarray,
+        P: np.ndarray,
+        x_pred: np.ndarray,
+        P_pred: np.ndarray,
+        cols: list[int],
+        innovation: Optional[np.ndarray],
+        S: Optional[np.ndarray],
+        K: Optional[np.ndarray],
+        mahalanobis: float,
+    ) -> None:
+        """Egy lépés beírása az i. sorba (cols: az aktív TF-ek oszlopai)."""
+        self.step_idx[i] = step_idx
+        self.x[i] = x[:, 0]
+        self.P[i] = P
+        self.x_pred[i] = x_pred[:, 0]
+        self.P_pred[i] = P_pred
+        self.mahalanobis[i] = mahalanobis
+        if innovation is not None:
+            self.active[i, cols] = True
+            self.innovation[i, cols] = innovation[:, 0]
+            self.S[i][np.ix_(cols, cols)] = S
+            self.K[i][:, cols] = K
+
+    def clear(self) -> None:
+        """A mérésfüggő mezők visszaállítása üres (inaktív) értékre."""
+        self.innovation[:] = np.nan
+        self.S[:] = 0.0
+        self.K[:] = 0.0
+        self.active[:] = False
+
+    def __len__(self) -> int:
+        return len(self.step_idx)
+
+    def __getitem__(self, key: slice) -> KalmanArrays:
+        """Szeletelés (pl. burn-in levágás) — nézeteket ad vissza, nem másol."""
+        if not isinstance(key, slice):
+            raise TypeError("KalmanArrays csak slice-szal indexelhető; egy lépés: state(i)")
+        return KalmanArrays(
+            tf_values=self.tf_values,
+            **{name: getattr(self, name)[key] for name in _ARRAY_FIELDS},
+        )
+
+    @property
+    def n_active(self) -> np.ndarray:
+        """[N] aktív TF-ek száma lépésenként."""
+        return self.active.sum(axis=1)
+
+    def to_states_df(self, index: pd.DatetimeIndex) -> pd.DataFrame:
+        """Oszlopos history → states DataFrame a vizualizációkhoz."""
+        df = pd.DataFrame({
+            "mu_hat": self.x[:, 0],
+            "mu_dot_hat": self.x[:, 1],
+            "mu_ddot_hat": self.x[:, 2],
+            "P00": self.P[:, 0, 0],
+            "P11": self.P[:, 1, 1],
+            "P22": self.P[:, 2, 2],
+            "P01": self.P[:, 0, 1],
+            "P02": self.P[:, 0, 2],
+            "P12": self.P[:, 1, 2],
+            "mahalanobis": self.mahalanobis,
+            "n_active_tfs": self.n_active,
+        })
+        if len(df) == len(index):
+            df.index = index
+        return df
+
+    def state(self, i: int) -> KalmanState:
+        """Az i. lépés visszaalakítása KalmanState-té."""
+        cols = np.flatnonzero(self.active[i])
+        has_meas = cols.size > 0
+        return KalmanState(
+            x=self.x[i].reshape(3, 1).copy(),
+            P=self.P[i].copy(),
+            x_pred=self.x_pred[i].reshape(3, 1).copy(),
+            P_pred=self.P_pred[i].copy(),
+            innovation=self.innovation[i, cols].reshape(-1, 1) if has_meas else None,
+            S=self.S[i][np.ix_(cols, cols)] if has_meas else None,
+            K=self.K[i][:, cols] if has_meas else None,
+            mahalanobis=float(self.mahalanobis[i]),
+            active_tf_minutes=[self.tf_values[j] for j in cols],
+            step_idx=int(self.step_idx[i]),
+        )
+
+
+def _readonly(a: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """Csak olvasható nézet (adatmásolás nélkül)."""
+    if a is None:
+        return None
+    view = a.view()
+    view.flags.writeable = False
+    return view
+
+
+def returns_to_matrix(
+    returns: SparseReturns | dict[str, pd.Series],
+    tf_minutes: dict[str, int],
+) -> tuple[np.ndarray, list[int]]:
+    """
+    compute_log_returns() output → egyetlen [N x k] mérésmátrix.
+
+    Az oszlopok TF percek szerint növekvő sorrendben vannak; a hiányzó
+    TF oszlopa csupa NaN. Sűrű (1m indexre kiterített) Series dict is
+    elfogadott.
+
+    Returns:
+        (Z, tf_values)
+    """
+    labels = sorted(tf_minutes, key=lambda t: tf_minutes[t])
+    if isinstance(returns, SparseReturns):
+        return returns.to_matrix(labels), [tf_minutes[t] for t in labels]
+    base_tf = labels[0]
+    n_steps = len(returns[base_tf])
+    Z = np.full((n_steps, len(labels)), np.nan)
+    for j, tf_label in enumerate(labels):
+        if tf_label in returns:
+            Z[:, j] = returns[tf_label].to_numpy(dtype=float)
+    return Z, [tf_minutes[t] for t in labels]
+
+
 class MultiTFKalmanFilter:
     """
     Multi-timeframe Kalman-szűrő BTC log hozamokhoz.
@@ -48,9 +275,20 @@ class MultiTFKalmanFilter:
         r_mode: str = "full",
         P0_scale: float = 100.0,
         dt: float = 1.0,
+        steady_state: bool = False,
+        steady_tol: float = 1e-9,
+        backend: str = "auto",
+        update_mode: str = "joint",
+        covariance_form: str = "joseph",
+        init: str = "diffuse",
+        history_policy: Optional[str] = None,
+        history_size: Optional[int] = None,
+        history_fields: Optional[tuple[str, ...]] = None,
     ):
         self.tf_minutes = tf_minutes
         self.all_tf_values = sorted(tf_minutes.values())
+        # TF perc → címke (step() mérés-szótárához), egyszer felépítve
+        self._label_of = {n: label for label, n in tf_minutes.items()}
         self.q = q
         self.sigma2_1m = sigma2_1m
         self.h_mode = h_mode
@@ -60,12 +298,59 @@ class MultiTFKalmanFilter:
         # Konstans mátrixok
         self.F = build_F(dt)
         self.Q = build_Q(q, dt)
+        # Rés-ugrások: lépésszám → (F(n·dt), Q(n·dt), chol Q) gyorsítótár
+        self._transitions: dict[int, tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]] = {}
+
+        # H / Hᵀ / R mintánként, egyszer felépítve
+        self.patterns = PatternRegistry(self.all_tf_values, sigma2_1m, h_mode, r_mode)
+
+        # Periodikus steady-state gain (opcionális gyors út)
+        # Batch backend: a numba kernel (ha telepítve) a teljes forward pass-t
+        # fordított kódban futtatja; a steady-state gyors út és a sqrt forma NumPy marad
+        self.backend = _numba_kernel.resolve_backend(backend)
+
+        # Update mód: "joint" (k x k S inverz) vagy "sequential" (fehérített
+        # skalár frissítések, mátrix inverz nélkül)
+        if update_mode not in UPDATE_MODES:
+            raise ValueError(f"Ismeretlen update mód: {update_mode} ({UPDATE_MODES})")
+        self.update_mode = update_mode
+
+        # Kovariancia forma: "joseph" (P + _stabilize_P) vagy "sqrt" (P = L Lᵀ
+        # faktor Householder / Potter lépésekkel; update_mode-tól függetlenül
+        # fehérített skalár mérésekkel frissít)
+        if covariance_form not in COVARIANCE_FORMS:
+            raise ValueError(f"Ismeretlen kovariancia forma: {covariance_form} ({COVARIANCE_FORMS})")
+        self.covariance_form = covariance_form
+        self._L_Q = np.linalg.cholesky(self.Q) if covariance_form == "sqrt" else None
+        self._factors: list[tuple[np.ndarray, np.ndarray]] = []
+
+        self.steady_state = steady_state
+        self._gain: Optional[PeriodicGain] = None
+        if steady_state:
+            period = self.patterns.period
+            self._gain = PeriodicGain(
+                self.F,
+                schedule_masks(self.all_tf_values, np.arange(period)),
+                tol=steady_tol,
+            )
 
-        # Állapot inicializálás
-        self.x = np.zeros((3, 1))
-        self.P = np.eye(3) * P0_scale
-
-        self.history: list[KalmanState] = []
+        # Állapot inicializálás: "diffuse" = P0 = eye · P0_scale (burn-in kell),
+        # "riccati" = a periodikus steady-state P az első lépés fázisában
+        if init not in INIT_MODES:
+            raise ValueError(f"Ismeretlen init mód: {init} ({INIT_MODES})")
+        self.init = init
+        self.P0_scale = P0_scale
+        self._riccati: Optional[PeriodicRiccati] = None
+        self.reset()
+
+        # step() history: none / ring / full, előre lefoglalt tömbökben
+        # (politika nélkül: history_size → ring, különben full)
+        if history_policy is None:
+            history_policy = "full" if history_size is None else "ring"
+        self.history = StateHistory(
+            self.all_tf_values, history_policy, history_size, history_fields,
+        )
+        self.arrays: Optional[KalmanArrays] = None
 
     def _get_active_tfs(self, step_idx: int) -> list[int]:
         """Mely TF-ek frissülnek az adott lépésben."""
@@ -73,41 +358,133 @@ class MultiTFKalmanFilter:
 
     def predict(self) -> tuple[np.ndarray, np.ndarray]:
         """Predikciós lépés. Returns: (x_pred, P_pred)."""
+        if self.covariance_form == "sqrt":
+            x_pred, L_pred = sqrt_predict(self.x, self._factor(self.P), self.F, self._L_Q)
+            P_pred = L_pred @ L_pred.T
+            self._remember_factor(P_pred, L_pred)
+            return x_pred, P_pred
         x_pred = self.F @ self.x
         P_pred = self.F @ self.P @ self.F.T + self.Q
         return x_pred, P_pred
 
+    def transition(self, n_steps: int) -> tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """
+        n lépés egyben: (F(n·dt), Q(n·dt), Q Cholesky faktora sqrt formánál).
+
+        F(a)·F(b) = F(a+b), és az integrált folytonos Q-ra
+        F(a) Q(b) F(a)ᵀ + Q(a) = Q(a+b) — így egy mérés nélküli rés
+        egyetlen propagációval ugorható át, pontosan.
+        """
+        entry = self._transitions.get(n_steps)
+        if entry is None:
+            F = build_F(n_steps * self.dt)
+            Q = build_Q(self.q, n_steps * self.dt)
+            L_Q = np.linalg.cholesky(Q) if self.covariance_form == "sqrt" else None
+            entry = self._transitions[n_steps] = (F, Q, L_Q)
+        return entry
+
+    def skip(self, n_steps: int) -> None:
+        """Mérés nélküli propagáció n lépésen át (rés a gyertyafolyamban)."""
+        if n_steps <= 0:
+            return
+        F, Q, L_Q = self.transition(n_steps)
+        if self.covariance_form == "sqrt":
+            self.x, L = sqrt_predict(self.x, self._factor(self.P), F, L_Q)
+            self.P = L @ L.T
+            self._remember_factor(self.P, L)
+        else:
+            self.x = F @ self.x
+            self.P = F @ self.P @ F.T + Q
+            self._stabilize_P()
+        if self._gain is not None and self._gain.frozen:
+            self._gain.reset()
+
+    def set_state(self, x: np.ndarray, P: np.ndarray, step_idx: Optional[int] = None) -> None:
+        """
+        Melegindítás: (x, P) beállítása.
+
+        Args:
+            x: [3] vagy [3x1] állapot
+            P: [3x3] kovariancia
+            step_idx: a lépés, amelyhez az állapot tartozik (a következő
+                      lépés előtti rés innen számolódik; None = nincs)
+        """
+        self.x = np.asarray(x, dtype=float).reshape(3, 1).copy()
+        self.P = np.asarray(P, dtype=float).copy()
+        self.last_step = step_idx
+        self._riccati = None
+        if self._gain is not None and self._gain.frozen:
+            self._gain.reset()
+
+    def reset(self) -> None:
+        """Hidegindítás: x = 0, P = P0 (diffúz vagy Riccati init), nincs utolsó lépés."""
+        self.x = np.zeros((3, 1))
+        self.P = np.eye(3) * self.P0_scale
+        self._riccati = None
+        if self.init == "riccati":
+            self._riccati = solve_periodic(
+                tuple(self.all_tf_values), self.q, self.sigma2_1m, self.h_mode, self.r_mode, self.dt,
+            )
+        # Az utolsó feldolgozott lépés indexe (None = még nem futott)
+        self.last_step: Optional[int] = None
+        self._factors = []
+        if self._gain is not None and self._gain.frozen:
+            self._gain.reset()
+
+    def _advance_to(self, step_idx: int) -> None:
+        """Az előző lépés és `step_idx` közötti rés átugrása (első lépésnél a Riccati init)."""
+        if self.last_step is None:
+            if self._riccati is not None:
+                self.P = self._riccati.posterior(step_idx - 1)
+                self._riccati = None
+            return
+        if step_idx - self.last_step > 1:
+            self.skip(step_idx - self.last_step - 1)
+
     def update(
         self,
         x_pred: np.ndarray,
         P_pred: np.ndarray,
         z: np.ndarray,
-        active_tfs: list[int],
+        active_tfs: list[int] | ObservationPattern,
     ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, float]:
         """
         Korrekciós lépés.
 
+        Args:
+            active_tfs: aktív TF-ek percben, vagy a regiszterből kikeresett minta
+
         Returns:
             (x_updated, P_updated, innovation, S, K, mahalanobis)
         """
-        H = build_H_matrix(active_tfs, self.h_mode)
-        R = build_R_matrix(active_tfs, self.sigma2_1m, self.r_mode)
+        if not isinstance(active_tfs, ObservationPattern):
+            active_tfs = self.patterns.for_tfs(active_tfs)
+        if self.covariance_form == "sqrt":
+            x_upd, L_upd, innovation, S, K, mahal = sqrt_update(
+                x_pred, self._factor(P_pred), z, active_tfs,
+            )
+            P_upd = L_upd @ L_upd.T
+            self._remember_factor(P_upd, L_upd)
+            return x_upd, P_upd, innovation, S, K, mahal
+        if self.update_mode == "sequential":
+            return self._update_sequential(x_pred, P_pred, z, active_tfs)
+        H, H_T, R = active_tfs.H, active_tfs.H_T, active_tfs.R
 
         # Innováció
         innovation = z - H @ x_pred  # [kx1]
 
         # Innováció kovariancia
-        S = H @ P_pred @ H.T + R  # [kxk]
+        S = H @ P_pred @ H_T + R  # [kxk]
 
         # Kalman gain
         try:
             S_inv = np.linalg.inv(S)
         except np.linalg.LinAlgError:
             S_inv = np.linalg.pinv(S)
-        K = P_pred @ H.T @ S_inv  # [3xk]
+        K = P_pred @ H_T @ S_inv  # [3xk]
 
         # Állapot update (Joseph-forma a numerikus stabilitásért)
-        I_KH = np.eye(3) - K @ H
+        I_KH = _I3 - K @ H
         x_upd = x_pred + K @ innovation
         P_upd = I_KH @ P_pred @ I_KH.T + K @ R @ K.T
 
@@ -116,121 +493,440 @@ class MultiTFKalmanFilter:
 
         return x_upd, P_upd, innovation, S, K, mahal
 
+    def _update_sequential(
+        self,
+        x_pred: np.ndarray,
+        P_pred: np.ndarray,
+        z: np.ndarray,
+        pattern: ObservationPattern,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, float]:
+        """
+        Korrekció k skalár frissítéssel a fehérített méréseken.
+
+        z̃ = W z, H̃ = W H (W R Wᵀ = I), így a fehérített mérések zaja
+        független, egységnyi szórású: soronként s = h̃ P h̃ᵀ + 1,
+        g = P h̃ᵀ / s, x += g ν̃, P −= g gᵀ s — mátrix inverz nélkül.
+        A Mahalanobis-távolság a skalár innovációkból összegződik
+        (Σ ν̃²/s = νᵀ S⁻¹ ν).
+
+        A history-hoz az eredeti ν, S és a teljes K = P⁺ H̃ᵀ W is előáll.
+        """
+        # 3x3 skalár algebra Python float-okon: k apró NumPy hívásnál gyorsabb
+        x0, x1, x2 = x_pred[:, 0].tolist()
+        (p00, p01, p02), (_, p11, p12), (_, _, p22) = P_pred.tolist()
+        mahal = 0.0
+        for (h0, h1, h2), zi in zip(pattern.H_w.tolist(), (pattern.W @ z[:, 0]).tolist()):
+            a0 = p00 * h0 + p01 * h1 + p02 * h2          # P h̃ᵀ
+            a1 = p01 * h0 + p11 * h1 + p12 * h2
+            a2 = p02 * h0 + p12 * h1 + p22 * h2
+            inv_s = 1.0 / (h0 * a0 + h1 * a1 + h2 * a2 + 1.0)
+            nu = zi - (h0 * x0 + h1 * x1 + h2 * x2)
+            g0, g1, g2 = a0 * inv_s, a1 * inv_s, a2 * inv_s
+            x0 += g0 * nu
+            x1 += g1 * nu
+            x2 += g2 * nu
+            p00 -= g0 * a0
+            p01 -= g0 * a1
+            p02 -= g0 * a2
+            p11 -= g1 * a1
+            p12 -= g1 * a2
+            p22 -= g2 * a2
+            mahal += nu * nu * inv_s
+        x = np.array([[x0], [x1], [x2]])
+        P = np.array([[p00, p01, p02], [p01, p11, p12], [p02, p12, p22]])
+
+        H = pattern.H
+        innovation = z - H @ x_pred
+        S = H @ P_pred @ pattern.H_T + pattern.R
+        K = P @ pattern.H_w.T @ pattern.W
+        return x, P, innovation, S, K, mahal
+
+    def _factor(self, P: np.ndarray) -> np.ndarray:
+        """
+        P egy négyzetgyöke, P = L Lᵀ (sqrt forma).
+
+        A predict / update által épp előállított (P, L) párok azonosság
+        szerint gyorsítótárazva; kívülről beállított P-re (kezdeti érték,
+        fagyasztott gain, numba kimenet) egyszeri Cholesky.
+        """
+        for P_c, L_c in self._factors:
+            if P_c is P:
+                return L_c
+        return np.linalg.cholesky(P)
+
+    def _remember_factor(self, P: np.ndarray, L: np.ndarray) -> None:
+        self._factors = [*self._factors[-1:], (P, L)]
+
     def _stabilize_P(self) -> None:
         """P mátrix pozitív definitség biztosítása."""
+        if self.covariance_form == "sqrt":
+            return          # P = L Lᵀ: szimmetrikus, pozitív szemidefinit
         self.P = (self.P + self.P.T) / 2.0
         eigvals = np.linalg.eigvalsh(self.P)
         if eigvals.min() < 1e-12:
-            self.P += np.eye(3) * 1e-12
+            self.P += _I3 * 1e-12
 
-    def step(self, step_idx: int, measurements: dict[str, float]) -> KalmanState:
+    def step(
+        self,
+        step_idx: int,
+        measurements: dict[str, float],
+        return_state: bool = True,
+    ) -> Optional[KalmanState]:
         """
         Egy teljes lépés: predict + update (ha van mérés).
 
+        A visszaadott KalmanState a szűrő aktuális tömbjeire mutató, csak
+        olvasható nézet (másolás nélkül), a következő step()-ig érvényes;
+        megőrzéshez a history (vagy a hívó) másol.
+
         Args:
-            step_idx: hányadik perces lépés (0-tól)
+            step_idx: hányadik perces lépés (pl. epoch perc); ha az előző
+                      lépéshez képest rés van, előbb egy F(dt) / Q(dt) ugrás
             measurements: {'1m': 0.001, '5m': 0.005, ...} — az elérhető mérések
+            return_state: False = nincs KalmanState (csak a history-ba ír)
         """
-        # Predikció
-        x_pred, P_pred = self.predict()
+        self._advance_to(step_idx)
 
         # Aktív TF-ek meghatározása
         active_tfs = self._get_active_tfs(step_idx)
 
         # Mérésvektor összeállítása (csak ami ténylegesen rendelkezésre áll)
-        tf_minutes_to_label = {v: k for k, v in self.tf_minutes.items()}
         available = []
         z_vals = []
         for n in active_tfs:
-            label = tf_minutes_to_label.get(n)
+            label = self._label_of.get(n)
             if label and label in measurements and np.isfinite(measurements[label]):
                 available.append(n)
                 z_vals.append(measurements[label])
 
-        if available:
-            z = np.array(z_vals).reshape(-1, 1)
-            x_upd, P_upd, innov, S, K, mahal = self.update(
-                x_pred, P_pred, z, available,
-            )
-            self.x = x_upd
-            self.P = P_upd
+        z = np.array(z_vals).reshape(-1, 1) if available else None
+        mask = self.patterns.mask_of(available)
+        gain = self._gain
+
+        if gain is not None and gain.frozen and gain.matches(step_idx, mask):
+            # Fagyasztott periodikus gain → csak x-frissítés
+            p = gain.phase(step_idx)
+            self.x, x_pred, innov, mahal = gain.frozen_update(step_idx, self.x, z)
+            self.P = gain.P[p]
+            P_pred, S, K = gain.P_pred[p], gain.S[p], gain.K[p]
         else:
-            # Nincs mérés → csak predikció
-            self.x = x_pred
-            self.P = P_pred
-            innov, S, K, mahal = None, None, None, 0.0
-
-        self._stabilize_P()
-
-        state = KalmanState(
-            x=self.x.copy(),
-            P=self.P.copy(),
-            x_pred=x_pred.copy(),
-            P_pred=P_pred.copy(),
-            innovation=innov.copy() if innov is not None else None,
-            S=S.copy() if S is not None else None,
-            K=K.copy() if K is not None else None,
+            if gain is not None and gain.frozen:
+                gain.reset()
+
+            # Predikció
+            x_pred, P_pred = self.predict()
+
+            pattern = None
+            if available:
+                pattern = self.patterns.get(mask)
+                x_upd, P_upd, innov, S, K, mahal = self.update(
+                    x_pred, P_pred, z, pattern,
+                )
+                self.x = x_upd
+                self.P = P_upd
+            else:
+                # Nincs mérés → csak predikció
+                self.x = x_pred
+                self.P = P_pred
+                innov, S, K, mahal = None, None, None, 0.0
+
+            self._stabilize_P()
+
+            if gain is not None:
+                gain.observe(step_idx, mask, pattern, P_pred, self.P, K, S)
+
+        self.last_step = step_idx
+        cols = self.patterns.get(mask).cols if mask else []
+        self.history.append(
+            step_idx, self.x, self.P, x_pred, P_pred,
+            cols, innov, S, K, mahal,
+        )
+        if not return_state:
+            return None
+        return KalmanState(
+            x=_readonly(self.x),
+            P=_readonly(self.P),
+            x_pred=_readonly(x_pred),
+            P_pred=_readonly(P_pred),
+            innovation=_readonly(innov),
+            S=_readonly(S),
+            K=_readonly(K),
             mahalanobis=mahal,
-            active_tf_minutes=available if available else [],
+            active_tf_minutes=available,
             step_idx=step_idx,
         )
-        self.history.append(state)
-        return state
 
     def run(
         self,
-        returns: dict[str, pd.Series],
+        returns: SparseReturns | dict[str, pd.Series],
         progress_interval: int = 1000,
-    ) -> list[KalmanState]:
+    ) -> KalmanArrays:
         """
         A szűrő futtatása az összes adaton.
 
+        A hozamokat egyszer egy [N x k] mérésmátrixba emeli ki, és az
+        eredményt oszlopos tárolóba (`self.arrays`) írja — a per-lépés
+        history (`self.history`) csak a `step()` úton töltődik. A lépés
+        index az index epoch perce: a TF ütemezés az időbélyegből adódik,
+        a hiányzó percek pedig egyetlen F(dt) / Q(dt) ugrással kerülnek át.
+        SparseReturns esetén az aktív maszk a bitmaszkból jön.
+
         Args:
             returns: compute_log_returns() outputja
             progress_interval: hány lépésenként logoljon
         """
-        import logging
-        logger = logging.getLogger(__name__)
+        Z, _ = returns_to_matrix(returns, self.tf_minutes)
+        if isinstance(returns, SparseReturns):
+            labels = sorted(self.tf_minutes, key=self.tf_minutes.get)
+            return self.run_matrix(
+                Z, progress_interval=progress_interval,
+                minutes=returns.minutes, active=returns.active(labels),
+            )
+        base_tf = min(self.tf_minutes, key=self.tf_minutes.get)
+        minutes = epoch_minutes(returns[base_tf].index)
+        return self.run_matrix(Z, progress_interval=progress_interval, minutes=minutes)
+
+    @profiled("kalman.filter.run_matrix")
+    def run_matrix(
+        self,
+        Z: np.ndarray,
+        progress_interval: int = 1000,
+        minutes: Optional[np.ndarray] = None,
+        active: Optional[np.ndarray] = None,
+    ) -> KalmanArrays:
+        """
+        Batch futtatás egy előre kinyert mérésmátrixon.
+
+        Args:
+            Z: [N x k] mérések, oszlopok `self.all_tf_values` sorrendben,
+               NaN ahol nincs mérés
+            progress_interval: hány lépésenként logoljon
+            minutes: [N] szigorúan növekvő lépés indexek (epoch perc);
+                     None = 0..N-1. Az ütemezés `minutes % n == 0`, és
+                     minden rés (és az előző futás óta eltelt idő) előtt
+                     egy F(dt) / Q(dt) ugrás fut.
+            active: [N x k] bool aktív maszk (pl. SparseReturns.active());
+                    None = ütemezés ÉS véges mérés Z-ből
+        """
+        n_steps = Z.shape[0]
+        tf_values = self.all_tf_values
+        if Z.shape[1] != len(tf_values):
+            raise ValueError(
+                f"Z oszlopszáma ({Z.shape[1]}) != TF-ek száma ({len(tf_values)})"
+            )
+        if minutes is None:
+            steps = np.arange(n_steps, dtype=np.int64)
+        else:
+            steps = np.asarray(minutes, dtype=np.int64)
+            if steps.shape != (n_steps,):
+                raise ValueError(f"minutes hossza ({steps.size}) != Z sorainak száma ({n_steps})")
+        gaps = np.diff(steps)
+        if np.any(gaps <= 0):
+            raise ValueError("A lépés indexeknek szigorúan növekvőnek kell lenniük")
+
+        # Sűrű (rés nélküli) szakaszok határai
+        bounds = np.flatnonzero(gaps > 1) + 1
+        gap_info = f", {bounds.size} rés (F(dt) / Q(dt) ugrással)" if bounds.size else ""
+        logger.info(f"Szűrő futtatás: {n_steps} lépés{gap_info}")
+
+        if active is None:
+            # Aktív maszk egyben: ütemezés (step % n == 0) ÉS véges mérés
+            schedule = steps[:, None] % np.asarray(tf_values)[None, :] == 0
+            active = schedule & np.isfinite(Z)
+        elif active.shape != Z.shape:
+            raise ValueError(f"active alakja ({active.shape}) != Z alakja ({Z.shape})")
+        arrays = KalmanArrays.allocate(n_steps, tf_values)
+        arrays.step_idx[:] = steps
+
+        backends = set()
+        if n_steps:
+            for s, e in zip([0, *bounds], [*bounds, n_steps]):
+                self._advance_to(int(steps[s]))
+                backends.add(self._run_segment(
+                    Z[s:e], active[s:e], arrays[s:e], int(steps[s]),
+                    progress_interval, s, n_steps,
+                ))
+                self.last_step = int(steps[e - 1])
+
+        self.arrays = arrays
+        suffix = " (numba)" if backends == {"numba"} else ""
+        annotate(backend="+".join(sorted(backends)), gaps=int(bounds.size))
+        logger.info(f"Szűrő kész: {n_steps} állapot{suffix}")
+        return arrays
+
+    def _run_segment(
+        self,
+        Z: np.ndarray,
+        active: np.ndarray,
+        arrays: KalmanArrays,
+        t0: int,
+        progress_interval: int,
+        row0: int,
+        n_total: int,
+    ) -> str:
+        """
+        Egy sűrű szakasz szűrése: az i. sor lépés indexe t0 + i.
 
-        base_tf = min(self.tf_minutes, key=lambda k: self.tf_minutes[k])
-        base_series = returns[base_tf]
-        n_steps = len(base_series)
+        Z / active / arrays a teljes futás [row0, row0 + len) sorainak nézetei.
 
-        logger.info(f"Szűrő futtatás: {n_steps} lépés")
+        Returns:
+            a szakaszt futtató backend ("numba" / "numpy")
+        """
+        if self.backend == "numba" and self._gain is None and self.covariance_form == "joseph":
+            if self._run_numba(Z, active, arrays):
+                return "numba"
+            arrays.clear()
+
+        n_steps = Z.shape[0]
+        masks = active_to_masks(active)
+
+        gain = self._gain
+        matches = None
+        if gain is not None:
+            matches = masks == gain.sched[(t0 + np.arange(n_steps)) % gain.period]
+
+        i = 0
+        while i < n_steps:
+            if gain is not None and gain.frozen:
+                i = self._run_frozen(Z, matches, i, arrays, t0)
+                continue
+
+            x_pred, P_pred = self.predict()
+
+            cols: list[int] = []
+            pattern = None
+            mask = int(masks[i])
+            if mask:
+                pattern = self.patterns.get(mask)
+                cols = pattern.cols
+                z = Z[i, cols].reshape(-1, 1)
+                x_upd, P_upd, innov, S, K, mahal = self.update(
+                    x_pred, P_pred, z, pattern,
+                )
+                self.x = x_upd
+                self.P = P_upd
+            else:
+                self.x = x_pred
+                self.P = P_pred
+                innov, S, K, mahal = None, None, None, 0.0
+
+            self._stabilize_P()
+
+            arrays.write(
+                i, t0 + i, self.x, self.P, x_pred, P_pred,
+                cols, innov, S, K, mahal,
+            )
 
-        for i in range(n_steps):
-            # Összegyűjtjük az elérhető méréseket
-            meas: dict[str, float] = {}
-            for tf_label, series in returns.items():
-                val = series.iloc[i]
-                if np.isfinite(val):
-                    meas[tf_label] = val
+            if gain is not None and gain.observe(t0 + i, mask, pattern, P_pred, self.P, K, S):
+                logger.info(f"  Steady-state: periodikus gain befagyasztva ({row0 + i + 1}. lépés)")
 
-            self.step(i, meas)
+            if progress_interval and (row0 + i + 1) % progress_interval == 0:
+                logger.info(f"  {row0 + i + 1}/{n_total} lépés kész")
+            i += 1
+        return "numpy"
 
-            if progress_interval and (i + 1) % progress_interval == 0:
-                logger.info(f"  {i + 1}/{n_steps} lépés kész")
+    def _run_numba(self, Z: np.ndarray, active: np.ndarray, arrays: KalmanArrays) -> bool:
+        """
+        Forward pass a numba kernellel, közvetlenül `arrays`-be.
 
-        logger.info(f"Szűrő kész: {len(self.history)} állapot")
-        return self.history
+        Returns:
+            False ha egy S nem pozitív definit — ekkor a NumPy út fut
+            (pinv tartalékkal), az x / P állapot változatlan
+        """
+        full = self.patterns.get(self.patterns.mask_of(self.all_tf_values))
+        Z = np.ascontiguousarray(Z, dtype=float)
+        x0, P0 = self.x[:, 0].copy(), self.P.copy()
+        outputs = (
+            arrays.x, arrays.P, arrays.x_pred, arrays.P_pred,
+            arrays.innovation, arrays.S, arrays.K, arrays.mahalanobis,
+        )
+        if self.update_mode == "sequential":
+            failed = _numba_kernel.forward_pass_sequential(
+                Z, active, self.F, self.Q, full.H, full.R,
+                np.asarray(self.all_tf_values, dtype=float), float(np.sqrt(self.sigma2_1m)),
+                self.r_mode == "full", x0, P0, *outputs,
+            )
+        else:
+            failed = _numba_kernel.forward_pass(
+                Z, active, self.F, self.Q, full.H, full.R, x0, P0, *outputs,
+            )
+        if failed >= 0:
+            logger.warning(f"numba: S nem pozitív definit ({failed}. lépés) → NumPy útvonal")
+            return False
+        arrays.active[:] = active
+        if len(arrays):
+            self.x = arrays.x[-1].reshape(3, 1).copy()
+            self.P = arrays.P[-1].copy()
+        return True
+
+    def _run_frozen(
+        self,
+        Z: np.ndarray,
+        matches: np.ndarray,
+        start: int,
+        arrays: KalmanArrays,
+        t0: int = 0,
+    ) -> int:
+        """
+        Fagyasztott gain-es szakasz a következő ütemezéstől eltérő lépésig.
+
+        A sorok a t0-tól induló sűrű szakaszhoz tartoznak (i. sor = t0 + i
+        lépés); a gain fázisa az abszolút lépés indexből adódik.
+
+        Returns:
+            a következő sor indexe, amely teljes propagációt igényel
+        """
+        gain = self._gain
+        T = gain.period
+        n_steps = Z.shape[0]
+        mismatch = np.flatnonzero(~matches[start:])
+        stop = start + int(mismatch[0]) if mismatch.size else n_steps
+
+        def frozen_step(i: int, x: np.ndarray) -> np.ndarray:
+            t = t0 + i
+            p = t % T
+            pattern = gain.patterns[p]
+            cols = pattern.cols if pattern is not None else []
+            z = Z[i, cols].reshape(-1, 1) if cols else None
+            x_upd, x_pred, innov, mahal = gain.frozen_update(t, x, z)
+            arrays.write(
+                i, t, x_upd, gain.P[p], x_pred, gain.P_pred[p],
+                cols, innov, gain.S[p], gain.K[p], mahal,
+            )
+            return x_upd
+
+        # Fej: a következő periódushatárig lépésenként
+        x = self.x
+        i = start
+        while i < stop and (t0 + i) % T:
+            x = frozen_step(i, x)
+            i += 1
+
+        # Teljes periódusok vektorizáltan
+        n_blocks = (stop - i) // T
+        if n_blocks:
+            x = gain.run_blocks(Z, x[:, 0], i, n_blocks, arrays, step0=t0).reshape(3, 1)
+            i += n_blocks * T
+
+        # Farok
+        while i < stop:
+            x = frozen_step(i, x)
+            i += 1
+
+        self.x = x
+        self.P = gain.P[(t0 + stop - 1) % T].copy()
+
+        if stop < n_steps:
+            logger.info(f"  Steady-state: hiányzó mérés ({t0 + stop}. lépés) → teljes propagáció")
+            gain.reset()
+        return stop
+
+    def get_arrays(self) -> KalmanArrays:
+        """Az utolsó futás oszlopos history-ja (step()-es futásnál a history-ból)."""
+        if self.arrays is not None:
+            return self.arrays
+        return self.history.to_arrays()
 
     def get_states_df(self, index: pd.DatetimeIndex) -> pd.DataFrame:
         """History → DataFrame a vizualizációkhoz."""
-        records = []
-        for st in self.history:
-            rec = {
-                "mu_hat": st.x[0, 0],
-                "mu_dot_hat": st.x[1, 0],
-                "mu_ddot_hat": st.x[2, 0],
-                "P00": st.P[0, 0],
-                "P11": st.P[1, 1],
-                "P22": st.P[2, 2],
-                "mahalanobis": st.mahalanobis,
-                "n_active_tfs": len(st.active_tf_minutes),
-            }
-            records.append(rec)
-
-        df = pd.DataFrame(records)
-        if len(df) == len(index):
-            df.index = index
-        return df
+        return self.get_arrays().to_states_df(index)
@@ -0,0 +1,231 @@
+"""
+Lépésenkénti szűrő history — előre lefoglalt tömbök, választható megőrzés.
+
+A `MultiTFKalmanFilter.step()` ide írja az állapotot per-lépés
+KalmanState objektumok helyett. Megőrzési politika:
+
+    none — semmi nem tárolódik (élő futás, csak az aktuális állapot kell)
+    ring — az utolsó `size` lépés fix méretű gyűrűben
+    full — minden lépés (a kapacitás duplázódva nő)
+
+A mezőmaszk (`fields`) a nagy mezők elhagyását engedi, pl. simításhoz
+elég az ("x", "P", "x_pred", "P_pred"), az S/K kihagyható. A lépés index,
+a Mahalanobis-távolság és az aktív TF maszk mindig tárolódik.
+
+Használat:
+    hist = StateHistory([1, 5, 15], policy="ring", size=1440,
+                        fields=("x", "P", "x_pred", "P_pred"))
+    hist.append(step_idx, x, P, x_pred, P_pred, cols, innov, S, K, mahal)
+    arrays = hist.to_arrays()
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator, Optional, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .filter import KalmanArrays, KalmanState
+
+HISTORY_POLICIES = ("none", "ring", "full")
+HISTORY_FIELDS = ("x", "P", "x_pred", "P_pred", "innovation", "S", "K")
+
+_INITIAL_CAPACITY = 1024
+
+
+def _field_shapes(k: int) -> dict[str, tuple[int, ...]]:
+    return {
+        "x": (3,), "P": (3, 3), "x_pred": (3,), "P_pred": (3, 3),
+        "innovation": (k,), "S": (k, k), "K": (3, k),
+    }
+
+
+def _field_fill(name: str) -> float:
+    """Üres érték: az inaktív innováció NaN, minden más 0."""
+    return np.nan if name == "innovation" else 0.0
+
+
+class StateHistory:
+    """Oszlopos, előre lefoglalt lépés-history none / ring / full politikával."""
+
+    def __init__(
+        self,
+        tf_values: list[int],
+        policy: str = "full",
+        size: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+    ):
+        if policy not in HISTORY_POLICIES:
+            raise ValueError(f"Ismeretlen history politika: {policy} ({HISTORY_POLICIES})")
+        if policy == "ring" and (size is None or size < 1):
+            raise ValueError(f"Ring history-hoz pozitív size kell: {size}")
+        fields = HISTORY_FIELDS if fields is None else tuple(fields)
+        unknown = set(fields) - set(HISTORY_FIELDS)
+        if unknown:
+            raise ValueError(f"Ismeretlen history mező(k): {sorted(unknown)}")
+
+        self.tf_values = list(tf_values)
+        self.policy = policy
+        self.fields = tuple(f for f in HISTORY_FIELDS if f in fields)
+        self._shapes = _field_shapes(len(self.tf_values))
+
+        capacity = {"none": 0, "ring": size, "full": _INITIAL_CAPACITY}[policy]
+        self._alloc(capacity)
+        self.n_total = 0          # összes append (a ring felülírtakkal együtt)
+
+    # ── Tárolás ──────────────────────────────────────────────────────────
+
+    def _alloc(self, capacity: int) -> None:
+        k = len(self.tf_values)
+        self.capacity = capacity
+        self.step_idx = np.zeros(capacity, dtype=np.int64)
+        self.mahalanobis = np.zeros(capacity)
+        self.active = np.zeros((capacity, k), dtype=bool)
+        self._data = {
+            name: np.full((capacity, *self._shapes[name]), _field_fill(name))
+            for name in self.fields
+        }
+
+    def _grow(self) -> None:
+        """Full politika: kapacitás duplázás (amortizált O(1) append)."""
+        old = (self.step_idx, self.mahalanobis, self.active, self._data)
+        n = self.capacity
+        self._alloc(max(2 * n, _INITIAL_CAPACITY))
+        self.step_idx[:n], self.mahalanobis[:n], self.active[:n] = old[:3]
+        for name, arr in old[3].items():
+            self._data[name][:n] = arr
+
+    def append(
+        self,
+        step_idx: int,
+        x: np.ndarray,
+        P: np.ndarray,
+        x_pred: np.ndarray,
+        P_pred: np.ndarray,
+        cols: list[int],
+        innovation: Optional[np.ndarray],
+        S: Optional[np.ndarray],
+        K: Optional[np.ndarray],
+        mahalanobis: float,
+    ) -> None:
+        """Egy lépés tárolása (cols: az aktív TF-ek oszlopai)."""
+        if self.policy == "none":
+            self.n_total += 1
+            return
+        if self.policy == "full" and self.n_total == self.capacity:
+            self._grow()
+        i = self.n_total % self.capacity
+        self.n_total += 1
+
+        self.step_idx[i] = step_idx
+        self.mahalanobis[i] = mahalanobis
+        self.active[i] = False
+
+        data = self._data
+        if "x" in data:
+            data["x"][i] = x[:, 0]
+        if "P" in data:
+            data["P"][i] = P
+        if "x_pred" in data:
+            data["x_pred"][i] = x_pred[:, 0]
+        if "P_pred" in data:
+            data["P_pred"][i] = P_pred
+        # Gyűrűben a sor korábbi tartalmát is törölni kell
+        for name in ("innovation", "S", "K"):
+            if name in data:
+                data[name][i] = _field_fill(name)
+
+        if innovation is not None:
+            self.active[i, cols] = True
+            if "innovation" in data:
+                data["innovation"][i, cols] = innovation[:, 0]
+            if "S" in data:
+                data["S"][i][np.ix_(cols, cols)] = S
+            if "K" in data:
+                data["K"][i][:, cols] = K
+
+    def clear(self) -> None:
+        self.n_total = 0
+
+    # ── Olvasás ──────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return min(self.n_total, self.capacity)
+
+    def _order(self) -> np.ndarray:
+        """A tárolt sorok időrendi indexei."""
+        n = len(self)
+        if self.n_total <= self.capacity:
+            return np.arange(n)
+        return (self.n_total + np.arange(n)) % self.capacity
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.step_idx, self.mahalanobis, self.active, *self._data.values()]
+        return sum(a.nbytes for a in arrays)
+
+    def to_arrays(self) -> KalmanArrays:
+        """
+        Időrendi másolat KalmanArrays-ként.
+
+        A nem tárolt mezők nulla-lépésközű (broadcast) kitöltő nézetek.
+        """
+        from .filter import KalmanArrays
+
+        order = self._order()
+        n = len(order)
+        fields = {
+            name: (
+                self._data[name][order] if name in self._data
+                else np.broadcast_to(_field_fill(name), (n, *self._shapes[name]))
+            )
+            for name in HISTORY_FIELDS
+        }
+        return KalmanArrays(
+            tf_values=self.tf_values,
+            step_idx=self.step_idx[order],
+            mahalanobis=self.mahalanobis[order],
+            active=self.active[order],
+            **fields,
+        )
+
+    def __getitem__(self, i: int) -> KalmanState:
+        """Az i. tárolt lépés (időrendben, negatív index is) KalmanState-ként."""
+        n = len(self)
+        if not -n <= i < n:
+            raise IndexError(f"History index kívül esik: {i} (hossz {n})")
+        return self._state(int(self._order()[i % n]))
+
+    def __iter__(self) -> Iterator[KalmanState]:
+        for row in self._order():
+            yield self._state(int(row))
+
+    def _state(self, row: int) -> KalmanState:
+        from .filter import KalmanState
+
+        cols = np.flatnonzero(self.active[row])
+        has_meas = cols.size > 0
+        data = self._data
+
+        def vec(name: str) -> Optional[np.ndarray]:
+            return data[name][row].reshape(3, 1).copy() if name in data else None
+
+        def mat(name: str) -> Optional[np.ndarray]:
+            return data[name][row].copy() if name in data else None
+
+        return KalmanState(
+            x=vec("x"),
+            P=mat("P"),
+            x_pred=vec("x_pred"),
+            P_pred=mat("P_pred"),
+            innovation=(
+                data["innovation"][row, cols].reshape(-1, 1)
+                if has_meas and "innovation" in data else None
+            ),
+            S=data["S"][row][np.ix_(cols, cols)] if has_meas and "S" in data else None,
+            K=data["K"][row][:, cols] if has_meas and "K" in data else None,
+            mahalanobis=float(self.mahalanobis[row]),
+            active_tf_minutes=[self.tf_values[j] for j in cols],
+            step_idx=int(self.step_idx[row]),
+        )
@@ -79,12 +79,8 @@ def build_R_full(active_tf_minutes: list[int], sigma2_1m: float) -> np.ndarray:
 
     Ref: KALMAN_LOG_MULTI_TF.md 4.4
     """
-    k = len(active_tf_minutes)
-    R = np.zeros((k, k))
-    for i in range(k):
-        for j in range(k):
-            R[i, j] = min(active_tf_minutes[i], active_tf_minutes[j]) * sigma2_1m
-    return R
+    n = np.asarray(active_tf_minutes, dtype=float)
+    return np.minimum.outer(n, n) * sigma2_1m
 
 
 def build_R_diagonal(active_tf_minutes: list[int], sigma2_1m: float) -> np.ndarray:
@@ -101,6 +97,34 @@ def build_R_matrix(
     return build_R_diagonal(active_tf_minutes, sigma2_1m)
 
 
+def build_R_whitening(
+    active_tf_minutes: list[int], sigma2_1m: float, mode: str,
+) -> np.ndarray:
+    """
+    Fehérítő mátrix W: W R Wᵀ = I (R Cholesky faktorának inverze, zárt alakban).
+
+    full: R = σ²·min(n_i, n_j) egy bolyongás kovarianciája, így R = σ² L Lᵀ,
+    L_ij = √(n_j − n_{j−1}) (j ≤ i). L⁻¹ differencia operátor: a fehérített
+    mérés az egymást követő aktív TF-ek hozamainak különbsége (a
+    nem-átfedő növekmény) osztva σ√(n_i − n_{i−1})-gyel.
+
+    diagonal: W = diag(1 / (σ√n_i)).
+
+    Args:
+        active_tf_minutes: aktív TF-ek percben, növekvő sorrendben
+    """
+    n = np.asarray(active_tf_minutes, dtype=float)
+    sigma = np.sqrt(sigma2_1m)
+    if mode != "full":
+        return np.diag(1.0 / (sigma * np.sqrt(n)))
+    if np.any(np.diff(n) <= 0):
+        raise ValueError(f"Az aktív TF-eknek szigorúan növekvőnek kell lenniük: {active_tf_minutes}")
+    scale = 1.0 / (sigma * np.sqrt(np.diff(n, prepend=0.0)))
+    W = np.diag(scale)
+    W[np.arange(1, len(n)), np.arange(len(n) - 1)] = -scale[1:]
+    return W
+
+
 # ── Q: Folyamatzaj kovariancia ───────────────────────────────────────────────
 
 
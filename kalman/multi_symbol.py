@@ -0,0 +1,118 @@
+"""
+Multi-symbol szűrő — S szimbólum egyetlen vektorizált menetben.
+
+A szimbólumok közös F, Q, H mintákon és ütemezésen futnak; csak a
+mérés ([S x N x k] tenzor) és a σ²_1m (így R) különbözik. A batch
+motor (`BatchedMultiTFKalmanFilter`) tag-tengelye itt a szimbólum
+tengely; a tagonként hiányzó mérések maszkolva vannak.
+
+Használat:
+    symbols, index, Z = load_universe_returns(config)
+    sigma2 = estimate_sigma2_universe(Z)
+    engine = MultiSymbolKalmanFilter.from_config(config, symbols, sigma2)
+    engine.run_tensor(Z, minutes=epoch_minutes(index))
+    panel = engine.states_panel(index)      # oszlopok: (szimbólum, mező)
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .batched import BatchedMultiTFKalmanFilter, FilterParams
+from .filter import KalmanArrays
+
+logger = logging.getLogger(__name__)
+
+
+class MultiSymbolKalmanFilter(BatchedMultiTFKalmanFilter):
+    """S szimbólum szűrése közös paraméterekkel, szimbólumonkénti σ²_1m-mel."""
+
+    def __init__(
+        self,
+        tf_minutes: dict[str, int],
+        symbols: Sequence[str],
+        q: float,
+        sigma2_1m: Sequence[float],
+        h_mode: str = "discrete",
+        r_mode: str = "full",
+        P0_scale: float = 100.0,
+        dt: float = 1.0,
+        init: str = "diffuse",
+    ):
+        if len(symbols) != len(sigma2_1m):
+            raise ValueError(
+                f"Szimbólumok ({len(symbols)}) és σ²_1m értékek ({len(sigma2_1m)}) száma eltér"
+            )
+        super().__init__(
+            tf_minutes,
+            [FilterParams(q, float(s2), h_mode, r_mode, P0_scale, init) for s2 in sigma2_1m],
+            dt,
+        )
+        self.symbols = list(symbols)
+        self.results: dict[str, KalmanArrays] = {}
+
+    @classmethod
+    def from_config(
+        cls,
+        config,
+        symbols: Sequence[str],
+        sigma2_1m: Sequence[float],
+    ) -> MultiSymbolKalmanFilter:
+        """Szűrő a config kalman beállításaival (a σ²_1m szimbólumonként adott)."""
+        return cls(
+            config.tf_minutes,
+            symbols,
+            q=config.kalman.q,
+            sigma2_1m=sigma2_1m,
+            h_mode=config.kalman.h_mode,
+            r_mode=config.kalman.r_mode,
+            P0_scale=config.kalman.P0_scale,
+            init=config.kalman.init,
+        )
+
+    def run_tensor(
+        self,
+        Z: np.ndarray,
+        progress_interval: int = 1000,
+        store_pred: bool = False,
+        minutes: Optional[np.ndarray] = None,
+    ) -> dict[str, KalmanArrays]:
+        """
+        Futtatás egy [S x N x k] mérés tenzoron.
+
+        Args:
+            Z: szimbólumonkénti mérésmátrixok (`load_universe_returns`)
+            store_pred: x_pred / P_pred tárolása (simításhoz)
+            minutes: [N] az index epoch percei (None = 0..N-1, rések nélkül)
+
+        Returns:
+            {szimbólum: KalmanArrays}
+        """
+        if Z.ndim != 3:
+            raise ValueError(f"[S x N x k] tenzor kell, kapott alak: {Z.shape}")
+        arrays = self.run_matrix(Z, progress_interval, store_pred=store_pred, minutes=minutes)
+        self.results = dict(zip(self.symbols, arrays))
+        return self.results
+
+    def states_panel(self, index: pd.DatetimeIndex) -> pd.DataFrame:
+        """
+        Az utolsó futás állapotai szimbólumonként egy panelben.
+
+        Returns:
+            DataFrame, MultiIndex oszlopok (szimbólum, mező) — a mezők a
+            `KalmanArrays.to_states_df` oszlopai
+        """
+        if not self.results:
+            raise RuntimeError("Nincs futási eredmény — előbb run_tensor()")
+        return pd.concat(
+            {sym: arrays.to_states_df(index) for sym, arrays in self.results.items()},
+            axis=1,
+        )
+
+    def log_likelihood(self) -> pd.Series:
+        """Szimbólumonkénti teljes log-likelihood (utolsó futás)."""
+        return pd.Series(self.loglik.sum(axis=1), index=self.symbols, name="loglik")
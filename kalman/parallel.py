@@ -0,0 +1,882 @@
+"""
+Párhuzamos-időbeli (parallel-in-time) Kalman-szűrő és RTS simító — asszociatív scan.
+
+A lineáris-Gauss szűrés lépésenkénti elemekre bontható, amelyek egy
+asszociatív művelettel kombinálódnak (Särkkä & García-Fernández, 2021);
+a szűrt eloszlások az elemsorozat prefix-kombinációi, a simítottak a
+simító elemek szuffix-kombinációi. Így a 1M+ lépéses soros ciklus helyett:
+
+    1. a sorozat C darabra oszlik, a darabok elemei workerekben,
+       (mask, dt) csoportonként vektorizáltan épülnek
+    2. minden worker a saját darabja összesítő elemét adja (páronkénti
+       redukció) — a fő processz ebből a darabok kezdő "carry"-jét
+    3. minden worker blokkos scant futtat a carry-vel (√n hosszú blokkok,
+       a blokkokon belül a lépések a blokkok mentén vektorizálva), és
+       a kimenetet közvetlenül shared memory tömbökbe írja
+
+A szűrő elem (x_{k-1} → x_k, a k. mérés beépítésével):
+
+    A = (I − K H) F,   b = K y,   C = (I − K H) Q
+    η = Fᵀ Hᵀ S⁻¹ y,   J = Fᵀ Hᵀ S⁻¹ H F,          S = H Q Hᵀ + R,  K = Q Hᵀ S⁻¹
+
+mérés nélkül (A, b, C, η, J) = (F, 0, Q, 0, 0); a kezdő (x0, P0) egy
+(0, x0, P0, 0, 0) elem. A kovariancia rész a `kalman.riccati` (A, C, J)
+algebrája.
+
+A soros szűrő a posterior P-t P_FLOOR · I-vel regularizálja, ahol a
+legkisebb sajátértéke ez alá esik; ez az adott lépésben egy C += P_FLOOR · I
+módosítás. A regularizált lépések halmaza a kovarianciaútból adódik, így
+a scan fixpontig iterál (jellemzően 1–2 extra kör, ha van ilyen lépés).
+Az eredmény a `MultiTFKalmanFilter.run` + `rts_smooth` kimenete lebegőpontos
+pontossággal (a steady-state gyors út közelítése nélkül); diffúz kezdésnél
+az első néhány lépés (P0 ≫ steady-state P) ~1e-7 relatív kiejtési hibája
+mindkét úton jelen van.
+
+Használat:
+    arrays = run_parallel(kf, returns, workers=16)       # KalmanArrays, mint kf.run
+    smoothed = rts_smooth_parallel(arrays, kf.F, workers=16)
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+
+import numpy as np
+
+from data.returns import SparseReturns
+from profiling import annotate, profiled
+
+from .filter import KalmanArrays, MultiTFKalmanFilter, returns_to_matrix
+from .matrices import build_F, build_Q
+from .patterns import PatternRegistry, active_to_masks
+from .riccati import P_FLOOR
+from .smoother import SmoothedArrays, smoother_gains, transition_stack
+
+logger = logging.getLogger(__name__)
+
+_I3 = np.eye(3)
+
+# Legfeljebb ennyi kör a regularizált lépések halmazának fixpontjáig
+_MAX_FLOOR_ROUNDS = 8
+
+
+def _T(M: np.ndarray) -> np.ndarray:
+    return M.swapaxes(-1, -2)
+
+
+def _mv(M: np.ndarray, v: np.ndarray) -> np.ndarray:
+    return np.einsum("...ij,...j->...i", M, v)
+
+
+# ── Elemek ───────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class _Elements:
+    """Elemsorozat: minden mező egy [n, ...] tömb (egy elemnél [...])."""
+
+    def map(self, fn: Callable[[np.ndarray], np.ndarray]):
+        return type(self)(*(fn(getattr(self, f.name)) for f in fields(self)))
+
+    def assign(self, key, other) -> None:
+        for f in fields(self):
+            getattr(self, f.name)[key] = getattr(other, f.name)
+
+    def __len__(self) -> int:
+        return len(getattr(self, fields(self)[0].name))
+
+
+@dataclass
+class FilterElements(_Elements):
+    """Szűrő elemek: x_j | x_i, y ~ N(A x_i + b, C); η, J a mérések információja x_i-re."""
+
+    A: np.ndarray       # [n x 3 x 3]
+    b: np.ndarray       # [n x 3]
+    C: np.ndarray       # [n x 3 x 3]
+    eta: np.ndarray     # [n x 3]
+    J: np.ndarray       # [n x 3 x 3]
+
+    @classmethod
+    def identity(cls, n: int) -> FilterElements:
+        return cls(
+            A=np.broadcast_to(_I3, (n, 3, 3)).copy(), b=np.zeros((n, 3)),
+            C=np.zeros((n, 3, 3)), eta=np.zeros((n, 3)), J=np.zeros((n, 3, 3)),
+        )
+
+    @classmethod
+    def prior(cls, x0: np.ndarray, P0: np.ndarray) -> FilterElements:
+        """A kezdő eloszlás eleme (A = 0: a korábbi állapottól független)."""
+        return cls(
+            A=np.zeros((3, 3)), b=np.asarray(x0, dtype=float).reshape(3),
+            C=np.asarray(P0, dtype=float).copy(), eta=np.zeros(3), J=np.zeros((3, 3)),
+        )
+
+
+def combine_filter(i: FilterElements, j: FilterElements) -> FilterElements:
+    """Az `i` utáni `j` szakasz összevont szűrő eleme (stackelt, broadcastolva)."""
+    M = _I3 + i.C @ j.J                                  # I + C_i J_j  (Mᵀ = I + J_j C_i)
+    AjW = _T(np.linalg.solve(_T(M), _T(j.A)))           # A_j (I + C_i J_j)⁻¹
+    AiW = _T(np.linalg.solve(M, i.A))                   # A_iᵀ (I + J_j C_i)⁻¹
+    C = AjW @ i.C @ _T(j.A) + j.C
+    J = AiW @ j.J @ i.A + i.J
+    return FilterElements(
+        A=AjW @ i.A,
+        b=_mv(AjW, i.b + _mv(i.C, j.eta)) + j.b,
+        C=(C + _T(C)) / 2.0,
+        eta=_mv(AiW, j.eta - _mv(j.J, i.b)) + i.eta,
+        J=(J + _T(J)) / 2.0,
+    )
+
+
+@dataclass
+class SmootherElements(_Elements):
+    """Simító elemek: x_k | x_{k+1}, y_{1:N} ~ N(E x_{k+1} + g, L)."""
+
+    E: np.ndarray       # [n x 3 x 3]
+    g: np.ndarray       # [n x 3]
+    L: np.ndarray       # [n x 3 x 3]
+
+    @classmethod
+    def identity(cls, n: int) -> SmootherElements:
+        return cls(
+            E=np.broadcast_to(_I3, (n, 3, 3)).copy(), g=np.zeros((n, 3)), L=np.zeros((n, 3, 3)),
+        )
+
+
+def combine_smoother(later: SmootherElements, earlier: SmootherElements) -> SmootherElements:
+    """A `later` szakasz elé kerülő `earlier` összevont simító eleme (visszafelé scan)."""
+    L = earlier.E @ later.L @ _T(earlier.E) + earlier.L
+    return SmootherElements(
+        E=earlier.E @ later.E,
+        g=_mv(earlier.E, later.g) + earlier.g,
+        L=(L + _T(L)) / 2.0,
+    )
+
+
+# ── Blokkos scan / redukció ──────────────────────────────────────────────────
+
+
+def _concat(a: _Elements, b: _Elements) -> _Elements:
+    return type(a)(*(np.concatenate([getattr(a, f.name), getattr(b, f.name)]) for f in fields(a)))
+
+
+def reduce_elements(elems: _Elements, combine: Callable) -> _Elements:
+    """Az összes elem kombinációja (páronkénti, vektorizált redukció). Returns: egy elem."""
+    while len(elems) > 1:
+        odd = len(elems) % 2
+        even = elems.map(lambda a: a[:len(a) - odd])
+        paired = combine(even.map(lambda a: a[0::2]), even.map(lambda a: a[1::2]))
+        elems = _concat(paired, elems.map(lambda a: a[-1:])) if odd else paired
+    return elems.map(lambda a: a[0])
+
+
+def scan_elements(
+    elems: _Elements,
+    combine: Callable,
+    carry: Optional[_Elements] = None,
+) -> _Elements:
+    """
+    Inkluzív prefix scan: out[t] = carry ∘ e[0] ∘ ... ∘ e[t].
+
+    Az n elem m ≈ √n blokkra oszlik; a blokkon belüli s lépés az m blokk
+    mentén vektorizálva fut, a blokkösszegek láncolása m soros kombináció,
+    végül a blokkok eltolása egyetlen vektorizált kombináció.
+    """
+    n = len(elems)
+    if n == 0:
+        return elems
+    s = max(1, math.isqrt(n))
+    m = -(-n // s)
+    pad = m * s - n
+    if pad:
+        elems = _concat(elems, type(elems).identity(pad))
+    X = elems.map(lambda a: a.reshape(m, s, *a.shape[1:]).copy())
+
+    for t in range(1, s):
+        X.assign((slice(None), t), combine(
+            X.map(lambda a: a[:, t - 1]), X.map(lambda a: a[:, t]),
+        ))
+
+    # Blokkok kezdő carry-je: carry ∘ az előző blokkok összegei
+    totals = X.map(lambda a: a[:, s - 1])
+    first = 0 if carry is not None else 1
+    acc = carry
+    starts = []
+    for blk in range(first, m):
+        if blk > 0:
+            tot = totals.map(lambda a, k=blk - 1: a[k])
+            acc = tot if acc is None else combine(acc, tot)
+        starts.append(acc)
+    if starts:
+        starts_arr = type(elems)(*(
+            np.stack([getattr(e, f.name) for e in starts]) for f in fields(elems)
+        ))
+        rest = X.map(lambda a: a[first:])
+        shifted = combine(starts_arr.map(lambda a: a[:, None]), rest)
+        X.assign(slice(first, None), shifted)
+
+    return X.map(lambda a: a.reshape(m * s, *a.shape[2:])[:n])
+
+
+# ── Szűrő elemek építése ─────────────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class _Model:
+    """A workereknek átadott (pickle-ölhető) modell leírás."""
+
+    tf_values: tuple[int, ...]
+    q: float
+    sigma2_1m: float
+    h_mode: str
+    r_mode: str
+    dt: float
+    floor: bool                 # P_FLOOR regularizáció (joseph forma)
+
+    def registry(self) -> PatternRegistry:
+        return PatternRegistry(list(self.tf_values), self.sigma2_1m, self.h_mode, self.r_mode)
+
+
+def _transition(model: _Model, cache: dict, n_steps: int) -> tuple[np.ndarray, np.ndarray]:
+    entry = cache.get(n_steps)
+    if entry is None:
+        entry = cache[n_steps] = (build_F(n_steps * model.dt), build_Q(model.q, n_steps * model.dt))
+    return entry
+
+
+def filter_elements(
+    model: _Model,
+    registry: PatternRegistry,
+    cache: dict,
+    Z: np.ndarray,
+    masks: np.ndarray,
+    step_dt: np.ndarray,
+    bumped: Optional[np.ndarray] = None,
+) -> FilterElements:
+    """
+    Lépésenkénti szűrő elemek, (mask, dt) csoportonként vektorizálva.
+
+    Args:
+        Z: [n x k] mérések; masks: [n] aktív bitmaszk; step_dt: [n] lépésköz
+        bumped: [n] bool — P_FLOOR regularizáció a lépés után
+    """
+    n = len(masks)
+    out = FilterElements(
+        A=np.empty((n, 3, 3)), b=np.zeros((n, 3)), C=np.empty((n, 3, 3)),
+        eta=np.zeros((n, 3)), J=np.zeros((n, 3, 3)),
+    )
+    keys = masks.astype(np.int64) * (int(step_dt.max(initial=1)) + 1) + step_dt
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    for g, key in enumerate(uniq):
+        rows = np.flatnonzero(inverse == g)
+        mask = int(masks[rows[0]])
+        F, Q = _transition(model, cache, int(step_dt[rows[0]]))
+        if not mask:
+            out.A[rows] = F
+            out.C[rows] = Q
+            continue
+        pattern = registry.get(mask)
+        H, R = pattern.H, pattern.R
+        S = H @ Q @ H.T + R
+        K = np.linalg.solve(S, H @ Q).T                     # Q Hᵀ S⁻¹
+        IKH = _I3 - K @ H
+        HF = H @ F
+        M_eta = np.linalg.solve(S, HF).T                    # Fᵀ Hᵀ S⁻¹
+        C = IKH @ Q
+        out.A[rows] = IKH @ F
+        out.C[rows] = (C + C.T) / 2.0
+        out.J[rows] = M_eta @ HF
+        y = Z[np.ix_(rows, pattern.cols)]
+        out.b[rows] = y @ K.T
+        out.eta[rows] = y @ M_eta.T
+    if bumped is not None and bumped.any():
+        out.C[bumped] += _I3 * P_FLOOR
+    return out
+
+
+def _derived_fields(
+    model: _Model,
+    registry: PatternRegistry,
+    cache: dict,
+    Z: np.ndarray,
+    masks: np.ndarray,
+    step_dt: np.ndarray,
+    x_prev: np.ndarray,
+    P_prev: np.ndarray,
+    out: dict[str, np.ndarray],
+) -> None:
+    """x_pred, P_pred, innováció, S, K, mahalanobis a szűrt x / P-ből (a run_matrix mezői)."""
+    x, P = out["x"], out["P"]
+    x_before = np.concatenate([x_prev[None], x[:-1]])
+    P_before = np.concatenate([P_prev[None], P[:-1]])
+    for d in np.unique(step_dt):
+        rows = np.flatnonzero(step_dt == d)
+        F, Q = _transition(model, cache, int(d))
+        out["x_pred"][rows] = x_before[rows] @ F.T
+        out["P_pred"][rows] = F @ P_before[rows] @ F.T + Q
+
+    for mask in np.unique(masks):
+        if not mask:
+            continue
+        rows = np.flatnonzero(masks == mask)
+        pattern = registry.get(int(mask))
+        cols, H, R = pattern.cols, pattern.H, pattern.R
+        P_pred = out["P_pred"][rows]
+        S = H @ P_pred @ H.T + R
+        PHt = P_pred @ H.T
+        K = _T(np.linalg.solve(S, _T(PHt)))
+        innov = Z[np.ix_(rows, cols)] - out["x_pred"][rows] @ H.T
+        out["innovation"][np.ix_(rows, cols)] = innov
+        out["S"][np.ix_(rows, cols, cols)] = S
+        out["K"][np.ix_(rows, np.arange(3), cols)] = K
+        out["mahalanobis"][rows] = np.einsum("ni,ni->n", innov, np.linalg.solve(S, innov[..., None])[..., 0])
+
+
+# ── Shared memory ────────────────────────────────────────────────────────────
+
+
+class _SharedArrays:
+    """Névvel csatolható shared memory tömbök (létrehozás a fő processzben)."""
+
+    def __init__(self, specs: dict[str, tuple[tuple, str]], names: Optional[dict[str, str]] = None):
+        self.specs = specs
+        self.owner = names is None
+        self.shm: dict[str, shared_memory.SharedMemory] = {}
+        self.arrays: dict[str, np.ndarray] = {}
+        for key, (shape, dtype) in specs.items():
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            if self.owner:
+                shm = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                shm = shared_memory.SharedMemory(name=names[key])
+            self.shm[key] = shm
+            self.arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+    @property
+    def names(self) -> dict[str, str]:
+        return {key: shm.name for key, shm in self.shm.items()}
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.arrays[key]
+
+    def close(self) -> None:
+        self.arrays.clear()
+        for shm in self.shm.values():
+            shm.close()
+            if self.owner:
+                shm.unlink()
+
+
+_WORKER: dict = {}
+
+
+def _init_worker(specs: dict, names: dict, model: Optional[_Model]) -> None:
+    """Worker inicializálás: a bemeneti / kimeneti tömbök csatolása shared memory-ból."""
+    _WORKER["shared"] = _SharedArrays(specs, names)
+    _WORKER["model"] = model
+    if model is not None:
+        _WORKER["registry"] = model.registry()
+        _WORKER["cache"] = {}
+
+
+def _chunk_filter_elements(lo: int, hi: int, bumped: np.ndarray) -> FilterElements:
+    sh = _WORKER["shared"]
+    return filter_elements(
+        _WORKER["model"], _WORKER["registry"], _WORKER["cache"],
+        sh["Z"][lo:hi], sh["masks"][lo:hi], sh["step_dt"][lo:hi], bumped,
+    )
+
+
+def _filter_total(lo: int, hi: int, bumped: np.ndarray) -> FilterElements:
+    """1. fázis: a [lo, hi) darab összesítő eleme."""
+    return reduce_elements(_chunk_filter_elements(lo, hi, bumped), combine_filter)
+
+
+def _filter_scan(lo: int, hi: int, bumped: np.ndarray, carry: FilterElements) -> None:
+    """2. fázis: a darab szűrt eloszlásai a carry-vel, közvetlenül a kimeneti tömbökbe."""
+    sh = _WORKER["shared"]
+    out = scan_elements(_chunk_filter_elements(lo, hi, bumped), combine_filter, carry)
+    P = out.C
+    sh["x"][lo:hi] = out.b
+    sh["P"][lo:hi] = P
+    _derived_fields(
+        _WORKER["model"], _WORKER["registry"], _WORKER["cache"],
+        sh["Z"][lo:hi], sh["masks"][lo:hi], sh["step_dt"][lo:hi], carry.b, carry.C,
+        {key: sh[key][lo:hi] for key in ("x", "P", "x_pred", "P_pred", "innovation", "S", "K", "mahalanobis")},
+    )
+
+
+def _chunk_smoother_elements(lo: int, hi: int) -> SmootherElements:
+    sh = _WORKER["shared"]
+    n_total = len(sh["x"])
+    last = hi == n_total
+    stop = hi - 1 if last else hi                      # gain-es sorok: [lo, stop)
+    x_f, P_f = sh["x"], sh["P"]
+    F_k = transition_stack(sh["step_idx"][lo:stop + 1], _WORKER["F"])
+    C = smoother_gains(P_f[lo:stop], sh["P_pred"][lo + 1:stop + 1], F_k)
+    E = np.empty((hi - lo, 3, 3))
+    g = np.empty((hi - lo, 3))
+    L = np.empty((hi - lo, 3, 3))
+    m = stop - lo
+    E[:m] = C
+    g[:m] = x_f[lo:stop] - np.einsum("nij,nj->ni", C, sh["x_pred"][lo + 1:stop + 1])
+    L[:m] = P_f[lo:stop] - C @ sh["P_pred"][lo + 1:stop + 1] @ _T(C)
+    if last:
+        E[m:] = 0.0
+        g[m:] = x_f[n_total - 1]
+        L[m:] = P_f[n_total - 1]
+    return SmootherElements(E, g, L)
+
+
+def _reversed(elems: SmootherElements) -> SmootherElements:
+    return elems.map(lambda a: a[::-1])
+
+
+def _smoother_total(lo: int, hi: int) -> SmootherElements:
+    return reduce_elements(_reversed(_chunk_smoother_elements(lo, hi)), combine_smoother)
+
+
+def _smoother_scan(lo: int, hi: int, carry: Optional[SmootherElements]) -> None:
+    sh = _WORKER["shared"]
+    out = _reversed(scan_elements(_reversed(_chunk_smoother_elements(lo, hi)), combine_smoother, carry))
+    sh["x_s"][lo:hi] = out.g
+    sh["P_s"][lo:hi] = out.L
+
+
+def _init_smoother_worker(specs: dict, names: dict, F: np.ndarray) -> None:
+    _init_worker(specs, names, None)
+    _WORKER["F"] = F
+
+
+# ── Futtatás (pool vagy helyben) ─────────────────────────────────────────────
+
+
+class _Executor:
+    """ProcessPoolExecutor shared memory-s workerekkel, vagy workers=1 esetén helyben."""
+
+    def __init__(self, workers: int, initializer: Callable, initargs: tuple):
+        self.pool = None
+        if workers > 1:
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+        else:
+            self._saved = dict(_WORKER)
+            initializer(*initargs)
+
+    def map(self, fn: Callable, *iterables) -> list:
+        if self.pool is None:
+            return [fn(*args) for args in zip(*iterables)]
+        return list(self.pool.map(fn, *iterables))
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown()
+        else:
+            if "shared" in _WORKER:
+                _WORKER["shared"].close()
+            _WORKER.clear()
+            _WORKER.update(self._saved)
+
+
+def _chunk_bounds(n: int, n_chunks: int) -> list[tuple[int, int]]:
+    n_chunks = max(1, min(n_chunks, n))
+    edges = np.linspace(0, n, n_chunks + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def _min_eig_below(P: np.ndarray, eps: float) -> np.ndarray:
+    """[n] bool: min eig(P) < eps (a soros szűrő _stabilize_P feltétele)."""
+    return np.linalg.eigvalsh(P)[:, 0] < eps
+
+
+@profiled("kalman.parallel.run_parallel")
+def run_parallel(
+    kf: MultiTFKalmanFilter,
+    returns: SparseReturns | dict[str, "object"],
+    workers: Optional[int] = None,
+    n_chunks: Optional[int] = None,
+) -> KalmanArrays:
+    """Párhuzamos-időbeli `kf.run(returns)` megfelelő (lásd run_matrix_parallel)."""
+    Z, _ = returns_to_matrix(returns, kf.tf_minutes)
+    if isinstance(returns, SparseReturns):
+        labels = sorted(kf.tf_minutes, key=kf.tf_minutes.get)
+        return run_matrix_parallel(kf, Z, returns.minutes, returns.active(labels), workers, n_chunks)
+    from config import epoch_minutes
+    base_tf = min(kf.tf_minutes, key=kf.tf_minutes.get)
+    return run_matrix_parallel(kf, Z, epoch_minutes(returns[base_tf].index), None, workers, n_chunks)
+
+
+def run_matrix_parallel(
+    kf: MultiTFKalmanFilter,
+    Z: np.ndarray,
+    minutes: Optional[np.ndarray] = None,
+    active: Optional[np.ndarray] = None,
+    workers: Optional[int] = None,
+    n_chunks: Optional[int] = None,
+) -> KalmanArrays:
+    """
+    A `kf.run_matrix` kimenete asszociatív scannel, process poolon.
+
+    A szűrő aktuális állapotából (x, P, last_step, Riccati init) indul, és
+    a végén ugyanúgy frissíti (kf.x, kf.P, kf.last_step, kf.arrays).
+
+    Args:
+        Z / minutes / active: mint MultiTFKalmanFilter.run_matrix
+        workers: worker processzek száma (None = CPU-k száma, 1 = helyben)
+        n_chunks: darabok száma (None = workers)
+    """
+    n_steps = Z.shape[0]
+    tf_values = kf.all_tf_values
+    if Z.shape[1] != len(tf_values):
+        raise ValueError(f"Z oszlopszáma ({Z.shape[1]}) != TF-ek száma ({len(tf_values)})")
+    steps = np.arange(n_steps, dtype=np.int64) if minutes is None else np.asarray(minutes, dtype=np.int64)
+    if steps.shape != (n_steps,):
+        raise ValueError(f"minutes hossza ({steps.size}) != Z sorainak száma ({n_steps})")
+    if np.any(np.diff(steps) <= 0):
+        raise ValueError("A lépés indexeknek szigorúan növekvőnek kell lenniük")
+    if active is None:
+        active = (steps[:, None] % np.asarray(tf_values)[None, :] == 0) & np.isfinite(Z)
+    arrays = KalmanArrays.allocate(n_steps, tf_values)
+    arrays.step_idx[:] = steps
+    if n_steps == 0:
+        kf.arrays = arrays
+        return arrays
+
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunk_bounds(n_steps, n_chunks or workers)
+    workers = min(workers, len(chunks))
+
+    # Kezdő eloszlás: a szűrő saját rés-ugrása / Riccati initje az első lépés előtt
+    kf._advance_to(int(steps[0]))
+    prior = FilterElements.prior(kf.x, kf.P)
+    step_dt = np.ones(n_steps, dtype=np.int64)
+    step_dt[1:] = np.diff(steps)
+
+    model = _Model(
+        tuple(tf_values), kf.q, kf.sigma2_1m, kf.h_mode, kf.r_mode, kf.dt,
+        floor=kf.covariance_form == "joseph",
+    )
+    k = len(tf_values)
+    specs = {
+        "Z": ((n_steps, k), "f8"),
+        "masks": ((n_steps,), "i8"),
+        "step_dt": ((n_steps,), "i8"),
+        "x": ((n_steps, 3), "f8"),
+        "P": ((n_steps, 3, 3), "f8"),
+        "x_pred": ((n_steps, 3), "f8"),
+        "P_pred": ((n_steps, 3, 3), "f8"),
+        "innovation": ((n_steps, k), "f8"),
+        "S": ((n_steps, k, k), "f8"),
+        "K": ((n_steps, 3, k), "f8"),
+        "mahalanobis": ((n_steps,), "f8"),
+    }
+    shared = _SharedArrays(specs)
+    executor = None
+    try:
+        shared["Z"][:] = np.where(active, Z, 0.0)
+        shared["masks"][:] = active_to_masks(active)
+        shared["step_dt"][:] = step_dt
+        executor = _Executor(workers, _init_worker, (specs, shared.names, model))
+
+        bumped = np.zeros(n_steps, dtype=bool)
+        for round_i in range(_MAX_FLOOR_ROUNDS):
+            shared["innovation"][:] = np.nan
+            shared["S"][:] = 0.0
+            shared["K"][:] = 0.0
+            shared["mahalanobis"][:] = 0.0
+            los, his = zip(*chunks)
+            bumps = [bumped[lo:hi] for lo, hi in chunks]
+            totals = executor.map(_filter_total, los, his, bumps)
+            carries = [prior]
+            for total in totals[:-1]:
+                carries.append(combine_filter(carries[-1], total))
+            executor.map(_filter_scan, los, his, bumps, carries)
+
+            if not model.floor:
+                break
+            # A soros szűrő a regularizálás előtti P-t vizsgálja
+            P_check = shared["P"] - bumped[:, None, None] * (_I3 * P_FLOOR)
+            now = _min_eig_below((P_check + _T(P_check)) / 2.0, P_FLOOR)
+            if np.array_equal(now, bumped):
+                break
+            logger.info(f"  Párhuzamos szűrő: {int(now.sum())} regularizált lépés → új scan kör")
+            bumped = now
+        else:
+            logger.warning("Párhuzamos szűrő: a regularizált lépések halmaza nem állt be")
+
+        for key in ("x", "P", "x_pred", "P_pred", "innovation", "S", "K", "mahalanobis"):
+            getattr(arrays, key)[:] = shared[key]
+        arrays.active[:] = active
+    finally:
+        if executor is not None:
+            executor.close()
+        shared.close()
+
+    annotate(workers=workers, chunks=len(chunks), rounds=round_i + 1)
+    kf.x = arrays.x[-1].reshape(3, 1).copy()
+    kf.P = arrays.P[-1].copy()
+    kf.last_step = int(steps[-1])
+    kf.arrays = arrays
+    logger.info(f"Párhuzamos szűrő kész: {n_steps} állapot, {len(chunks)} darab, {workers} worker")
+    return arrays
+
+
+@profiled("kalman.parallel.rts_smooth_parallel")
+def rts_smooth_parallel(
+    history: KalmanArrays,
+    F: np.ndarray,
+    workers: Optional[int] = None,
+    n_chunks: Optional[int] = None,
+) -> SmoothedArrays:
+    """
+    Az `rts_smooth` kimenete szuffix scannel, process poolon.
+
+    Args:
+        history: a szűrő oszlopos kimenete (KalmanArrays)
+        F: egylépéses állapotátmeneti mátrix (réseknél hatványa, mint rts_smooth)
+        workers / n_chunks: mint run_matrix_parallel
+    """
+    N = len(history)
+    out = SmoothedArrays.allocate(N)
+    if N == 0:
+        return out
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunk_bounds(N, n_chunks or workers)
+    workers = min(workers, len(chunks))
+
+    specs = {
+        "x": ((N, 3), "f8"),
+        "P": ((N, 3, 3), "f8"),
+        "x_pred": ((N, 3), "f8"),
+        "P_pred": ((N, 3, 3), "f8"),
+        "step_idx": ((N,), "i8"),
+        "x_s": ((N, 3), "f8"),
+        "P_s": ((N, 3, 3), "f8"),
+    }
+    shared = _SharedArrays(specs)
+    executor = None
+    try:
+        for key in ("x", "P", "x_pred", "P_pred", "step_idx"):
+            shared[key][:] = getattr(history, key)
+        executor = _Executor(workers, _init_smoother_worker, (specs, shared.names, F))
+        los, his = zip(*chunks)
+        totals = executor.map(_smoother_total, los, his)
+        # Darabok carry-je hátulról: a későbbi darabok összesített eleme
+        carries: list[Optional[SmootherElements]] = [None] * len(chunks)
+        for c in range(len(chunks) - 2, -1, -1):
+            nxt = totals[c + 1]
+            carries[c] = nxt if carries[c + 1] is None else combine_smoother(carries[c + 1], nxt)
+        executor.map(_smoother_scan, los, his, carries)
+        out.x[:] = shared["x_s"]
+        out.P[:] = shared["P_s"]
+    finally:
+        if executor is not None:
+            executor.close()
+        shared.close()
+
+    annotate(workers=workers, chunks=len(chunks))
+    return out
+
+
+# ── Átfedő ablakos darabolás (közelítő) ─────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class SeamReport:
+    """Egy varrat (darabhatár) mért eltérése a szomszédos darabok átfedő sorain."""
+
+    row: int                # a darab első megtartott sora
+    step: int               # ... epoch perce
+    overlap: int            # bemelegítő átfedés (perc)
+    dx: float               # max |Δx| / σ(x)
+    dP: float               # max |ΔP_ij| / √(P_ii P_jj)
+
+    @property
+    def deviation(self) -> float:
+        return max(self.dx, self.dP)
+
+
+@dataclass
+class ChunkedResult:
+    """A darabolt szűrés kimenete és a varratonkénti eltérések."""
+
+    arrays: KalmanArrays
+    seams: list[SeamReport]
+
+    @property
+    def max_deviation(self) -> float:
+        return max((s.deviation for s in self.seams), default=0.0)
+
+
+def _filter_chunk(
+    kf: MultiTFKalmanFilter,
+    cold: bool,
+    Z: np.ndarray,
+    minutes: np.ndarray,
+    active: np.ndarray,
+    keep: int,
+) -> tuple[KalmanArrays, np.ndarray, np.ndarray, Optional[int]]:
+    """Egy darab: (hideg indítás után) a bemelegítő + megtartott sorok, a [keep:] rész vissza."""
+    if cold:
+        kf.reset()
+    arrays = kf.run_matrix(Z, progress_interval=0, minutes=minutes, active=active)
+    return arrays[keep:], kf.x, kf.P, kf.last_step
+
+
+def _seam_deviation(ref: KalmanArrays, new: KalmanArrays) -> tuple[float, float]:
+    """(dx, dP): a referencia (hosszabb előzményű) darab szórásában mérve."""
+    d = np.sqrt(np.maximum(np.einsum("nii->ni", ref.P), np.finfo(float).tiny))
+    dx = np.abs(new.x - ref.x) / d
+    dP = np.abs(new.P - ref.P) / (d[:, :, None] * d[:, None, :])
+    return float(dx.max(initial=0.0)), float(dP.max(initial=0.0))
+
+
+@profiled("kalman.parallel.run_chunked")
+def run_chunked(
+    kf: MultiTFKalmanFilter,
+    returns: SparseReturns | dict[str, "object"],
+    n_chunks: Optional[int] = None,
+    overlap: int = 1440,
+    tol: float = 1e-6,
+    workers: Optional[int] = None,
+    check_rows: int = 60,
+) -> ChunkedResult:
+    """Darabolt `kf.run(returns)` (lásd run_matrix_chunked)."""
+    Z, _ = returns_to_matrix(returns, kf.tf_minutes)
+    if isinstance(returns, SparseReturns):
+        labels = sorted(kf.tf_minutes, key=kf.tf_minutes.get)
+        return run_matrix_chunked(
+            kf, Z, returns.minutes, returns.active(labels), n_chunks, overlap, tol, workers, check_rows,
+        )
+    from config import epoch_minutes
+    base_tf = min(kf.tf_minutes, key=kf.tf_minutes.get)
+    return run_matrix_chunked(
+        kf, Z, epoch_minutes(returns[base_tf].index), None, n_chunks, overlap, tol, workers, check_rows,
+    )
+
+
+def run_matrix_chunked(
+    kf: MultiTFKalmanFilter,
+    Z: np.ndarray,
+    minutes: Optional[np.ndarray] = None,
+    active: Optional[np.ndarray] = None,
+    n_chunks: Optional[int] = None,
+    overlap: int = 1440,
+    tol: float = 1e-6,
+    workers: Optional[int] = None,
+    check_rows: int = 60,
+) -> ChunkedResult:
+    """
+    Közelítő párhuzamos szűrés: C független darab, darabonként `overlap`
+    perc bemelegítéssel.
+
+    A szűrő geometrikusan felejti a kezdőállapotát, így a bemelegítés
+    után egy hidegen (kf.reset()) induló darab a soros futással
+    megegyezik, a bemelegítés hosszától függő pontossággal. Az első
+    darab a szűrő aktuális állapotából indul, bemelegítés nélkül.
+
+    Varratonként az előző darab `check_rows` sorral tovább fut; a két
+    darab eltérése ezeken a sorokon (az előző darab szórásában) a varrat
+    hibájának becslése. Ahol ez `tol` fölött van, a darab kétszeres
+    átfedéssel újrafut (legfeljebb a sorozat elejéig).
+
+    Args:
+        Z / minutes / active: mint MultiTFKalmanFilter.run_matrix
+        n_chunks: darabok száma (None = workers)
+        overlap: kezdő bemelegítő átfedés percben
+        tol: megengedett varrat eltérés (σ egységben / korrelációs skálán)
+        workers: worker processzek száma (None = CPU-k száma, 1 = helyben)
+        check_rows: a varrat ellenőrzés sorainak száma
+
+    Returns:
+        ChunkedResult (arrays + varratonkénti SeamReport); a kf állapota
+        (x, P, last_step, arrays) a soros futáséval azonos módon frissül.
+    """
+    n_steps = Z.shape[0]
+    steps = np.arange(n_steps, dtype=np.int64) if minutes is None else np.asarray(minutes, dtype=np.int64)
+    if steps.shape != (n_steps,):
+        raise ValueError(f"minutes hossza ({steps.size}) != Z sorainak száma ({n_steps})")
+    if active is None:
+        active = (steps[:, None] % np.asarray(kf.all_tf_values)[None, :] == 0) & np.isfinite(Z)
+    elif active.shape != Z.shape:
+        raise ValueError(f"active alakja ({active.shape}) != Z alakja ({Z.shape})")
+    if overlap < 0:
+        raise ValueError(f"Az átfedés nem lehet negatív: {overlap}")
+
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunk_bounds(n_steps, n_chunks or workers)
+    if len(chunks) <= 1:
+        return ChunkedResult(kf.run_matrix(Z, progress_interval=0, minutes=steps, active=active), [])
+    workers = min(workers, len(chunks))
+
+    # Darabonként: (bemelegítés kezdősora, a következő darabba nyúló ellenőrző sorok)
+    overlaps = [0] + [int(overlap)] * (len(chunks) - 1)
+    tails = [min(check_rows, nxt[1] - nxt[0]) for nxt in chunks[1:]] + [0]
+
+    def task(c: int) -> tuple:
+        lo, hi = chunks[c]
+        warm = 0 if c == 0 else int(np.searchsorted(steps, steps[lo] - overlaps[c]))
+        end = hi + tails[c]
+        return (kf, c > 0, Z[warm:end], steps[warm:end], active[warm:end], lo - warm)
+
+    results: dict[int, tuple] = {}
+    seams: dict[int, SeamReport] = {}
+    pending = list(range(len(chunks)))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while pending:
+            tasks = [task(c) for c in pending]
+            if pool is None:
+                # Helyben: az eredeti szűrő állapota a darabok között ne változzon
+                done = [_filter_chunk(copy.deepcopy(t[0]), *t[1:]) for t in tasks]
+            else:
+                done = list(pool.map(_filter_chunk, *zip(*tasks)))
+            results.update(zip(pending, done))
+
+            retry = []
+            for c in range(1, len(chunks)):
+                if c not in pending and c - 1 not in pending and c in seams:
+                    continue
+                lo, hi = chunks[c]
+                prev_hi = chunks[c - 1][1]
+                ref = results[c - 1][0][prev_hi - chunks[c - 1][0]:]
+                new = results[c][0][:tails[c - 1]]
+                dx, dP = _seam_deviation(ref, new)
+                seams[c] = SeamReport(lo, int(steps[lo]), overlaps[c], dx, dP)
+                at_start = steps[lo] - overlaps[c] <= steps[0]
+                if seams[c].deviation > tol and not at_start:
+                    overlaps[c] = max(2 * overlaps[c], 1)
+                    retry.append(c)
+            if retry:
+                logger.info(f"  Darabolt szűrő: {len(retry)} varrat > tol={tol:g} → dupla átfedéssel újra")
+            pending = retry
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    arrays = KalmanArrays.allocate(n_steps, kf.all_tf_values)
+    for c, (lo, hi) in enumerate(chunks):
+        part = results[c][0]
+        for key in ("step_idx", "x", "P", "x_pred", "P_pred", "innovation", "S", "K", "mahalanobis", "active"):
+            getattr(arrays, key)[lo:hi] = getattr(part, key)[:hi - lo]
+
+    # Szűrő állapot: az utolsó darab vége (ott nincs ellenőrző farok)
+    _, x_last, P_last, last_step = results[len(chunks) - 1]
+    kf.set_state(x_last, P_last, last_step)
+    kf.arrays = arrays
+
+    report = [seams[c] for c in sorted(seams)]
+    worst = max(report, key=lambda s: s.deviation)
+    annotate(workers=workers, chunks=len(chunks), max_deviation=worst.deviation)
+    logger.info(f"Darabolt szűrő kész: {n_steps} lépés, {len(chunks)} darab, "
+                f"max varrat eltérés {worst.deviation:.2e} (sor {worst.row}, átfedés {worst.overlap} perc)")
+    if worst.deviation > tol:
+        logger.warning(f"Darabolt szűrő: a varrat eltérés ({worst.deviation:.2e}) tol={tol:g} fölött "
+                       f"marad — nagyobb átfedés vagy kevesebb darab kell")
+    return ChunkedResult(arrays, report)
@@ -0,0 +1,119 @@
+"""
+Aktív-TF minta regiszter — előre épített H, Hᵀ, R, W mátrixok bitmaszk szerint.
+
+Az aktív TF-halmaz csak néhány különböző mintát vesz fel, amelyek
+lcm(timeframes) periódussal ismétlődnek (pl. 1m,5m,15m,30m,1h → 60 lépés,
+5 minta). A mátrixokat egyszer építjük, az update lépés csak kikeresi őket.
+
+Bitmaszk: a j. bit = a `tf_values[j]` TF aktív (TF percek növekvő sorrendben).
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import reduce
+
+import numpy as np
+
+from .matrices import build_H_matrix, build_R_matrix, build_R_whitening
+
+
+@dataclass(frozen=True)
+class ObservationPattern:
+    """Egy aktív-TF mintához tartozó mérési modell."""
+
+    mask: int                   # bitmaszk a tf_values felett
+    cols: list[int]             # aktív oszlopok indexei (index layout)
+    tf_minutes: list[int]       # aktív TF-ek percben
+    H: np.ndarray               # [k x 3] megfigyelési mátrix
+    H_T: np.ndarray             # [3 x k] H transzponált (folytonos másolat)
+    R: np.ndarray               # [k x k] mérési zaj kovariancia
+    W: np.ndarray               # [k x k] fehérítő mátrix (W R Wᵀ = I)
+    H_w: np.ndarray             # [k x 3] fehérített megfigyelési mátrix (W H)
+
+
+def schedule_period(tf_values: list[int]) -> int:
+    """Az aktív-TF ütemezés periódusa: lcm(tf_values)."""
+    return reduce(math.lcm, tf_values, 1)
+
+
+def schedule_masks(tf_values: list[int], steps: np.ndarray) -> np.ndarray:
+    """[N] ütemezett bitmaszk (step % n == 0) minden lépésre."""
+    bits = 1 << np.arange(len(tf_values), dtype=np.int64)
+    due = steps[:, None] % np.asarray(tf_values)[None, :] == 0
+    return due.astype(np.int64) @ bits
+
+
+def active_to_masks(active: np.ndarray) -> np.ndarray:
+    """[N x k] bool aktív maszk → [N] bitmaszk."""
+    bits = 1 << np.arange(active.shape[1], dtype=np.int64)
+    return active.astype(np.int64) @ bits
+
+
+class PatternRegistry:
+    """
+    Bitmaszk → ObservationPattern regiszter.
+
+    Konstruáláskor az ütemezés egy periódusának összes mintáját felépíti;
+    hiányzó mérések miatt előálló egyéb minták első használatkor épülnek.
+    """
+
+    def __init__(
+        self,
+        tf_values: list[int],
+        sigma2_1m: float,
+        h_mode: str = "discrete",
+        r_mode: str = "full",
+    ):
+        self.tf_values = list(tf_values)
+        self.sigma2_1m = sigma2_1m
+        self.h_mode = h_mode
+        self.r_mode = r_mode
+        self.period = schedule_period(self.tf_values)
+        self._col_of = {n: j for j, n in enumerate(self.tf_values)}
+        self._patterns: dict[int, ObservationPattern] = {}
+
+        for mask in np.unique(schedule_masks(self.tf_values, np.arange(self.period))):
+            if mask:
+                self._patterns[int(mask)] = self._build(int(mask))
+
+    def _build(self, mask: int) -> ObservationPattern:
+        cols = [j for j in range(len(self.tf_values)) if mask >> j & 1]
+        tfs = [self.tf_values[j] for j in cols]
+        H = build_H_matrix(tfs, self.h_mode)
+        W = build_R_whitening(tfs, self.sigma2_1m, self.r_mode)
+        return ObservationPattern(
+            mask=mask,
+            cols=cols,
+            tf_minutes=tfs,
+            H=H,
+            H_T=np.ascontiguousarray(H.T),
+            R=build_R_matrix(tfs, self.sigma2_1m, self.r_mode),
+            W=W,
+            H_w=W @ H,
+        )
+
+    def get(self, mask: int) -> ObservationPattern:
+        """Minta bitmaszk szerint (hiányzó minta lusta építéssel)."""
+        pattern = self._patterns.get(mask)
+        if pattern is None:
+            pattern = self._patterns[mask] = self._build(mask)
+        return pattern
+
+    def mask_of(self, active_tf_minutes: list[int]) -> int:
+        """Aktív TF percek → bitmaszk."""
+        mask = 0
+        for n in active_tf_minutes:
+            mask |= 1 << self._col_of[n]
+        return mask
+
+    def for_tfs(self, active_tf_minutes: list[int]) -> ObservationPattern:
+        """Minta az aktív TF percek listája alapján."""
+        return self.get(self.mask_of(active_tf_minutes))
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def __contains__(self, mask: int) -> bool:
+        return mask in self._patterns
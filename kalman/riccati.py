@@ -0,0 +1,205 @@
+"""
+Periodikus Riccati megoldó — a konvergált P előre kiszámolva, burn-in nélkül.
+
+A kovariancia rekurzió (predikció + frissítés) nem függ a mérések
+értékétől, csak az aktív-TF ütemezéstől, amely lcm(tf_minutes) = T
+periódusú. A szűrő így egy T hosszú periodikus P sorozatra konvergál;
+ha P0 = eye · P0_scale helyett ebből indulunk, a becslés már az első
+lépéstől használható (a run_research burn-in levágása elhagyható).
+
+Megoldás duplázással: egy lépés kovariancia része az (A, C, J) elem
+
+    x_j | x_i, y_{i+1:j}  ~  N(A x_i + ..., C),    J = y_{i+1:j} információja x_i-re
+
+és két szomszédos szakasz eleme asszociatívan kombinálható (lásd
+`combine`). Egy periódus elemét lépésenként összerakjuk, majd önmagával
+kombinálva duplázzuk (1, 2, 4, ... periódus): m duplázás 2^m periódusnyi
+előzményt jelent, és C a steady-state posteriorhoz tart, a kezdőfeltételtől
+függetlenül. A fázisonkénti P / P_pred egy további periódus Joseph formájú
+propagációjából adódik.
+
+Használat:
+    sol = solve_periodic((1, 5, 15, 60), q=1e-9, sigma2_1m=1e-6)
+    P0 = sol.posterior(first_step - 1)
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from .matrices import build_F, build_Q
+from .patterns import ObservationPattern, PatternRegistry, schedule_masks
+
+logger = logging.getLogger(__name__)
+
+_I3 = np.eye(3)
+
+# A szűrő posterior P regularizációja (MultiTFKalmanFilter._stabilize_P)
+P_FLOOR = 1e-12
+_MAX_FLOOR_ROUNDS = 8
+
+
+@dataclass(frozen=True)
+class RiccatiElement:
+    """Egy szakasz kovariancia eleme: x_j = A x_i + ..., Cov = C, információ x_i-re J."""
+
+    A: np.ndarray
+    C: np.ndarray
+    J: np.ndarray
+
+
+def step_element(F: np.ndarray, Q: np.ndarray, pattern: Optional[ObservationPattern]) -> RiccatiElement:
+    """Egy lépés (predikció, majd frissítés a minta méréseivel) eleme."""
+    if pattern is None:
+        return RiccatiElement(F, Q, np.zeros((3, 3)))
+    H = pattern.H
+    S = H @ Q @ H.T + pattern.R
+    K = np.linalg.solve(S, H @ Q).T                 # Q Hᵀ S⁻¹
+    IKH = _I3 - K @ H
+    C = IKH @ Q
+    HF = H @ F
+    return RiccatiElement(
+        A=IKH @ F,
+        C=(C + C.T) / 2.0,
+        J=HF.T @ np.linalg.solve(S, HF),
+    )
+
+
+def combine(a: RiccatiElement, b: RiccatiElement) -> RiccatiElement:
+    """Az `a` utáni `b` szakasz összevont eleme (asszociatív)."""
+    # b.A (I + C_a J_b)⁻¹  és  A_aᵀ (I + J_b C_a)⁻¹
+    BW = np.linalg.solve((_I3 + a.C @ b.J).T, b.A.T).T
+    AW = np.linalg.solve((_I3 + b.J @ a.C).T, a.A).T
+    C = BW @ a.C @ b.A.T + b.C
+    J = AW @ b.J @ a.A + a.J
+    return RiccatiElement(A=BW @ a.A, C=(C + C.T) / 2.0, J=(J + J.T) / 2.0)
+
+
+@dataclass(frozen=True)
+class PeriodicRiccati:
+    """Fázisonkénti (k mod T) steady-state kovariancia: P_pred a frissítés előtt, P utána."""
+
+    period: int
+    P_pred: np.ndarray          # [T x 3 x 3]
+    P: np.ndarray               # [T x 3 x 3]
+    doublings: int              # hány duplázás kellett (2^m periódus)
+
+    def prior(self, step_idx: int) -> np.ndarray:
+        return self.P_pred[step_idx % self.period].copy()
+
+    def posterior(self, step_idx: int) -> np.ndarray:
+        """A `step_idx` lépés utáni P — a következő lépés kezdő kovarianciája."""
+        return self.P[step_idx % self.period].copy()
+
+
+def _converged(C: np.ndarray, prev: np.ndarray, tol: float) -> bool:
+    scale = np.sqrt(np.outer(np.diag(prev), np.diag(prev)))
+    return bool(np.all(np.abs(C - prev) <= tol * scale))
+
+
+def _double(elem: RiccatiElement, tol: float, max_doublings: int) -> tuple[RiccatiElement, int]:
+    """Az elem duplázása C konvergenciájáig. Returns: (elem, duplázások száma)."""
+    for m in range(1, max_doublings + 1):
+        nxt = combine(elem, elem)
+        if _converged(nxt.C, elem.C, tol):
+            return nxt, m
+        elem = nxt
+    logger.warning(f"Periodikus Riccati: {max_doublings} duplázás után sem konvergált (tol={tol:g})")
+    return elem, max_doublings
+
+
+def _propagate(
+    F: np.ndarray,
+    Q: np.ndarray,
+    phase_patterns: list[Optional[ObservationPattern]],
+    P: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Egy periódus a szűrő kovariancia lépéseivel (Joseph forma, szimmetrizálás,
+    P_FLOOR regularizáció). Returns: (P_pred [T], P [T], regularizált fázisok [T]).
+    """
+    T = len(phase_patterns)
+    P_pred = np.zeros((T, 3, 3))
+    P_all = np.zeros((T, 3, 3))
+    bumped = np.zeros(T, dtype=bool)
+    for p, pattern in enumerate(phase_patterns):
+        P = F @ P @ F.T + Q
+        P_pred[p] = P
+        if pattern is not None:
+            H = pattern.H
+            S = H @ P @ H.T + pattern.R
+            K = np.linalg.solve(S, H @ P).T
+            IKH = _I3 - K @ H
+            P = IKH @ P @ IKH.T + K @ pattern.R @ K.T
+        P = (P + P.T) / 2.0
+        if np.linalg.eigvalsh(P).min() < P_FLOOR:
+            P = P + _I3 * P_FLOOR
+            bumped[p] = True
+        P_all[p] = P
+    return P_pred, P_all, bumped
+
+
+@lru_cache(maxsize=64)
+def solve_periodic(
+    tf_values: tuple[int, ...],
+    q: float,
+    sigma2_1m: float,
+    h_mode: str = "discrete",
+    r_mode: str = "full",
+    dt: float = 1.0,
+    tol: float = 1e-12,
+    max_doublings: int = 64,
+) -> PeriodicRiccati:
+    """
+    A periodikus Riccati egyenlet megoldása (paraméterenként egyszer, gyorsítótárazva).
+
+    A szűrő a posterior P-t P_FLOOR · I-vel regularizálja, ha a legkisebb
+    sajátértéke ez alá esik (kis q mellett egyes fázisokban minden
+    periódusban). Ez az adott fázisban egy többlet zajelem, így a megoldás
+    a regularizált fázisok halmazának fixpontjáig iterál — az eredmény a
+    szűrő saját (regularizált) határértéke.
+
+    Args:
+        tf_values: TF-ek percben, növekvő sorrendben
+        tol: relatív konvergencia küszöb két duplázás C-je között
+
+    Returns:
+        PeriodicRiccati (csak olvasható tömbökkel — a hívó másoljon)
+    """
+    F = build_F(dt)
+    Q = build_Q(q, dt)
+    patterns = PatternRegistry(list(tf_values), sigma2_1m, h_mode, r_mode)
+    T = patterns.period
+    sched = schedule_masks(list(tf_values), np.arange(T))
+    phase_patterns = [patterns.get(int(m)) if m else None for m in sched]
+    steps = [step_element(F, Q, pattern) for pattern in phase_patterns]
+    floor = RiccatiElement(_I3, _I3 * P_FLOOR, np.zeros((3, 3)))
+
+    bumped = np.zeros(T, dtype=bool)
+    for _ in range(_MAX_FLOOR_ROUNDS):
+        # Egy periódus eleme: a 0..T-1 fázisú lépések sorban (+ regularizáció)
+        elem = None
+        for p, step in enumerate(steps):
+            if bumped[p]:
+                step = combine(step, floor)
+            elem = step if elem is None else combine(elem, step)
+
+        # Duplázás: 2^m periódus, amíg C (a T-1 fázis posteriorja) be nem áll
+        elem, m = _double(elem, tol, max_doublings)
+
+        # Fázisonkénti P_pred / P: egy periódus propagáció a konvergált posteriorból
+        P_pred, P_all, now = _propagate(F, Q, phase_patterns, elem.C)
+        if np.array_equal(now, bumped):
+            break
+        bumped = now
+
+    P_pred.setflags(write=False)
+    P_all.setflags(write=False)
+    logger.info(f"Periodikus Riccati: T={T}, {m} duplázás (2^{m} periódus), "
+                f"{int(bumped.sum())} regularizált fázis")
+    return PeriodicRiccati(period=T, P_pred=P_pred, P=P_all, doublings=m)
@@ -1,5 +1,9 @@
 """
-Rauch–Tung–Striebel (RTS) simító — backward pass.
+Rauch–Tung–Striebel (RTS) simító — backward pass + fixed-lag online változat.
+
+A simító gainek (C_k = P_k Fᵀ P_{k+1|k}⁻¹) egyszerre, stackelt Cholesky
+megoldással számolódnak (explicit inverz nélkül); a backward rekurzió
+csak a már kiszámolt affin tagokat alkalmazza, előre lefoglalt kimenetbe.
 
 Ref: KALMAN_LOG_MULTI_TF.md 6.8 fejezet
 """
@@ -7,11 +11,14 @@ Ref: KALMAN_LOG_MULTI_TF.md 6.8 fejezet
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Iterator, Optional
 
 import numpy as np
 import pandas as pd
 
-from .filter import KalmanState
+from profiling import profiled
+
+from .filter import KalmanArrays, KalmanState
 
 
 @dataclass
@@ -22,75 +29,257 @@ class SmoothedState:
     P: np.ndarray   # [3x3] simított kovariancia
 
 
+@dataclass
+class SmoothedArrays:
+    """Oszlopos simított kimenet (a history-val azonos indexeléssel)."""
+
+    x: np.ndarray   # [N x 3] simított állapot
+    P: np.ndarray   # [N x 3 x 3] simított kovariancia
+
+    @classmethod
+    def allocate(cls, n_steps: int) -> SmoothedArrays:
+        return cls(x=np.empty((n_steps, 3)), P=np.empty((n_steps, 3, 3)))
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __getitem__(self, i: int) -> SmoothedState:
+        return SmoothedState(x=self.x[i].reshape(3, 1).copy(), P=self.P[i].copy())
+
+    def __iter__(self) -> Iterator[SmoothedState]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+# ── Stackelt simító gain ─────────────────────────────────────────────────────
+
+
+def _cho_solve3(L: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """
+    L Lᵀ X = B megoldása stackelt 3x3 Cholesky faktorral.
+
+    Args:
+        L: [N x 3 x 3] alsó háromszög faktor
+        B: [N x 3 x m] jobb oldal
+    """
+    Y = np.empty_like(B)
+    for i in range(3):
+        Y[:, i] = (B[:, i] - np.einsum("nj,njm->nm", L[:, i, :i], Y[:, :i])) / L[:, i, i, None]
+    X = np.empty_like(B)
+    for i in (2, 1, 0):
+        X[:, i] = (Y[:, i] - np.einsum("nj,njm->nm", L[:, i + 1:, i], X[:, i + 1:])) / L[:, i, i, None]
+    return X
+
+
+def smoother_gains(P_f: np.ndarray, P_pred_next: np.ndarray, F: np.ndarray) -> np.ndarray:
+    """
+    C_k = P_k Fᵀ P_{k+1|k}⁻¹ az összes lépésre egyszerre.
+
+    Cᵀ = P_{k+1|k}⁻¹ (F P_k) — a szimmetrikus pozitív definit P_{k+1|k}
+    Cholesky faktorával oldjuk meg; nem pozitív definit stack esetén
+    pszeudoinverz a tartalék.
+
+    Args:
+        P_f: [N x 3 x 3] szűrt P_k|k
+        P_pred_next: [N x 3 x 3] predikált P_{k+1|k}
+    """
+    FP = F @ P_f
+    try:
+        L = np.linalg.cholesky(P_pred_next)
+        CT = _cho_solve3(L, FP)
+    except np.linalg.LinAlgError:
+        CT = np.linalg.pinv(P_pred_next) @ FP
+    return CT.transpose(0, 2, 1)
+
+
+def transition_stack(step_idx: np.ndarray, F: np.ndarray) -> np.ndarray:
+    """
+    Az egymást követő lépések közötti átmenet: F^(t_{k+1} − t_k).
+
+    Rés nélküli history-nál maga F ([3 x 3]); réseknél [N-1 x 3 x 3]
+    stack, a különböző lépésközök mátrixhatványa egyszer számolva.
+    """
+    dt = np.maximum(np.diff(np.asarray(step_idx, dtype=np.int64)), 1)
+    if not (dt > 1).any():
+        return F
+    values, inverse = np.unique(dt, return_inverse=True)
+    powers = np.stack([np.linalg.matrix_power(F, int(d)) for d in values])
+    return powers[inverse]
+
+
+# ── Teljes RTS ───────────────────────────────────────────────────────────────
+
+
+@profiled("kalman.rts_smooth")
 def rts_smooth(
-    history: list[KalmanState],
+    history: KalmanArrays | list[KalmanState],
     F: np.ndarray,
-) -> list[SmoothedState]:
+    out: Optional[SmoothedArrays] = None,
+) -> SmoothedArrays:
     """
     RTS backward pass.
 
     A szűrt (forward-only) becsléseket visszamenőleg finomítja
-    a jövőbeli mérések figyelembevételével.
+    a jövőbeli mérések figyelembevételével:
+
+        x_k|N = C_k x_{k+1|N} + (x_k|k − C_k x_{k+1|k})
+        P_k|N = C_k P_{k+1|N} C_kᵀ + (P_k|k − C_k P_{k+1|k} C_kᵀ)
+
+    A zárójeles affin tagok és a C_k gainek vektorizáltan, előre
+    számolódnak; a ciklus csak a két mátrixszorzást végzi.
 
     Args:
-        history: a filter.run() által gyűjtött KalmanState lista
-        F: állapotátmeneti mátrix
+        history: a filter.run() oszlopos outputja (KalmanArrays),
+                 vagy a step()-ek által gyűjtött KalmanState sorozat
+        F: egylépéses állapotátmeneti mátrix (réseknél a history step_idx
+           különbségei szerinti hatványa lép be)
+        out: opcionális előre lefoglalt kimenet (len(history) hosszú)
 
     Returns:
-        SmoothedState lista (azonos indexeléssel mint a history)
+        SmoothedArrays (azonos indexeléssel mint a history)
     """
+    if not isinstance(history, KalmanArrays):
+        history = KalmanArrays.from_history(list(history))
     N = len(history)
+    if out is None:
+        out = SmoothedArrays.allocate(N)
+    elif len(out) != N:
+        raise ValueError(f"A kimenet hossza ({len(out)}) != history hossza ({N})")
     if N == 0:
-        return []
+        return out
+
+    x_f, P_f = history.x, history.P
+    x_pred, P_pred = history.x_pred, history.P_pred
 
     # Inicializálás: az utolsó lépés simított = szűrt
-    smoothed = [SmoothedState(x=np.zeros((3, 1)), P=np.zeros((3, 3)))] * N
-    smoothed[N - 1] = SmoothedState(
-        x=history[N - 1].x.copy(),
-        P=history[N - 1].P.copy(),
-    )
+    x_s, P_s = out.x, out.P
+    x_s[N - 1] = x_f[N - 1]
+    P_s[N - 1] = P_f[N - 1]
+    if N == 1:
+        return out
+
+    F_k = transition_stack(history.step_idx, F)                 # [3 x 3] / [N-1 x 3 x 3]
+    C = smoother_gains(P_f[:-1], P_pred[1:], F_k)               # [N-1 x 3 x 3]
+    CT = C.transpose(0, 2, 1)
+    b = x_f[:-1] - np.einsum("nij,nj->ni", C, x_pred[1:])      # [N-1 x 3]
+    D = P_f[:-1] - C @ P_pred[1:] @ CT                          # [N-1 x 3 x 3]
 
     # Visszafelé haladva
     for k in range(N - 2, -1, -1):
-        P_k = history[k].P            # szűrt P_k|k
-        P_kp1_pred = history[k + 1].P_pred  # predikált P_{k+1|k}
+        x_s[k] = C[k] @ x_s[k + 1] + b[k]
+        P_k = C[k] @ P_s[k + 1] @ CT[k] + D[k]
+        # Szimmetrizálás
+        P_s[k] = (P_k + P_k.T) / 2.0
 
-        # Smoother gain
-        try:
-            P_pred_inv = np.linalg.inv(P_kp1_pred)
-        except np.linalg.LinAlgError:
-            P_pred_inv = np.linalg.pinv(P_kp1_pred)
+    return out
 
-        C_k = P_k @ F.T @ P_pred_inv
 
-        # Simított állapot
-        x_s = history[k].x + C_k @ (smoothed[k + 1].x - history[k + 1].x_pred)
-        P_s = P_k + C_k @ (smoothed[k + 1].P - P_kp1_pred) @ C_k.T
+# ── Fixed-lag simító (online) ────────────────────────────────────────────────
 
-        # Szimmetrizálás
-        P_s = (P_s + P_s.T) / 2.0
 
-        smoothed[k] = SmoothedState(x=x_s, P=P_s)
+class FixedLagSmoother:
+    """
+    Online fixed-lag RTS: minden új lépésnél az utolsó L+1 lépésnyi ablak
+    visszafelé simítása, lépésenként O(L) költséggel.
+
+    A gain és az affin tagok lépésenként egyszer számolódnak (amikor a
+    következő predikált kovariancia megérkezik), a gyűrűben tárolva.
+
+    Használat:
+        fls = FixedLagSmoother(kf.F, lag=30)
+        state = kf.step(i, measurements)
+        lagged = fls.push(state)          # x_{i-30 | i}, vagy None
+    """
+
+    def __init__(self, F: np.ndarray, lag: int):
+        if lag < 1:
+            raise ValueError(f"A lag legalább 1 kell legyen: {lag}")
+        self.F = F
+        self._F_pow: dict[int, np.ndarray] = {1: F}
+        self.lag = lag
+        W = lag + 1
+        self._step = np.zeros(W, dtype=np.int64)
+        self._x_f = np.zeros((W, 3))
+        self._P_f = np.zeros((W, 3, 3))
+        self._x_pred = np.zeros((W, 3))
+        self._P_pred = np.zeros((W, 3, 3))
+        # Gain és affin tagok a k. lépéshez (a k+1. lépés érkezésekor töltődik)
+        self._C = np.zeros((W, 3, 3))
+        self._b = np.zeros((W, 3))
+        self._D = np.zeros((W, 3, 3))
+        self.n_seen = 0
+        self.window = SmoothedArrays.allocate(W)
+
+    def push(self, state: KalmanState) -> Optional[tuple[int, SmoothedState]]:
+        """
+        Új szűrt lépés hozzáadása és az ablak újrasimítása.
+
+        Returns:
+            (lépés index, x_{t−L|t}) az L lépéssel korábbi állapotra,
+            vagy None amíg az ablak nem telt meg
+        """
+        W = self.lag + 1
+        t = self.n_seen
+        j = t % W
+        self._step[j] = state.step_idx
+        self._x_f[j] = state.x[:, 0]
+        self._P_f[j] = state.P
+        self._x_pred[j] = state.x_pred[:, 0]
+        self._P_pred[j] = state.P_pred
+        self.n_seen += 1
+
+        if t > 0:
+            i = (t - 1) % W
+            dt = max(int(self._step[j] - self._step[i]), 1)
+            F = self._F_pow.get(dt)
+            if F is None:
+                F = self._F_pow[dt] = np.linalg.matrix_power(self.F, dt)
+            C = smoother_gains(self._P_f[i][None], self._P_pred[j][None], F)[0]
+            self._C[i] = C
+            self._b[i] = self._x_f[i] - C @ self._x_pred[j]
+            self._D[i] = self._P_f[i] - C @ self._P_pred[j] @ C.T
+
+        # Visszafelé az ablakban (legfeljebb L lépés)
+        n = min(t + 1, W)
+        x_s, P_s = self.window.x, self.window.P
+        x_s[n - 1] = self._x_f[j]
+        P_s[n - 1] = self._P_f[j]
+        for m in range(n - 2, -1, -1):
+            i = (t - (n - 1) + m) % W
+            C = self._C[i]
+            x_s[m] = C @ x_s[m + 1] + self._b[i]
+            P_m = C @ P_s[m + 1] @ C.T + self._D[i]
+            P_s[m] = (P_m + P_m.T) / 2.0
+
+        if t < self.lag:
+            return None
+        return int(self._step[(t + 1) % W]), self.window[0]
 
-    return smoothed
+    def smoothed_window(self) -> tuple[np.ndarray, SmoothedArrays]:
+        """(lépés indexek, simított ablak) időrendben — az utolsó push állapota."""
+        n = min(self.n_seen, self.lag + 1)
+        order = (self.n_seen - n + np.arange(n)) % (self.lag + 1)
+        return self._step[order], SmoothedArrays(x=self.window.x[:n], P=self.window.P[:n])
 
 
 def smoothed_to_df(
-    smoothed: list[SmoothedState],
+    smoothed: SmoothedArrays | list[SmoothedState],
     index: pd.DatetimeIndex,
 ) -> pd.DataFrame:
-    """SmoothedState lista → DataFrame."""
-    records = []
-    for s in smoothed:
-        records.append({
-            "mu_smooth": s.x[0, 0],
-            "mu_dot_smooth": s.x[1, 0],
-            "mu_ddot_smooth": s.x[2, 0],
-            "P00_smooth": s.P[0, 0],
-            "P11_smooth": s.P[1, 1],
-            "P22_smooth": s.P[2, 2],
-        })
-    df = pd.DataFrame(records)
+    """Simított kimenet → DataFrame."""
+    if not isinstance(smoothed, SmoothedArrays):
+        smoothed = SmoothedArrays(
+            x=np.array([s.x[:, 0] for s in smoothed]).reshape(-1, 3),
+            P=np.array([s.P for s in smoothed]).reshape(-1, 3, 3),
+        )
+    df = pd.DataFrame({
+        "mu_smooth": smoothed.x[:, 0],
+        "mu_dot_smooth": smoothed.x[:, 1],
+        "mu_ddot_smooth": smoothed.x[:, 2],
+        "P00_smooth": smoothed.P[:, 0, 0],
+        "P11_smooth": smoothed.P[:, 1, 1],
+        "P22_smooth": smoothed.P[:, 2, 2],
+    })
     if len(df) == len(index):
         df.index = index
     return df
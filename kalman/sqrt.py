@@ -0,0 +1,132 @@
+"""
+Négyzetgyök (Cholesky-faktor) kovariancia forma — LQ predikció, Potter update.
+
+A szűrő P helyett annak egy négyzetgyökét (P = L Lᵀ) propagálja:
+
+    predikció:  [F L | L_Q] = L⁻ · Θ  (LQ felbontás, Θ ortogonális)
+                → L⁻ alsó háromszög, L⁻ L⁻ᵀ = F P Fᵀ + Q
+    update:     a fehérített mérésekkel (z̃ = W z, H̃ = W H, R̃ = I) soronként
+                Potter-féle skalár frissítés:
+                    φ = Lᵀ h̃,  s = φᵀφ + 1,  g = L φ / s
+                    x += g ν̃,  L ← L (I − γ φ φᵀ),  γ = 1 / (s + √s)
+
+P így konstrukció szerint szimmetrikus és pozitív szemidefinit: nincs
+sajátérték-felbontás, szimmetrizálás vagy regularizáció. A faktor
+kondíciószáma √cond(P), így kis q / nagy P0_scale mellett sem veszít
+pontosságot a P⁻ − K S Kᵀ kivonás.
+
+A 3x3 algebra Python float-okon fut: apró mátrixokon a NumPy / LAPACK
+hívások overheadje (pl. np.linalg.qr ~30 µs) többszöröse a műveletigénynek.
+
+Ref: Potter (1963); Bierman, "Factorization Methods" 5. fejezet
+"""
+
+from __future__ import annotations
+
+import math
+import operator
+
+import numpy as np
+
+from .patterns import ObservationPattern
+
+
+def _dot(a: list[float], b: list[float]) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+def _lq_lower(a0: list[float], a1: list[float], a2: list[float]) -> list[list[float]]:
+    """
+    A = [a0; a1; a2] (3 x m) LQ felbontásának alsó háromszög faktora: L Lᵀ = A Aᵀ.
+
+    Soronkénti módosított Gram–Schmidt (Aᵀ QR felbontásának R faktora);
+    az R faktor backward stabil, a Householder változattal azonos
+    pontosságú (Björck, 1967). Q nem kell, csak L.
+    """
+    l00 = math.sqrt(_dot(a0, a0))
+    q0 = [v / l00 for v in a0]
+    l10 = _dot(a1, q0)
+    l20 = _dot(a2, q0)
+    r1 = [v - l10 * q for v, q in zip(a1, q0)]
+    r2 = [v - l20 * q for v, q in zip(a2, q0)]
+    l11 = math.sqrt(_dot(r1, r1))
+    q1 = [v / l11 for v in r1]
+    l21 = _dot(r2, q1)
+    r2 = [v - l21 * q for v, q in zip(r2, q1)]
+    l22 = math.sqrt(_dot(r2, r2))
+    return [[l00, 0.0, 0.0], [l10, l11, 0.0], [l20, l21, l22]]
+
+
+def sqrt_predict(
+    x: np.ndarray, L: np.ndarray, F: np.ndarray, L_Q: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Predikció faktor formában.
+
+    Args:
+        x: [3x1] állapot
+        L: [3x3] P egy négyzetgyöke (P = L Lᵀ)
+        L_Q: [3x3] Q Cholesky faktora
+
+    Returns:
+        (x_pred, L_pred) — L_pred alsó háromszög
+    """
+    FL = (F @ L).tolist()
+    LQ = L_Q.tolist()
+    L_pred = _lq_lower(FL[0] + LQ[0], FL[1] + LQ[1], FL[2] + LQ[2])
+    return F @ x, np.array(L_pred)
+
+
+def sqrt_update(
+    x_pred: np.ndarray,
+    L_pred: np.ndarray,
+    z: np.ndarray,
+    pattern: ObservationPattern,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, float]:
+    """
+    Korrekció k Potter-féle skalár frissítéssel a fehérített méréseken.
+
+    A Mahalanobis-távolság a skalár innovációkból összegződik
+    (Σ ν̃²/s = νᵀ S⁻¹ ν); a history-hoz az eredeti ν, S és a teljes
+    K = P⁺ H̃ᵀ W is előáll.
+
+    Returns:
+        (x_updated, L_updated, innovation, S, K, mahalanobis)
+    """
+    x0, x1, x2 = x_pred[:, 0].tolist()
+    (l00, l01, l02), (l10, l11, l12), (l20, l21, l22) = L_pred.tolist()
+    mahal = 0.0
+    for (h0, h1, h2), zi in zip(pattern.H_w.tolist(), (pattern.W @ z[:, 0]).tolist()):
+        f0 = l00 * h0 + l10 * h1 + l20 * h2                 # φ = Lᵀ h̃
+        f1 = l01 * h0 + l11 * h1 + l21 * h2
+        f2 = l02 * h0 + l12 * h1 + l22 * h2
+        s = f0 * f0 + f1 * f1 + f2 * f2 + 1.0
+        u0 = l00 * f0 + l01 * f1 + l02 * f2                 # L φ = P h̃ᵀ
+        u1 = l10 * f0 + l11 * f1 + l12 * f2
+        u2 = l20 * f0 + l21 * f1 + l22 * f2
+        nu = zi - (h0 * x0 + h1 * x1 + h2 * x2)
+        inv_s = 1.0 / s
+        x0 += u0 * inv_s * nu
+        x1 += u1 * inv_s * nu
+        x2 += u2 * inv_s * nu
+        mahal += nu * nu * inv_s
+        gamma = 1.0 / (s + math.sqrt(s))
+        g0, g1, g2 = gamma * u0, gamma * u1, gamma * u2
+        l00 -= g0 * f0
+        l01 -= g0 * f1
+        l02 -= g0 * f2
+        l10 -= g1 * f0
+        l11 -= g1 * f1
+        l12 -= g1 * f2
+        l20 -= g2 * f0
+        l21 -= g2 * f1
+        l22 -= g2 * f2
+    x = np.array([[x0], [x1], [x2]])
+    L = np.array([[l00, l01, l02], [l10, l11, l12], [l20, l21, l22]])
+
+    H = pattern.H
+    innovation = z - H @ x_pred
+    HL = H @ L_pred
+    S = HL @ HL.T + pattern.R
+    K = L @ (L.T @ pattern.H_w.T) @ pattern.W
+    return x, L, innovation, S, K, mahal
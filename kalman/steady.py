@@ -0,0 +1,219 @@
+"""
+Periodikus steady-state gain — gyors út a konvergált szűrőhöz.
+
+A rendszer időinvariáns, kivéve az aktív-TF ütemezést (step % n == 0),
+így burn-in után P és K egy lcm(tf_minutes) hosszú ciklusra konvergál.
+Konvergencia után a fázisonkénti gain sorozat befagyasztható, és már
+csak az olcsó x-frissítés fut:
+
+    x_k = A_p · x_{k-1} + K_p · z_k,    A_p = (I - K_p H_p) F,  p = k mod T
+
+A fagyasztott szakaszt blokkosan, vektorizáltan számoljuk: egy T hosszú
+blokkon belül a rekurzió az összes blokkra egyszerre fut (T lépés),
+a blokkhatárok közti lánc pedig N/T skálájú.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+from .patterns import ObservationPattern
+
+_I3 = np.eye(3)
+
+
+class PeriodicGain:
+    """
+    Fázisonkénti (k mod T) gain-sorozat követése és befagyasztása.
+
+    A teljes út minden lépése után `observe()`-ot hívunk; ha egy teljes
+    perióduson át minden P_pred relatív eltérése az előző periódus azonos
+    fázisától `tol` alatt van (és minden mérés az ütemezés szerint megjött),
+    a sorozat befagy (`frozen = True`).
+    """
+
+    def __init__(
+        self,
+        F: np.ndarray,
+        sched_masks: np.ndarray,
+        tol: float = 1e-9,
+    ):
+        self.F = F
+        self.sched = np.asarray(sched_masks, dtype=np.int64)   # [T]
+        self.period = len(self.sched)
+        self.tol = tol
+
+        T = self.period
+        self.P = np.zeros((T, 3, 3))
+        self.P_pred = np.zeros((T, 3, 3))
+        self.K: list[Optional[np.ndarray]] = [None] * T
+        self.S: list[Optional[np.ndarray]] = [None] * T
+        self.S_inv: list[Optional[np.ndarray]] = [None] * T
+        self.A = np.zeros((T, 3, 3))
+        self.patterns: list[Optional[ObservationPattern]] = [None] * T
+        self.valid = np.zeros(T, dtype=bool)
+
+        self.run_len = 0
+        self.frozen = False
+
+    def phase(self, step_idx: int) -> int:
+        return step_idx % self.period
+
+    def matches(self, step_idx: int, mask: int) -> bool:
+        """A mérésminta megegyezik-e az ütemezettel (nincs hiányzó mérés)."""
+        return mask == self.sched[step_idx % self.period]
+
+    def _converged(self, p: int, P_pred: np.ndarray) -> bool:
+        prev = self.P_pred[p]
+        scale = np.sqrt(np.outer(np.diag(prev), np.diag(prev)))
+        return bool(np.all(np.abs(P_pred - prev) <= self.tol * scale))
+
+    def observe(
+        self,
+        step_idx: int,
+        mask: int,
+        pattern: Optional[ObservationPattern],
+        P_pred: np.ndarray,
+        P: np.ndarray,
+        K: Optional[np.ndarray],
+        S: Optional[np.ndarray],
+    ) -> bool:
+        """Egy teljes (nem fagyasztott) lépés rögzítése. Returns: frozen."""
+        p = step_idx % self.period
+        ok = mask == self.sched[p]
+
+        if ok and self.valid[p] and self._converged(p, P_pred):
+            self.run_len += 1
+        else:
+            self.run_len = 0
+
+        self.P_pred[p] = P_pred
+        self.P[p] = P
+        self.K[p] = K
+        self.S[p] = S
+        self.patterns[p] = pattern
+        self.valid[p] = ok
+
+        if self.run_len >= self.period:
+            self._freeze()
+        return self.frozen
+
+    def _freeze(self) -> None:
+        for p in range(self.period):
+            K, pattern = self.K[p], self.patterns[p]
+            if pattern is None:
+                self.A[p] = self.F
+                continue
+            try:
+                self.S_inv[p] = np.linalg.inv(self.S[p])
+            except np.linalg.LinAlgError:
+                self.S_inv[p] = np.linalg.pinv(self.S[p])
+            self.A[p] = (_I3 - K @ pattern.H) @ self.F
+        self.frozen = True
+
+    def reset(self) -> None:
+        """Visszaesés teljes kovariancia-propagációra (pl. hiányzó mérés)."""
+        self.run_len = 0
+        self.frozen = False
+
+    def frozen_update(
+        self,
+        step_idx: int,
+        x: np.ndarray,
+        z: Optional[np.ndarray],
+    ) -> tuple[np.ndarray, np.ndarray, Optional[np.ndarray], float]:
+        """
+        Olcsó lépés fagyasztott gain-nel.
+
+        Returns:
+            (x_upd, x_pred, innovation, mahalanobis)
+        """
+        p = step_idx % self.period
+        x_pred = self.F @ x
+        pattern = self.patterns[p]
+        if pattern is None:
+            return x_pred, x_pred, None, 0.0
+        innovation = z - pattern.H @ x_pred
+        x_upd = x_pred + self.K[p] @ innovation
+        mahal = float((innovation.T @ self.S_inv[p] @ innovation).item())
+        return x_upd, x_pred, innovation, mahal
+
+    def run_blocks(
+        self,
+        Z: np.ndarray,
+        x0: np.ndarray,
+        start: int,
+        n_blocks: int,
+        arrays,
+        step0: int = 0,
+    ) -> np.ndarray:
+        """
+        Teljes periódus-blokkok vektorizált szűrése fagyasztott gain-nel.
+
+        Args:
+            Z: [N x k] mérésmátrix
+            x0: [3] állapot a `start` előtti lépésben
+            start: első sor (a lépés indexe step0 + start, ennek fázisa 0)
+            n_blocks: blokkok száma (a lefedett szakasz: n_blocks · T lépés)
+            arrays: KalmanArrays — ide íródnak az eredmények
+            step0: a Z / arrays 0. sorának lépés indexe (sűrű szakasz eleje)
+
+        Returns:
+            [3] az utolsó szűrt állapot
+        """
+        T = self.period
+        M = n_blocks
+        stop = start + M * T
+        Zb = Z[start:stop].reshape(M, T, Z.shape[1])
+
+        # Blokkon belüli rekurzió nulla kezdőállapotból, minden blokkra egyszerre:
+        # Y_j = A_j · Y_{j-1} + K_j · z_j  és  Φ_j = A_j · Φ_{j-1}
+        Y = np.zeros((M, T, 3))
+        Phi = np.zeros((T, 3, 3))
+        y_prev = np.zeros((M, 3))
+        phi_prev = _I3
+        for j in range(T):
+            y = y_prev @ self.A[j].T
+            pattern = self.patterns[j]
+            if pattern is not None:
+                y = y + Zb[:, j, pattern.cols] @ self.K[j].T
+            Y[:, j] = y
+            Phi[j] = self.A[j] @ phi_prev
+            y_prev, phi_prev = y, Phi[j]
+
+        # Blokkhatárok láncolása: xb[m] = állapot a blokk előtti lépésben
+        xb = np.zeros((M + 1, 3))
+        xb[0] = x0
+        Phi_T = Phi[T - 1].T
+        for m in range(M):
+            xb[m + 1] = xb[m] @ Phi_T + Y[m, T - 1]
+
+        X = np.einsum("jab,mb->mja", Phi, xb[:M]) + Y           # [M x T x 3]
+        X_prev = np.concatenate([xb[:M, None, :], X[:, :-1]], axis=1)
+        X_pred = X_prev @ self.F.T
+
+        arrays.x[start:stop] = X.reshape(-1, 3)
+        arrays.x_pred[start:stop] = X_pred.reshape(-1, 3)
+        arrays.step_idx[start:stop] = np.arange(step0 + start, step0 + stop)
+        for j in range(T):
+            rows = slice(start + j, stop, T)
+            arrays.P[rows] = self.P[j]
+            arrays.P_pred[rows] = self.P_pred[j]
+            pattern = self.patterns[j]
+            if pattern is None:
+                arrays.mahalanobis[rows] = 0.0
+                continue
+            cols = pattern.cols
+            innov = Zb[:, j, cols] - X_pred[:, j] @ pattern.H_T
+            arrays.innovation[rows][:, cols] = innov
+            arrays.mahalanobis[rows] = np.einsum(
+                "mi,ij,mj->m", innov, self.S_inv[j], innov,
+            )
+            arrays.active[rows][:, cols] = True
+            idx = np.ix_(cols, cols)
+            arrays.S[rows][:, idx[0], idx[1]] = self.S[j]
+            arrays.K[rows][:, :, cols] = self.K[j]
+
+        return xb[M]
@@ -0,0 +1,239 @@
+"""
+Paraméter hangolás — egzakt Gauss log-likelihood + párhuzamos keresés.
+
+A szűrő innovációi (ν_k) és innovációs kovarianciái (S_k) adják a
+predikciós hiba dekompozíció szerinti egzakt log-likelihoodot:
+
+    log L = -½ Σ_k [ k_k·log 2π + log|S_k| + ν_kᵀ S_k⁻¹ ν_k ]
+
+A keresés (rács vagy koordinátánkénti) a (q, σ²_1m, P0_scale) térben fut,
+a konfigurációkat csomagokban egy ProcessPoolExecutor workerei értékelik
+ki BatchedMultiTFKalmanFilter-rel. A hozam mátrixot a workerek shared
+memory-ból olvassák — nem pickle-özzük feladatonként.
+
+Használat:
+    table = grid_search(Z, config.tf_minutes, base, {"q": [...], "sigma2_1m": [...]})
+    write_best_config(config, table.iloc[0], "config.tuned.yaml")
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
+from itertools import product
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from .batched import BatchedMultiTFKalmanFilter, FilterParams
+from .filter import KalmanArrays
+
+logger = logging.getLogger(__name__)
+
+TUNABLE = ("q", "sigma2_1m", "P0_scale")
+
+_LOG_2PI = float(np.log(2.0 * np.pi))
+
+
+def log_likelihood(arrays: KalmanArrays, burn_in: int = 0) -> float:
+    """
+    Egzakt Gauss log-likelihood egy lefutott szűrő history-jából.
+
+    Az S stack-et használja (a batch szűrőnél store_gain=True kell hozzá);
+    az inaktív TF-ek diagonálisát 1-re töltjük, így log|S| az aktív blokké.
+    """
+    active = arrays.active[burn_in:]
+    S = arrays.S[burn_in:] + np.eye(active.shape[1]) * (~active)[:, None, :]
+    logdet = np.linalg.slogdet(S)[1]
+    n_active = active.sum(axis=1)
+    ll = -0.5 * (n_active * _LOG_2PI + logdet + arrays.mahalanobis[burn_in:])
+    return float(ll.sum())
+
+
+# ── Shared memory a workereknek ──────────────────────────────────────────────
+
+_WORKER: dict = {}
+
+
+def _init_worker(
+    shm_name: str,
+    shape: tuple,
+    dtype: str,
+    tf_minutes: dict[str, int],
+    minutes: Optional[np.ndarray],
+) -> None:
+    """Worker inicializálás: a mérésmátrix csatolása shared memory-ból."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _WORKER["shm"] = shm
+    _WORKER["Z"] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    _WORKER["tf_minutes"] = tf_minutes
+    _WORKER["minutes"] = minutes
+
+
+def _evaluate_chunk(params: list[FilterParams], burn_in: int) -> list[float]:
+    """Egy konfiguráció-csomag log-likelihoodja (worker oldalon)."""
+    kf = BatchedMultiTFKalmanFilter(_WORKER["tf_minutes"], params)
+    # Csak a log-likelihood kell: lépésenkénti állapot stackek nélkül
+    kf.run_matrix(_WORKER["Z"], progress_interval=0, minutes=_WORKER["minutes"],
+                  store_states=False)
+    return kf.loglik[:, burn_in:].sum(axis=1).tolist()
+
+
+def evaluate(
+    Z: np.ndarray,
+    tf_minutes: dict[str, int],
+    params: list[FilterParams],
+    burn_in: int = 0,
+    max_workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    minutes: Optional[np.ndarray] = None,
+) -> list[float]:
+    """
+    Konfigurációk log-likelihoodja párhuzamosan.
+
+    Args:
+        Z: [N x k] mérésmátrix (returns_to_matrix)
+        params: kiértékelendő konfigurációk
+        burn_in: az első lépések kihagyása a likelihoodból
+        max_workers: worker processzek száma (None = CPU-k száma)
+        chunk_size: konfiguráció / feladat (None = automatikus)
+        minutes: [N] a sorok epoch percei (None = 0..N-1, rések nélkül)
+
+    Returns:
+        log-likelihood a params sorrendjében
+    """
+    if not params:
+        return []
+    max_workers = max_workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(len(params) / (max_workers * 4)))
+    chunks = [params[i:i + chunk_size] for i in range(0, len(params), chunk_size)]
+
+    Z = np.ascontiguousarray(Z, dtype=float)
+    shm = shared_memory.SharedMemory(create=True, size=max(Z.nbytes, 1))
+    try:
+        np.ndarray(Z.shape, dtype=Z.dtype, buffer=shm.buf)[:] = Z
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(chunks)),
+            initializer=_init_worker,
+            initargs=(shm.name, Z.shape, Z.dtype.str, tf_minutes, minutes),
+        ) as pool:
+            results = pool.map(_evaluate_chunk, chunks, [burn_in] * len(chunks))
+            return [ll for chunk_ll in results for ll in chunk_ll]
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _ranked(params: list[FilterParams], loglik: list[float]) -> pd.DataFrame:
+    table = pd.DataFrame([asdict(p) for p in params])
+    table["loglik"] = loglik
+    table = table.drop_duplicates(subset=list(asdict(params[0])), keep="first")
+    table = table.sort_values("loglik", ascending=False, ignore_index=True)
+    table.insert(0, "rank", np.arange(1, len(table) + 1))
+    return table
+
+
+def grid_search(
+    Z: np.ndarray,
+    tf_minutes: dict[str, int],
+    base: FilterParams,
+    grid: dict[str, list[float]],
+    burn_in: int = 0,
+    max_workers: Optional[int] = None,
+    minutes: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """
+    Teljes rács keresés a `grid` tengelyei mentén (a többi mező `base`-ből).
+
+    Returns:
+        log-likelihood szerint csökkenő rangsor DataFrame
+    """
+    unknown = set(grid) - set(TUNABLE)
+    if unknown:
+        raise ValueError(f"Nem hangolható paraméter(ek): {sorted(unknown)}")
+
+    names = list(grid)
+    params = [
+        replace(base, **dict(zip(names, values)))
+        for values in product(*(grid[n] for n in names))
+    ]
+    logger.info(f"Rács keresés: {len(params)} konfiguráció")
+    loglik = evaluate(Z, tf_minutes, params, burn_in, max_workers, minutes=minutes)
+    return _ranked(params, loglik)
+
+
+def coordinate_search(
+    Z: np.ndarray,
+    tf_minutes: dict[str, int],
+    start: FilterParams,
+    names: tuple[str, ...] = TUNABLE,
+    factors: tuple[float, ...] = (0.1, 0.3, 1.0, 3.0, 10.0),
+    n_rounds: int = 3,
+    burn_in: int = 0,
+    max_workers: Optional[int] = None,
+    minutes: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """
+    Koordinátánkénti keresés log-skálán.
+
+    Körönként minden paramétert a jelenlegi érték × factors pontokon
+    értékel ki (egy párhuzamos köteg), majd a legjobbra lép; a következő
+    körben a faktorok gyököt vonnak (finomodó lépésköz).
+
+    Returns:
+        az összes kiértékelt konfiguráció rangsora
+    """
+    unknown = set(names) - set(TUNABLE)
+    if unknown:
+        raise ValueError(f"Nem hangolható paraméter(ek): {sorted(unknown)}")
+
+    current = start
+    seen: list[FilterParams] = []
+    seen_ll: list[float] = []
+    for round_i in range(n_rounds):
+        exponent = 0.5 ** round_i
+        for name in names:
+            value = getattr(current, name)
+            candidates = [replace(current, **{name: value * f ** exponent}) for f in factors]
+            loglik = evaluate(Z, tf_minutes, candidates, burn_in, max_workers, minutes=minutes)
+            seen.extend(candidates)
+            seen_ll.extend(loglik)
+            current = candidates[int(np.argmax(loglik))]
+            logger.info(
+                f"  [{round_i + 1}/{n_rounds}] {name} = {getattr(current, name):.3e} "
+                f"(loglik {max(loglik):.2f})"
+            )
+    return _ranked(seen, seen_ll)
+
+
+def write_best_config(config, best: pd.Series, path: str | Path) -> Path:
+    """
+    A rangsor legjobb sorának visszaírása a configba, YAML-ként mentve.
+
+    Args:
+        config: a kiinduló Config (nem módosul)
+        best: a rangsor egy sora (q, sigma2_1m, P0_scale, h_mode, r_mode)
+        path: kimeneti YAML útvonal
+    """
+    kalman = config.kalman.model_copy(update={
+        "q": float(best["q"]),
+        "sigma2_1m": float(best["sigma2_1m"]),
+        "P0_scale": float(best["P0_scale"]),
+        "h_mode": best["h_mode"],
+        "r_mode": best["r_mode"],
+    })
+    tuned = config.model_copy(update={"kalman": kalman})
+
+    path = Path(path)
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(tuned.model_dump(), f, sort_keys=False, allow_unicode=True)
+    logger.info(f"Legjobb config mentve: {path}")
+    return path
@@ -0,0 +1,291 @@
+"""
+Szakaszonkénti profilozás — fali idő, CPU idő, memória csúcs és sorszám.
+
+A pipeline moduljai (data/, kalman/, signals.py, visualizations/) `span()`
+blokkokkal vagy `@profiled` dekorátorral jelölik a szakaszaikat; kikapcsolt
+állapotban (alapértelmezés) ezek egyetlen flag-ellenőrzésbe kerülnek.
+`enable()` után minden lezárt span rögzíti:
+
+    - fali idő (perf_counter) és a processz CPU ideje (process_time)
+    - a processz RSS csúcsa (ru_maxrss) a span végén, ahol elérhető
+    - `enable(trace_memory=True)` esetén a tracemalloc csúcs a span alatt,
+      a belépéskori foglaláshoz képest (a beágyazott spanek csúcsát is
+      beleértve) — a sok kis Python allokációt végző kódot (plotly, batch
+      ciklus) többszörösére lassítja, így az idők ekkor csak tájékoztatók
+    - a feldolgozott sorok száma (a hívó adja meg, vagy a dekorátor az
+      első tömbszerű argumentumból)
+
+`dump(path)` Chrome trace formátumú JSON-t ír (chrome://tracing, Perfetto),
+`summary()` szakasz szerinti összesítő táblát ad. A tracemalloc csúcs a
+processzre globális: párhuzamos szálak spanjei egymás foglalásait is látják.
+
+Használat:
+    profiling.enable()
+    with profiling.span("filter", rows=len(Z)) as sp:
+        ...
+        sp.args["n_gaps"] = 3
+    profiling.dump("output/profile.json")
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import pandas as pd
+
+try:
+    import resource
+    HAVE_RESOURCE = True
+except ImportError:          # Windows
+    HAVE_RESOURCE = False
+
+logger = logging.getLogger(__name__)
+
+# ru_maxrss: Linuxon KiB, macOS-en bájt
+_RSS_TO_MB = 1.0 / 2**20 if sys.platform == "darwin" else 1.0 / 2**10
+
+_ENABLED = False
+_TRACE_MEMORY = False
+_T0 = 0.0
+_SPANS: list[Span] = []
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+
+def _stack() -> list[Span]:
+    stack = getattr(_LOCAL, "stack", None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    return stack
+
+
+def _rss_mb() -> float:
+    if not HAVE_RESOURCE:
+        return float("nan")
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_TO_MB
+
+
+@dataclass
+class Span:
+    """Egy mért szakasz; `with` blokként használva méri magát (ha a profilozás be van kapcsolva)."""
+
+    name: str
+    args: dict[str, Any] = field(default_factory=dict)
+    start: float = 0.0                 # perf_counter, mp
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_mb: float = float("nan")      # tracemalloc csúcs a belépéshez képest
+    rss_mb: float = float("nan")       # processz RSS csúcs a span végén
+    depth: int = 0
+    tid: int = 0
+    _cpu0: float = field(default=0.0, repr=False)
+    _mem0: int = field(default=0, repr=False)
+    _mem_peak: int = field(default=0, repr=False)
+    _active: bool = field(default=False, repr=False)
+
+    def __enter__(self) -> Span:
+        if not _ENABLED:
+            return self
+        stack = _stack()
+        if _TRACE_MEMORY and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # A szülő eddigi csúcsa megmarad, a számláló a gyereknek indul újra
+            if stack:
+                stack[-1]._mem_peak = max(stack[-1]._mem_peak, peak)
+            tracemalloc.reset_peak()
+            self._mem0 = self._mem_peak = current
+        self.depth = len(stack)
+        self.tid = threading.get_ident()
+        stack.append(self)
+        self._active = True
+        self._cpu0 = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        if not self._active:
+            return False
+        self.wall_s = time.perf_counter() - self.start
+        self.cpu_s = time.process_time() - self._cpu0
+        self._active = False
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if _TRACE_MEMORY and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            self._mem_peak = max(self._mem_peak, peak)
+            self.peak_mb = (self._mem_peak - self._mem0) / 2**20
+            if stack:
+                stack[-1]._mem_peak = max(stack[-1]._mem_peak, self._mem_peak)
+            tracemalloc.reset_peak()
+        self.rss_mb = _rss_mb()
+        with _LOCK:
+            _SPANS.append(self)
+        return False
+
+
+def span(name: str, **args: Any) -> Span:
+    """`with span("név", rows=N) as sp:` — egy szakasz mérése; `sp.args` bővíthető."""
+    return Span(name, args)
+
+
+def annotate(**args: Any) -> None:
+    """A szál legbelső nyitott spanjének argumentumai bővítése (kikapcsolva no-op)."""
+    if _ENABLED:
+        stack = _stack()
+        if stack:
+            stack[-1].args.update(args)
+
+
+def _rows_of(args: tuple) -> Optional[int]:
+    """Sorok száma az első tömbszerű argumentumból (ndarray / DataFrame / hozam dict / history)."""
+    for a in args:
+        shape = getattr(a, "shape", None)
+        if shape:
+            return int(shape[1] if len(shape) > 2 else shape[0])   # [M x N x k] → N
+        if isinstance(a, dict) and a:
+            first = next(iter(a.values()))
+            if hasattr(first, "shape"):
+                return len(first)
+        if hasattr(getattr(a, "step_idx", None), "shape"):
+            return len(a.step_idx)
+    return None
+
+
+def profiled(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Dekorátor: a függvény minden hívása egy span (alapnév: modul.függvény)."""
+
+    def decorator(fn: Callable) -> Callable:
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _ENABLED:
+                return fn(*args, **kwargs)
+            rows = _rows_of(args)
+            with Span(label, {} if rows is None else {"rows": rows}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ── Be- / kikapcsolás, kimenet ───────────────────────────────────────────────
+
+
+def enable(trace_memory: bool = False) -> None:
+    """Profilozás bekapcsolása (a korábbi rekordok törlődnek)."""
+    global _ENABLED, _TRACE_MEMORY, _T0
+    reset()
+    _TRACE_MEMORY = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _T0 = time.perf_counter()
+    _ENABLED = True
+
+
+def disable() -> None:
+    """Profilozás kikapcsolása (a rekordok megmaradnak a dump()-hoz)."""
+    global _ENABLED
+    _ENABLED = False
+    if _TRACE_MEMORY and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+
+def reset() -> None:
+    with _LOCK:
+        _SPANS.clear()
+
+
+def records() -> list[Span]:
+    """A lezárt spanek kezdési sorrendben."""
+    with _LOCK:
+        return sorted(_SPANS, key=lambda s: s.start)
+
+
+def _finite(value: float) -> Optional[float]:
+    return None if value != value else round(value, 3)
+
+
+def chrome_trace() -> dict[str, Any]:
+    """A rekordok Chrome trace ("X" complete event) formában."""
+    pid = os.getpid()
+    events = []
+    for s in records():
+        args = dict(s.args)
+        args.update(
+            cpu_ms=round(s.cpu_s * 1e3, 3),
+            peak_mb=_finite(s.peak_mb),
+            rss_mb=_finite(s.rss_mb),
+        )
+        events.append({
+            "name": s.name,
+            "cat": s.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": round((s.start - _T0) * 1e6, 1),
+            "dur": round(s.wall_s * 1e6, 1),
+            "pid": pid,
+            "tid": s.tid,
+            "args": args,
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def dump(path: str | Path) -> Path:
+    """Chrome trace JSON írása (chrome://tracing / ui.perfetto.dev)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(), f, ensure_ascii=False, default=str)
+    logger.info(f"Profil mentve: {path} ({len(_SPANS)} span)")
+    return path
+
+
+def summary() -> pd.DataFrame:
+    """
+    Szakaszonkénti összesítés: hívások, össz fali / CPU idő, max memória csúcs,
+    max RSS és az összes sor — a fali idő szerint csökkenő sorrendben.
+    """
+    rows = [
+        {
+            "name": s.name,
+            "depth": s.depth,
+            "wall_s": s.wall_s,
+            "cpu_s": s.cpu_s,
+            "peak_mb": s.peak_mb,
+            "rss_mb": s.rss_mb,
+            "rows": s.args.get("rows"),
+        }
+        for s in records()
+    ]
+    columns = ["calls", "depth", "wall_s", "cpu_s", "peak_mb", "rss_mb", "rows"]
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    df = pd.DataFrame(rows)
+    df["rows"] = pd.to_numeric(df["rows"], errors="coerce")
+    table = df.groupby("name", sort=False).agg(
+        calls=("wall_s", "size"),
+        depth=("depth", "min"),
+        wall_s=("wall_s", "sum"),
+        cpu_s=("cpu_s", "sum"),
+        peak_mb=("peak_mb", "max"),
+        rss_mb=("rss_mb", "max"),
+        rows=("rows", lambda r: r.sum(min_count=1)),
+    )
+    table["rows"] = table["rows"].astype("Int64")
+    return table.sort_values("wall_s", ascending=False)[columns]
@@ -9,6 +9,9 @@ Használat:
     python run_research.py --config my.yaml    # egyedi config
     python run_research.py --days 3            # override days_back
     python run_research.py --q 1e-7            # override q paraméter
+    python run_research.py --checkpoint        # checkpoint + tárolt állapotok írása
+    python run_research.py --incremental       # checkpointból: csak az új percek szűrése
+    python run_research.py --profile           # szakaszidők + memória → output/profile.json
 """
 
 from __future__ import annotations
@@ -17,6 +20,7 @@ import argparse
 import logging
 import sys
 import time
+from dataclasses import dataclass
 from pathlib import Path
 
 import numpy as np
@@ -27,10 +31,15 @@ PROJECT_ROOT = Path(__file__).resolve().parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+import profiling
 from config import Config
 from data.fetcher import compute_log_returns, estimate_sigma2_1m, fetch_or_load
-from kalman.filter import MultiTFKalmanFilter
+from data.returns import SparseReturns
+from kalman.batched import BatchedMultiTFKalmanFilter, FilterParams
+from kalman.checkpoint import StateStore, resume
+from kalman.filter import KalmanArrays, MultiTFKalmanFilter
 from kalman.smoother import rts_smooth, smoothed_to_df
+from profiling import span
 from signals import compute_anomaly_flags, compute_predictions, compute_trend_score
 
 from visualizations.viz_states import StatesPlot
@@ -62,175 +71,279 @@ def build_filter(config: Config, sigma2_1m: float) -> MultiTFKalmanFilter:
         r_mode=config.kalman.r_mode,
         P0_scale=config.kalman.P0_scale,
         dt=1.0,
+        steady_state=config.kalman.steady_state,
+        steady_tol=config.kalman.steady_state_tol,
+        backend=config.kalman.backend,
+        update_mode=config.kalman.update_mode,
+        covariance_form=config.kalman.covariance_form,
+        init=config.kalman.init,
     )
 
 
-def run_filter_with_mode(
-    config: Config,
-    returns: dict[str, pd.Series],
-    sigma2_1m: float,
-    h_mode: str,
-) -> tuple[MultiTFKalmanFilter, pd.DataFrame]:
-    """Szűrő futtatás adott H móddal."""
-    kf = MultiTFKalmanFilter(
-        tf_minutes=config.tf_minutes,
-        q=config.kalman.q,
-        sigma2_1m=sigma2_1m,
-        h_mode=h_mode,
-        r_mode=config.kalman.r_mode,
-        P0_scale=config.kalman.P0_scale,
-    )
-    kf.run(returns)
-    base_tf = min(config.tf_minutes, key=lambda k: config.tf_minutes[k])
-    idx = returns[base_tf].index
-    states_df = kf.get_states_df(idx)
-    return kf, states_df
-
-
-def main():
-    parser = argparse.ArgumentParser(description="Multi-TF Kalman Filter kutatás")
-    parser.add_argument("--config", default="config.yaml", help="Config YAML fájl")
-    parser.add_argument("--days", type=int, default=None, help="Override days_back")
-    parser.add_argument("--q", type=float, default=None, help="Override q paraméter")
-    args = parser.parse_args()
-
-    # ── 1. Config betöltés ──────────────────────────────────
-    config_path = PROJECT_ROOT / args.config
-    config = Config.from_yaml(config_path)
-    if args.days:
-        config.data.days_back = args.days
-    if args.q:
-        config.kalman.q = args.q
+@dataclass
+class ResearchResult:
+    """Egy szimbólum elemzésének eredménye (burn-in után), a vizualizációk bemenete."""
 
-    logger.info(f"Config: {config.symbol}, TF-ek: {config.timeframes}, "
-                f"q={config.kalman.q:.2e}, {config.data.days_back} nap")
+    sigma2_1m: float
+    kf: MultiTFKalmanFilter
+    price: pd.Series
+    returns: SparseReturns
+    states_df: pd.DataFrame
+    smooth_df: pd.DataFrame
+    history: KalmanArrays               # a gain vizualizációhoz (burn-in után)
+    trend_df: pd.DataFrame
+    anomaly_flags: pd.Series
+    predictions: dict[int, pd.DataFrame]
+    burn_in: int
 
-    # ── 2. Adat letöltés / cache ────────────────────────────
-    t0 = time.time()
-    df_1m = fetch_or_load(config)
-    logger.info(f"Adat kész: {len(df_1m)} sor ({time.time() - t0:.1f}s)")
 
+def analyze(
+    config: Config,
+    df_1m: pd.DataFrame,
+    incremental: bool = False,
+    save_checkpoint: bool = False,
+) -> ResearchResult:
+    """
+    A CPU-igényes pipeline: log hozamok → σ²_1m → szűrő → RTS simítás → jelzések.
+
+    `incremental` esetén a szűrő a checkpointból folytat, és csak az új
+    perceket szűri. A szűrő állapota csak `incremental` vagy
+    `save_checkpoint` esetén kerül a futás végén checkpointba, az
+    állapotok a tárolóba.
+    """
     # ── 3. Log hozamok ──────────────────────────────────────
-    returns = compute_log_returns(df_1m, config)
-    for tf, ret in returns.items():
-        valid = ret.dropna()
-        logger.info(f"  {tf}: {len(valid)} valid mérés")
-
-    # ── 4. σ²_1m becslés ────────────────────────────────────
+    with span("stage.returns", rows=len(df_1m)):
+        returns = compute_log_returns(df_1m, config)
+    for tf in returns:
+        logger.info(f"  {tf}: {returns.count(tf)} valid mérés")
+
+    # ── 4. σ²_1m becslés (folytatásnál a checkpointé) ───────
+    store = None
+    if incremental or save_checkpoint:
+        store = StateStore(config.data.cache_dir, config.symbol)
+    checkpoint = store.load_checkpoint() if incremental else None
     sigma2_1m = config.kalman.sigma2_1m
-    if sigma2_1m is None:
+    if sigma2_1m is not None:
+        logger.info(f"σ²_1m config-ból: {sigma2_1m:.2e}")
+    elif checkpoint is not None:
+        sigma2_1m = checkpoint.sigma2_1m
+        logger.info(f"σ²_1m checkpointból: {sigma2_1m:.2e}")
+    else:
         sigma2_1m = estimate_sigma2_1m(returns["1m"])
         logger.info(f"σ²_1m automatikus becslés: {sigma2_1m:.2e}")
-    else:
-        logger.info(f"σ²_1m config-ból: {sigma2_1m:.2e}")
 
-    # ── 5. Fő Kalman szűrő futtatás ────────────────────────
+    # ── 5. Fő Kalman szűrő futtatás (+ checkpoint) ──────────
     t0 = time.time()
-    kf = build_filter(config, sigma2_1m)
-    kf.run(returns)
+    with span("stage.filter", rows=len(df_1m)) as sp:
+        kf = build_filter(config, sigma2_1m)
+        start = resume(kf, returns, store, checkpoint) if incremental else None
+        if start is None:
+            kf.run(returns)
+            start = 0
+        sp.args["new_rows"] = len(returns.index) - start
+        if store is not None:
+            store.save_run(kf, returns.index, start)
     logger.info(f"Szűrő kész ({time.time() - t0:.1f}s)")
 
-    base_tf = config.base_tf
-    idx = returns[base_tf].index
+    idx = returns.index
     states_df = kf.get_states_df(idx)
     price = df_1m["close"]
 
     # ── 6. RTS simítás ──────────────────────────────────────
     t0 = time.time()
-    smoothed = rts_smooth(kf.history, kf.F)
-    smooth_df = smoothed_to_df(smoothed, idx)
+    with span("stage.smoother", rows=len(idx)):
+        smoothed = rts_smooth(kf.arrays, kf.F)
+        smooth_df = smoothed_to_df(smoothed, idx)
     logger.info(f"RTS simítás kész ({time.time() - t0:.1f}s)")
 
     # ── 6b. Burn-in levágás (a P konvergenciáig torzított az output) ──
-    burn_in = min(50, len(states_df) // 10)
+    # Riccati init mellett P már az első lépéstől a steady-state értéken van
+    burn_in = 0 if config.kalman.init == "riccati" else min(50, len(states_df) // 10)
     states_df = states_df.iloc[burn_in:]
     smooth_df = smooth_df.iloc[burn_in:]
-    price = price.loc[price.index.isin(states_df.index)]
-    returns = {tf: ret.loc[ret.index.isin(states_df.index)] for tf, ret in returns.items()}
+    price = price.iloc[burn_in:]
+    returns = returns[burn_in:]
     # A history-t is szűkítjük a gain vizualizációhoz
-    kf_history_plot = kf.history[burn_in:]
-    idx = states_df.index
+    history = kf.arrays[burn_in:]
     logger.info(f"Burn-in levágva: első {burn_in} lépés kihagyva")
 
     # ── 7. Jelzések ─────────────────────────────────────────
-    trend_df = compute_trend_score(
-        states_df,
-        w_mu=config.trend.w_mu,
-        w_mu_dot=config.trend.w_mu_dot,
-        w_mu_ddot=config.trend.w_mu_ddot,
-        rolling_window=config.trend.rolling_window,
-    )
-    anomaly_flags = compute_anomaly_flags(states_df)
-    predictions = compute_predictions(
-        states_df,
-        horizons_minutes=[5, 15, 60],
-        h_mode=config.kalman.h_mode,
-    )
+    with span("stage.signals", rows=len(states_df)):
+        trend_df = compute_trend_score(
+            states_df,
+            w_mu=config.trend.w_mu,
+            w_mu_dot=config.trend.w_mu_dot,
+            w_mu_ddot=config.trend.w_mu_ddot,
+            rolling_window=config.trend.rolling_window,
+        )
+        anomaly_flags = compute_anomaly_flags(states_df)
+        predictions = compute_predictions(
+            states_df,
+            horizons_minutes=[5, 15, 60],
+            h_mode=config.kalman.h_mode,
+        )
     logger.info(f"Jelzések kész. Anomáliák: {anomaly_flags.sum()}")
 
-    # ── 8. Vizualizációk generálása ─────────────────────────
+    return ResearchResult(
+        sigma2_1m=sigma2_1m,
+        kf=kf,
+        price=price,
+        returns=returns,
+        states_df=states_df,
+        smooth_df=smooth_df,
+        history=history,
+        trend_df=trend_df,
+        anomaly_flags=anomaly_flags,
+        predictions=predictions,
+        burn_in=burn_in,
+    )
+
+
+def generate_plots(config: Config, res: ResearchResult) -> None:
+    """A 10 vizualizáció generálása (HTML / PNG írás a config output_dir-jébe)."""
     logger.info("=" * 60)
     logger.info("VIZUALIZÁCIÓK GENERÁLÁSA")
     logger.info("=" * 60)
 
+    price, returns, states_df = res.price, res.returns, res.states_df
+    idx = states_df.index
+    sigma2_1m = res.sigma2_1m
+
     # VIZ-1: Szűrt állapotok
     logger.info("[1/10] Szűrt állapotok + ár...")
-    StatesPlot(config, price).generate(states_df)
+    with span("viz.1.states", rows=len(idx)):
+        StatesPlot(config, price).generate(states_df)
 
     # VIZ-2: Nyers vs szűrt hozamok
     logger.info("[2/10] Nyers vs szűrt hozamok...")
-    ReturnsPlot(config, price).generate(
-        states_df, returns, config.tf_minutes, config.kalman.h_mode,
-    )
+    with span("viz.2.returns", rows=len(idx)):
+        ReturnsPlot(config, price).generate(
+            states_df, returns, config.tf_minutes, config.kalman.h_mode,
+        )
 
     # VIZ-3: Kalman gain dinamika
     logger.info("[3/10] Kalman gain dinamika...")
-    GainPlot(config, price).generate(kf_history_plot)
+    with span("viz.3.gain", rows=len(idx)):
+        GainPlot(config, price).generate(res.history)
 
     # VIZ-4: Innováció + anomália
     logger.info("[4/10] Innováció + anomália...")
-    InnovationPlot(config, price).generate(states_df, anomaly_flags)
+    with span("viz.4.innovation", rows=len(idx)):
+        InnovationPlot(config, price).generate(states_df, res.anomaly_flags)
 
     # VIZ-5: P kovariancia evolúció
     logger.info("[5/10] P kovariancia evolúció...")
-    CovariancePlot(config, price).generate(states_df)
+    with span("viz.5.covariance", rows=len(idx)):
+        CovariancePlot(config, price).generate(states_df)
 
     # VIZ-6: Predikció pontosság
     logger.info("[6/10] Predikció pontosság...")
-    PredictionPlot(config, price).generate(
-        states_df, returns, predictions, config.tf_minutes,
-    )
+    with span("viz.6.prediction", rows=len(idx)):
+        PredictionPlot(config, price).generate(
+            states_df, returns, res.predictions, config.tf_minutes,
+        )
 
     # VIZ-7: Trend score dashboard
     logger.info("[7/10] Trend score dashboard...")
-    TrendDashboardPlot(config, price).generate(trend_df)
+    with span("viz.7.trend", rows=len(idx)):
+        TrendDashboardPlot(config, price).generate(res.trend_df)
 
-    # VIZ-8: q paraméter érzékenység
-    logger.info("[8/10] q paraméter érzékenység...")
+    # VIZ-8 + VIZ-9: q-sweep és H-mód összehasonlítás egyetlen batch menetben
     q_values = [1e-10, 1e-9, 1e-8, 1e-7, 1e-6]
-    q_results: dict[float, pd.DataFrame] = {}
-    for q_val in q_values:
-        kf_q = MultiTFKalmanFilter(
-            tf_minutes=config.tf_minutes,
+    h_modes = ["continuous", "discrete"]
+    t0 = time.time()
+    batch_params = [
+        FilterParams(
             q=q_val,
             sigma2_1m=sigma2_1m,
             h_mode=config.kalman.h_mode,
             r_mode=config.kalman.r_mode,
             P0_scale=config.kalman.P0_scale,
+            init=config.kalman.init,
         )
-        kf_q.run(returns, progress_interval=0)
-        q_results[q_val] = kf_q.get_states_df(idx)
-    SensitivityPlot(config, price).generate(q_results)
+        for q_val in q_values
+    ] + [
+        FilterParams(
+            q=config.kalman.q,
+            sigma2_1m=sigma2_1m,
+            h_mode=h_mode,
+            r_mode=config.kalman.r_mode,
+            P0_scale=config.kalman.P0_scale,
+            init=config.kalman.init,
+        )
+        for h_mode in h_modes
+    ]
+    with span("viz.batch_sweep", rows=len(idx), members=len(batch_params)):
+        batch_arrays = BatchedMultiTFKalmanFilter(config.tf_minutes, batch_params).run(
+            returns, progress_interval=0,
+        )
+        batch_dfs = [arrays.to_states_df(idx) for arrays in batch_arrays]
+    logger.info(f"Batch szűrő ({len(batch_params)} konfiguráció) kész ({time.time() - t0:.1f}s)")
+
+    # VIZ-8: q paraméter érzékenység
+    logger.info("[8/10] q paraméter érzékenység...")
+    with span("viz.8.sensitivity", rows=len(idx)):
+        q_results: dict[float, pd.DataFrame] = dict(zip(q_values, batch_dfs[:len(q_values)]))
+        SensitivityPlot(config, price).generate(q_results)
 
     # VIZ-9: H mátrix összehasonlítás
     logger.info("[9/10] H mátrix összehasonlítás...")
-    _, cont_df = run_filter_with_mode(config, returns, sigma2_1m, "continuous")
-    _, disc_df = run_filter_with_mode(config, returns, sigma2_1m, "discrete")
-    HComparePlot(config, price).generate(cont_df, disc_df)
+    with span("viz.9.h_compare", rows=len(idx)):
+        cont_df, disc_df = batch_dfs[len(q_values):]
+        HComparePlot(config, price).generate(cont_df, disc_df)
 
     # VIZ-10: RTS simító vs online
     logger.info("[10/10] RTS simító vs online...")
-    SmootherPlot(config, price).generate(states_df, smooth_df)
+    with span("viz.10.smoother", rows=len(idx)):
+        SmootherPlot(config, price).generate(states_df, res.smooth_df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-TF Kalman Filter kutatás")
+    parser.add_argument("--config", default="config.yaml", help="Config YAML fájl")
+    parser.add_argument("--days", type=int, default=None, help="Override days_back")
+    parser.add_argument("--q", type=float, default=None, help="Override q paraméter")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Folytatás a tárolt checkpointból: csak az új percek szűrése, "
+                             "a tárolt állapotokhoz fűzve")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="Checkpoint + tárolt állapotok írása folytatás nélkül "
+                             "(egy későbbi --incremental futáshoz); --incremental ezt magában foglalja")
+    parser.add_argument("--profile", nargs="?", const="profile.json", default=None, metavar="PATH",
+                        help="Szakaszonkénti idő / CPU / memória profil Chrome trace JSON-ba "
+                             "(alap: <output_dir>/profile.json)")
+    parser.add_argument("--profile-tracemalloc", action="store_true",
+                        help="A profilba tracemalloc memória csúcs is (lassítja a futást)")
+    args = parser.parse_args()
+
+    # ── 1. Config betöltés ──────────────────────────────────
+    config_path = PROJECT_ROOT / args.config
+    config = Config.from_yaml(config_path)
+    if args.days:
+        config.data.days_back = args.days
+    if args.q:
+        config.kalman.q = args.q
+
+    logger.info(f"Config: {config.symbol}, TF-ek: {config.timeframes}, "
+                f"q={config.kalman.q:.2e}, {config.data.days_back} nap")
+    if args.profile:
+        profiling.enable(trace_memory=args.profile_tracemalloc)
+
+    # ── 2. Adat letöltés / cache ────────────────────────────
+    t0 = time.time()
+    with span("stage.fetch") as sp:
+        df_1m = fetch_or_load(config)
+        sp.args["rows"] = len(df_1m)
+    logger.info(f"Adat kész: {len(df_1m)} sor ({time.time() - t0:.1f}s)")
+
+    # ── 3–7. Hozamok, szűrő, simítás, jelzések ──────────────
+    with span("stage.analyze", rows=len(df_1m)):
+        res = analyze(config, df_1m, incremental=args.incremental,
+                      save_checkpoint=args.checkpoint)
+
+    # ── 8. Vizualizációk generálása ─────────────────────────
+    with span("stage.plots", rows=len(res.states_df)):
+        generate_plots(config, res)
 
     # ── Összefoglalás ───────────────────────────────────────
     output_dir = Path(config.visualization.output_dir)
@@ -241,6 +354,14 @@ def main():
         logger.info(f"  {f.name}")
     logger.info(f"Mappa: {output_dir.resolve()}")
 
+    if args.profile:
+        profiling.disable()
+        profile_path = Path(args.profile)
+        if not profile_path.is_absolute():
+            profile_path = output_dir / profile_path
+        profiling.dump(profile_path)
+        logger.info("Profil (szakaszonként):\n" + profiling.summary().to_string(float_format="%.3f"))
+
 
 if __name__ == "__main__":
     main()
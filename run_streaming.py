@@ -0,0 +1,95 @@
+"""
+Multi-TF Kalman Filter — streaming (online) futtató.
+
+A tárolt történeti adaton bemelegít (days_back), majd az élő lezárt 1m
+gyertyákat percenként szűri, és logolja az állapotot, a trend score-t,
+a predikciókat és az anomália jelzést.
+
+Használat:
+    python run_streaming.py                       # élő ccxt polling
+    python run_streaming.py --replay              # tárolt adat visszajátszása
+    python run_streaming.py --replay --delay 0.01 # lassított visszajátszás
+    python run_streaming.py --smooth-lag 30       # + 30 perces fixed-lag simítás
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# ── Projekt root a path-ra ───────────────────────────────────────────────────
+PROJECT_ROOT = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import Config
+from data.fetcher import compute_log_returns, estimate_sigma2_1m, fetch_or_load
+from streaming import ExchangeSource, ReplaySource, StreamingRunner
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    datefmt="%H:%M:%S",
+)
+logger = logging.getLogger("run_streaming")
+
+
+async def stream(runner: StreamingRunner, source) -> None:
+    async for u in runner.run(source):
+        preds = "  ".join(f"{tau}m={p[0]:+.2e}" for tau, p in u.predictions.items())
+        logger.info(
+            f"{u.timestamp:%Y-%m-%d %H:%M}  close={u.close:.2f}  μ̂={u.mu_hat:+.2e}  "
+            f"μ̂̇={u.mu_dot_hat:+.2e}  trend={u.trend_score:+.2f}  {preds}"
+            + (f"  μ̃[-{runner.smoother.lag}m]={u.mu_smooth:+.2e}"
+               if u.smoothed_timestamp is not None else "")
+            + ("  ANOMÁLIA" if u.anomaly else "")
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-TF Kalman Filter streaming")
+    parser.add_argument("--config", default="config.yaml", help="Config YAML fájl")
+    parser.add_argument("--days", type=int, default=None, help="Override days_back (bemelegítés)")
+    parser.add_argument("--replay", action="store_true",
+                        help="Tárolt adat visszajátszása élő feed helyett")
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="Visszajátszási késleltetés gyertyánként (mp)")
+    parser.add_argument("--poll", type=float, default=5.0, help="Polling periódus (mp)")
+    parser.add_argument("--buffer", type=int, default=1440, help="Megtartott kimenetek száma")
+    parser.add_argument("--smooth-lag", type=int, default=None,
+                        help="Fixed-lag RTS simítás késleltetése percben")
+    args = parser.parse_args()
+
+    config = Config.from_yaml(PROJECT_ROOT / args.config)
+    if args.days:
+        config.data.days_back = args.days
+
+    df_1m = fetch_or_load(config)
+    sigma2_1m = config.kalman.sigma2_1m
+    if sigma2_1m is None:
+        sigma2_1m = estimate_sigma2_1m(compute_log_returns(df_1m, config)["1m"])
+    logger.info(f"σ²_1m: {sigma2_1m:.2e}")
+
+    runner = StreamingRunner.from_config(
+        config, sigma2_1m, buffer_size=args.buffer, smooth_lag=args.smooth_lag,
+    )
+    if args.replay:
+        source = ReplaySource(df_1m, delay=args.delay)
+    else:
+        n = runner.warmup(df_1m)
+        logger.info(f"Bemelegítés: {n} gyertya")
+        since_ms = runner.last_ts + 60_000 if runner.last_ts is not None else None
+        source = ExchangeSource(config.exchange, config.symbol,
+                                since_ms=since_ms, poll_interval=args.poll)
+
+    try:
+        asyncio.run(stream(runner, source))
+    except KeyboardInterrupt:
+        logger.info("Leállítva.")
+
+
+if __name__ == "__main__":
+    main()
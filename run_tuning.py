@@ -0,0 +1,116 @@
+"""
+Multi-TF Kalman Filter — paraméter hangolás log-likelihood alapján.
+
+Rács vagy koordinátánkénti keresés (q, σ²_1m, P0_scale) felett, a
+konfigurációk egy process pool-on értékelődnek ki. Kimenet: rangsor
+tábla (CSV) és a legjobb config YAML-ként.
+
+Használat:
+    python run_tuning.py                          # rács keresés, config.yaml
+    python run_tuning.py --method coord           # koordinátánkénti keresés
+    python run_tuning.py --workers 32 --days 30
+    python run_tuning.py --out config.tuned.yaml
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# ── Projekt root a path-ra ───────────────────────────────────────────────────
+PROJECT_ROOT = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import Config, epoch_minutes
+from data.fetcher import compute_log_returns, estimate_sigma2_1m, fetch_or_load
+from kalman.batched import FilterParams
+from kalman.filter import returns_to_matrix
+from kalman.tuning import coordinate_search, grid_search, write_best_config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    datefmt="%H:%M:%S",
+)
+logger = logging.getLogger("run_tuning")
+
+# Alapértelmezett rács: q log-skálán, σ²_1m a becslés körül, P0_scale néhány nagyságrend
+Q_GRID = [float(q) for q in np.logspace(-11, -6, 11)]
+SIGMA2_FACTORS = [0.5, 0.75, 1.0, 1.5, 2.0]
+P0_GRID = [1.0, 10.0, 100.0, 1000.0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-TF Kalman Filter hangolás")
+    parser.add_argument("--config", default="config.yaml", help="Config YAML fájl")
+    parser.add_argument("--days", type=int, default=None, help="Override days_back")
+    parser.add_argument("--method", choices=["grid", "coord"], default="grid",
+                        help="Keresési módszer")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processzek száma")
+    parser.add_argument("--out", default="config.tuned.yaml", help="Legjobb config YAML")
+    args = parser.parse_args()
+
+    config = Config.from_yaml(PROJECT_ROOT / args.config)
+    if args.days:
+        config.data.days_back = args.days
+
+    df_1m = fetch_or_load(config)
+    returns = compute_log_returns(df_1m, config)
+    Z, _ = returns_to_matrix(returns, config.tf_minutes)
+    minutes = epoch_minutes(df_1m.index)
+
+    sigma2_1m = config.kalman.sigma2_1m
+    if sigma2_1m is None:
+        sigma2_1m = estimate_sigma2_1m(returns[config.base_tf])
+    burn_in = min(50, len(Z) // 10)
+
+    base = FilterParams(
+        q=config.kalman.q,
+        sigma2_1m=sigma2_1m,
+        h_mode=config.kalman.h_mode,
+        r_mode=config.kalman.r_mode,
+        P0_scale=config.kalman.P0_scale,
+    )
+    logger.info(f"Hangolás: {len(Z)} lépés, módszer={args.method}, "
+                f"σ²_1m kiindulás={sigma2_1m:.2e}")
+
+    t0 = time.time()
+    if args.method == "grid":
+        table = grid_search(
+            Z, config.tf_minutes, base,
+            grid={
+                "q": Q_GRID,
+                "sigma2_1m": [sigma2_1m * f for f in SIGMA2_FACTORS],
+                "P0_scale": P0_GRID,
+            },
+            burn_in=burn_in,
+            max_workers=args.workers,
+            minutes=minutes,
+        )
+    else:
+        table = coordinate_search(
+            Z, config.tf_minutes, base,
+            burn_in=burn_in,
+            max_workers=args.workers,
+            minutes=minutes,
+        )
+    logger.info(f"Keresés kész: {len(table)} konfiguráció ({time.time() - t0:.1f}s)")
+
+    output_dir = Path(config.visualization.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    table_path = output_dir / "tuning_results.csv"
+    table.to_csv(table_path, index=False)
+    logger.info(f"Rangsor mentve: {table_path}")
+    logger.info("Top 10:\n" + table.head(10).to_string(index=False))
+
+    write_best_config(config, table.iloc[0], PROJECT_ROOT / args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Multi-TF Kalman Filter — univerzum futtató (szimbólumonkénti pipeline párhuzamosan).
+
+A `run_research` pipeline-ját (letöltés → hozamok → σ² → szűrő → simítás →
+jelzések → vizualizációk) a config `symbols` univerzumának minden tagjára
+lefuttatja, erőforrás szerint külön korlátozott párhuzamossággal:
+
+    - letöltés (I/O):     thread pool, `--io-workers` szimbólum egyszerre,
+                          egy közös token-bucket rate limittel
+    - elemzés (CPU):      process pool, `--cpu-workers` worker; a szimbólum
+                          a letöltése végeztével azonnal sorra kerül
+    - HTML írás (I/O):    a workereken belül legfeljebb `--html-workers`
+                          szimbólum generál vizualizációt egyszerre
+
+Kimenet: `<output_dir>/universe_summary.parquet` — szimbólumonként az utolsó
+állapot, a legfrissebb trend score, az anomáliák száma és a szakaszidők;
+`--plots` esetén a vizualizációk szimbólumonként `<output_dir>/<SZIMBÓLUM>/`.
+
+Használat:
+    python run_universe.py                         # config.yaml `symbols` listája
+    python run_universe.py --days 3 --cpu-workers 8
+    python run_universe.py --plots --html-workers 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Optional
+
+import ccxt
+import pandas as pd
+
+# ── Projekt root a path-ra ───────────────────────────────────────────────────
+PROJECT_ROOT = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import Config
+from data.downloader import TokenBucket
+from data.fetcher import fetch_or_load
+from run_research import analyze, generate_plots
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    datefmt="%H:%M:%S",
+)
+logger = logging.getLogger("run_universe")
+
+SUMMARY_FILE = "universe_summary.parquet"
+SUMMARY_COLUMNS = [
+    "symbol", "timestamp", "close",
+    "mu_hat", "mu_dot_hat", "mu_ddot_hat", "P00",
+    "trend_score", "n_anomalies", "n_steps", "sigma2_1m",
+    "fetch_s", "analyze_s", "plots_s", "error",
+]
+
+# Worker processz állapot (a pool initializer tölti)
+_HTML_SLOTS: Optional[Any] = None
+
+
+def symbol_config(config: Config, symbol: str, output_dir: Optional[Path] = None) -> Config:
+    """A config másolata egyetlen szimbólumra (opcionálisan saját output mappával)."""
+    update: dict[str, Any] = {"symbol": symbol, "symbols": None}
+    if output_dir is not None:
+        update["visualization"] = config.visualization.model_copy(
+            update={"output_dir": str(output_dir)},
+        )
+    return config.model_copy(update=update)
+
+
+def safe_name(symbol: str) -> str:
+    """Fájlrendszer-barát szimbólum név: 'BTC/USDT' → 'BTC_USDT'."""
+    return symbol.replace("/", "_").replace(":", "_")
+
+
+def shared_bucket(config: Config) -> TokenBucket:
+    """Az összes szimbólum letöltése között megosztott rate limiter."""
+    exchange_class = getattr(ccxt, config.exchange, None)
+    if exchange_class is None:
+        raise ValueError(f"Ismeretlen exchange: {config.exchange}")
+    rate_per_sec = 1000.0 / max(exchange_class().rateLimit, 1)
+    return TokenBucket(rate_per_sec, capacity=config.data.download_workers)
+
+
+# ── Szakaszok ────────────────────────────────────────────────────────────────
+
+
+def fetch_symbol(config: Config, symbol: str, bucket: TokenBucket) -> tuple[pd.DataFrame, float]:
+    """I/O szakasz (szálon): 1m OHLCV a tárolóból / letöltéssel."""
+    t0 = time.perf_counter()
+    df_1m = fetch_or_load(symbol_config(config, symbol), bucket=bucket)
+    return df_1m, time.perf_counter() - t0
+
+
+def _init_worker(html_slots: Any, log_level: int) -> None:
+    global _HTML_SLOTS
+    _HTML_SLOTS = html_slots
+    # A szimbólumonkénti lépés-logok ne keveredjenek össze a fő processz logjával
+    logging.getLogger().setLevel(log_level)
+
+
+def process_symbol(
+    config: Config,
+    symbol: str,
+    df_1m: pd.DataFrame,
+    make_plots: bool,
+) -> dict[str, Any]:
+    """
+    CPU szakasz (worker processzben): elemzés + opcionális vizualizációk.
+
+    Returns:
+        a szimbólum összefoglaló sora (hiba esetén `error` kitöltve)
+    """
+    row: dict[str, Any] = {"symbol": symbol}
+    try:
+        t0 = time.perf_counter()
+        res = analyze(symbol_config(config, symbol), df_1m)
+        row["analyze_s"] = time.perf_counter() - t0
+
+        last = res.states_df.iloc[-1]
+        trend = res.trend_df["trend_score"].dropna()
+        row.update(
+            timestamp=res.states_df.index[-1],
+            close=float(res.price.iloc[-1]),
+            mu_hat=float(last["mu_hat"]),
+            mu_dot_hat=float(last["mu_dot_hat"]),
+            mu_ddot_hat=float(last["mu_ddot_hat"]),
+            P00=float(last["P00"]),
+            trend_score=float(trend.iloc[-1]) if len(trend) else float("nan"),
+            n_anomalies=int(res.anomaly_flags.sum()),
+            n_steps=len(res.states_df),
+            sigma2_1m=float(res.sigma2_1m),
+        )
+
+        if make_plots:
+            out_dir = Path(config.visualization.output_dir) / safe_name(symbol)
+            t0 = time.perf_counter()
+            with _HTML_SLOTS:
+                generate_plots(symbol_config(config, symbol, out_dir), res)
+            row["plots_s"] = time.perf_counter() - t0
+    except Exception as e:
+        logger.exception(f"{symbol}: elemzés sikertelen")
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+# ── Ütemező ──────────────────────────────────────────────────────────────────
+
+
+def run_universe(
+    config: Config,
+    io_workers: int = 4,
+    cpu_workers: Optional[int] = None,
+    html_workers: int = 2,
+    make_plots: bool = False,
+    worker_log_level: int = logging.WARNING,
+) -> pd.DataFrame:
+    """
+    A szimbólumonkénti pipeline ütemezése a config univerzumán.
+
+    Egy szimbólum a letöltése végeztével azonnal a CPU poolba kerül, így a
+    letöltés és az elemzés átlapolódik; a hibás szimbólum nem állítja meg
+    a többit (a summary `error` oszlopában jelenik meg).
+
+    Returns:
+        summary DataFrame, szimbólumonként egy sor (univerzum sorrendben)
+    """
+    symbols = config.universe
+    cpu_workers = max(1, min(cpu_workers or os.cpu_count() or 1, len(symbols)))
+    bucket = shared_bucket(config)
+    html_slots = multiprocessing.get_context().BoundedSemaphore(max(html_workers, 1))
+    logger.info(
+        f"Univerzum: {len(symbols)} szimbólum — I/O: {io_workers} szál, "
+        f"CPU: {cpu_workers} processz, HTML: {html_workers} egyszerre"
+    )
+
+    rows: dict[str, dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=io_workers) as io_pool, ProcessPoolExecutor(
+        max_workers=cpu_workers,
+        initializer=_init_worker,
+        initargs=(html_slots, worker_log_level),
+    ) as cpu_pool:
+        fetches: dict[Future, str] = {
+            io_pool.submit(fetch_symbol, config, symbol, bucket): symbol for symbol in symbols
+        }
+        jobs: dict[Future, str] = {}
+        fetch_s: dict[str, float] = {}
+        for fut in as_completed(fetches):
+            symbol = fetches[fut]
+            try:
+                df_1m, fetch_s[symbol] = fut.result()
+            except Exception as e:
+                logger.error(f"{symbol}: letöltés sikertelen: {e}")
+                rows[symbol] = {"symbol": symbol, "error": f"{type(e).__name__}: {e}"}
+                continue
+            logger.info(f"{symbol}: {len(df_1m)} sor ({fetch_s[symbol]:.1f}s) → elemzés")
+            jobs[cpu_pool.submit(process_symbol, config, symbol, df_1m, make_plots)] = symbol
+
+        for fut in as_completed(jobs):
+            symbol = jobs[fut]
+            row = fut.result()
+            row["fetch_s"] = fetch_s[symbol]
+            rows[symbol] = row
+            if "error" in row:
+                logger.error(f"{symbol}: {row['error']}")
+            else:
+                logger.info(
+                    f"{symbol}: trend={row['trend_score']:+.2f}, "
+                    f"anomáliák={row['n_anomalies']} ({row['analyze_s']:.1f}s)"
+                )
+
+    summary = pd.DataFrame([rows[s] for s in symbols], columns=SUMMARY_COLUMNS)
+    # Hibás szimbólumnál hiányzó számlálók → nullable egész
+    return summary.astype({"n_anomalies": "Int64", "n_steps": "Int64", "error": "object"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-TF Kalman Filter — univerzum futtatás")
+    parser.add_argument("--config", default="config.yaml", help="Config YAML fájl")
+    parser.add_argument("--days", type=int, default=None, help="Override days_back")
+    parser.add_argument("--io-workers", type=int, default=4,
+                        help="Egyszerre letöltött szimbólumok száma")
+    parser.add_argument("--cpu-workers", type=int, default=None,
+                        help="Elemző worker processzek (None = CPU-k száma)")
+    parser.add_argument("--html-workers", type=int, default=2,
+                        help="Egyszerre vizualizációt író szimbólumok száma")
+    parser.add_argument("--plots", action="store_true",
+                        help="Vizualizációk szimbólumonként (<output_dir>/<SZIMBÓLUM>/)")
+    args = parser.parse_args()
+
+    config = Config.from_yaml(PROJECT_ROOT / args.config)
+    if args.days:
+        config.data.days_back = args.days
+
+    t0 = time.time()
+    summary = run_universe(
+        config,
+        io_workers=args.io_workers,
+        cpu_workers=args.cpu_workers,
+        html_workers=args.html_workers,
+        make_plots=args.plots,
+    )
+
+    output_dir = Path(config.visualization.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / SUMMARY_FILE
+    summary.to_parquet(path, index=False)
+
+    n_failed = int(summary["error"].notna().sum())
+    logger.info("=" * 60)
+    logger.info(f"KÉSZ! {len(summary) - n_failed}/{len(summary)} szimbólum "
+                f"({time.time() - t0:.1f}s)")
+    logger.info(f"Summary: {path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
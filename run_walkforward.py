@@ -0,0 +1,83 @@
+"""
+Multi-TF Kalman Filter — walk-forward predikció kiértékelés.
+
+Gördülő out-of-sample foldok foldonkénti σ²_1m (és opcionálisan q) refittel,
+melegindított szűrővel, process poolon párhuzamosan. Kimenet: foldonkénti
+és horizontonkénti metrika tábla (CSV) + horizontonkénti összesítés.
+
+Használat:
+    python run_walkforward.py                                # 14 nap tanuló, 7 nap teszt
+    python run_walkforward.py --days 365 --train-days 28 --test-days 7
+    python run_walkforward.py --horizons 1 5 15 60 240 --q-grid 1e-10 1e-9 1e-8
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+# ── Projekt root a path-ra ───────────────────────────────────────────────────
+PROJECT_ROOT = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import Config
+from data.fetcher import fetch_or_load
+from walkforward import make_folds, summarize, walk_forward
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    datefmt="%H:%M:%S",
+)
+logger = logging.getLogger("run_walkforward")
+
+_DAY = 1440
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-TF Kalman Filter walk-forward kiértékelés")
+    parser.add_argument("--config", default="config.yaml", help="Config YAML fájl")
+    parser.add_argument("--days", type=int, default=None, help="Override days_back")
+    parser.add_argument("--train-days", type=float, default=14, help="Tanuló ablak (nap)")
+    parser.add_argument("--test-days", type=float, default=7, help="Teszt ablak (nap)")
+    parser.add_argument("--horizons", type=int, nargs="+", default=[5, 15, 60],
+                        help="Előrejelzési horizontok (perc)")
+    parser.add_argument("--q-grid", type=float, nargs="*", default=None,
+                        help="Foldonkénti q refit rácsa (üres = config q)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processzek száma")
+    args = parser.parse_args()
+
+    config = Config.from_yaml(PROJECT_ROOT / args.config)
+    if args.days:
+        config.data.days_back = args.days
+
+    df_1m = fetch_or_load(config)
+    folds = make_folds(
+        len(df_1m),
+        train_steps=int(args.train_days * _DAY),
+        test_steps=int(args.test_days * _DAY),
+    )
+    logger.info(f"Walk-forward: {len(df_1m)} lépés, {len(folds)} fold, "
+                f"q rács={args.q_grid or 'nincs'}")
+
+    t0 = time.time()
+    metrics = walk_forward(
+        df_1m, config, args.horizons, folds,
+        q_grid=args.q_grid, max_workers=args.workers,
+    )
+    logger.info(f"Kiértékelés kész ({time.time() - t0:.1f}s)")
+
+    output_dir = Path(config.visualization.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / "walkforward_metrics.csv"
+    metrics.to_csv(path, index=False)
+    logger.info(f"Fold metrikák mentve: {path}")
+    logger.info("Horizontonként:\n" + summarize(metrics).to_string())
+
+
+if __name__ == "__main__":
+    main()
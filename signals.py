@@ -6,13 +6,17 @@ Ref: KALMAN_LOG_MULTI_TF.md 6. fejezet
 
 from __future__ import annotations
 
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
 from scipy import stats
 
 from kalman.matrices import build_H_matrix
+from profiling import profiled
 
 
+@profiled("signals.trend_score")
 def compute_trend_score(
     states_df: pd.DataFrame,
     w_mu: float = 0.50,
@@ -51,56 +55,117 @@ def compute_trend_score(
     }, index=states_df.index)
 
 
-def compute_predictions(
-    states_df: pd.DataFrame,
+_STATE_COLS = ["mu_hat", "mu_dot_hat", "mu_ddot_hat"]
+# P felső háromszöge: diagonális, majd a kereszt-kovarianciák
+_P_COLS = ["P00", "P11", "P22", "P01", "P02", "P12"]
+_P_PAIRS = [(0, 0), (1, 1), (2, 2), (0, 1), (0, 2), (1, 2)]
+
+
+def horizon_matrices(
     horizons_minutes: list[int],
     h_mode: str = "discrete",
-) -> dict[int, pd.DataFrame]:
+) -> tuple[np.ndarray, np.ndarray]:
     """
-    Prediktív hozambecslés tetszőleges horizontokra.
+    Horizont mátrixok: H [H x 3] a várható értékhez, W [H x 6] a varianciához.
 
-    r̂_{t→t+τ} = μ̂·τ + μ̂̇·½τ² + μ̂̈·⅙τ³
+    W sorai a P felső háromszögén (P00, P11, P22, P01, P02, P12) vett
+    kvadratikus forma súlyai: h_i h_j, a kereszttagoknál 2×.
+    """
+    H = build_H_matrix(list(horizons_minutes), h_mode)
+    W = np.stack([
+        H[:, i] * H[:, j] * (1.0 if i == j else 2.0) for i, j in _P_PAIRS
+    ], axis=1)
+    return H, W
 
-    Returns:
-        {horizon_minutes: DataFrame with 'predicted', 'ci_lower', 'ci_upper'}
+
+def predict_horizons(
+    x: np.ndarray,
+    P_upper: np.ndarray,
+    horizons_minutes: list[int],
+    h_mode: str = "discrete",
+    chunk_rows: int = 65_536,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
     """
-    results = {}
+    Előrejelzés + variancia az összes horizontra egyszerre.
 
-    for tau in horizons_minutes:
-        H_tau = build_H_matrix([tau], h_mode)  # [1x3]
+    r̂ = H·Xᵀ,   Var(r̂)_hn = h_h P_n h_hᵀ = Σ_ij P_n,ij h_i h_j
 
-        preds = []
-        ci_widths = []
+    A kvadratikus forma a P 6 független elemén egyetlen mátrixszorzás:
+    [6 x H]ᵀ @ [6 x N], ahol a súlysor (h_i h_j, a keresztsoroknál 2×).
+    A kimenet horizont-major, így horizontonként folytonos sorokat ad;
+    az oszlopokat `chunk_rows` méretű szeletekben töltjük.
 
-        for i in range(len(states_df)):
-            x_hat = np.array([
-                [states_df["mu_hat"].iloc[i]],
-                [states_df["mu_dot_hat"].iloc[i]],
-                [states_df["mu_ddot_hat"].iloc[i]],
-            ])
-            pred = float((H_tau @ x_hat).item())
-            preds.append(pred)
+    Args:
+        x: [N x 3] állapot (μ̂, μ̂̇, μ̂̈)
+        P_upper: [N x 6] kovariancia (P00, P11, P22, P01, P02, P12)
+        horizons_minutes: H darab horizont percben
+        out: opcionális [H x 2 x N] kimeneti puffer
 
-            P = np.array([
-                [states_df["P00"].iloc[i], 0, 0],
-                [0, states_df["P11"].iloc[i], 0],
-                [0, 0, states_df["P22"].iloc[i]],
-            ])
-            var = float((H_tau @ P @ H_tau.T).item())
-            ci_widths.append(1.96 * np.sqrt(max(var, 0)))
+    Returns:
+        [H x 2 x N]: [:, 0] előrejelzés, [:, 1] variancia
+    """
+    H, W = horizon_matrices(horizons_minutes, h_mode)            # [H x 3], [H x 6]
+    xT = np.ascontiguousarray(np.asarray(x, dtype=float).T)      # [3 x N]
+    PT = np.ascontiguousarray(np.asarray(P_upper, dtype=float).T)  # [6 x N]
 
-        pred_series = pd.Series(preds, index=states_df.index, name="predicted")
-        ci_series = pd.Series(ci_widths, index=states_df.index, name="ci_width")
+    n = xT.shape[1]
+    if out is None:
+        out = np.empty((len(H), 2, n))
+    for lo in range(0, n, chunk_rows):
+        hi = min(lo + chunk_rows, n)
+        out[:, 0, lo:hi] = H @ xT[:, lo:hi]
+        out[:, 1, lo:hi] = W @ PT[:, lo:hi]
+    return out
 
-        results[tau] = pd.DataFrame({
-            "predicted": pred_series,
-            "ci_lower": pred_series - ci_series,
-            "ci_upper": pred_series + ci_series,
-        })
 
-    return results
+@profiled("signals.predictions")
+def compute_predictions(
+    states_df: pd.DataFrame,
+    horizons_minutes: list[int],
+    h_mode: str = "discrete",
+    z: float = 1.96,
+) -> dict[int, pd.DataFrame]:
+    """
+    Prediktív hozambecslés tetszőleges horizontokra.
+
+    r̂_{t→t+τ} = μ̂·τ + μ̂̇·½τ² + μ̂̈·⅙τ³
 
+    A konfidencia intervallum a teljes P-ből (kereszt-kovarianciákkal) jön:
+    r̂ ± z·√(h P hᵀ).
 
+    Returns:
+        {horizon_minutes: DataFrame with 'predicted', 'ci_lower', 'ci_upper'}
+    """
+    n = len(states_df)
+    # [H x 3 x N]: horizontonként (predicted, ci_lower, ci_upper) folytonos blokk
+    block = np.empty((len(horizons_minutes), 3, n))
+    predict_horizons(
+        states_df[_STATE_COLS].to_numpy(dtype=float),
+        states_df[_P_COLS].to_numpy(dtype=float),
+        horizons_minutes, h_mode, out=block[:, :2],
+    )
+    pred, lower, upper = block[:, 0], block[:, 1], block[:, 2]
+    # Variancia → CI félszélesség helyben, majd a két határ
+    np.sqrt(np.maximum(lower, 0.0, out=lower), out=lower)
+    lower *= z
+    np.add(pred, lower, out=upper)
+    np.subtract(pred, lower, out=lower)
+
+    columns = ["predicted", "ci_lower", "ci_upper"]
+    return {
+        tau: pd.DataFrame(block[j].T, index=states_df.index, columns=columns, copy=False)
+        for j, tau in enumerate(horizons_minutes)
+    }
+
+
+@lru_cache(maxsize=None)
+def anomaly_threshold(n_active: int, significance: float = 0.05) -> float:
+    """χ²(n_active, 1-α) küszöb a Mahalanobis-távolsághoz."""
+    return float(stats.chi2.ppf(1 - significance, df=n_active))
+
+
+@profiled("signals.anomaly_flags")
 def compute_anomaly_flags(
     states_df: pd.DataFrame,
     significance: float = 0.05,
@@ -121,7 +186,7 @@ def compute_anomaly_flags(
     for n_tf in n_active.unique():
         if n_tf < 1:
             continue
-        threshold = stats.chi2.ppf(1 - significance, df=n_tf)
+        threshold = anomaly_threshold(int(n_tf), significance)
         mask = n_active == n_tf
         flags.loc[mask] = mahal.loc[mask] > threshold
 
@@ -0,0 +1,399 @@
+"""
+Streaming (online) mód — lezárt 1m gyertyákból percenkénti szűrés és jelzések.
+
+A batch úttal (fetch → compute_log_returns → run → jelzések) egyenértékű,
+de gyertyánként inkrementálisan: a multi-TF log hozamok egy gördülő
+log-ár gyűrűből jönnek, a szűrő `MultiTFKalmanFilter.step()`-pel lép,
+a trend score, a predikciók és az anomália jelzés az aktuális állapotból
+számolódik. Minden puffer fix méretű, így a memória nem nő a futási idővel.
+
+Használat:
+    runner = StreamingRunner.from_config(config, sigma2_1m)
+    async for update in runner.run(ReplaySource(df_1m)):
+        print(update.timestamp, update.mu_hat, update.trend_score)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, NamedTuple, Optional
+
+import ccxt
+import numpy as np
+import pandas as pd
+
+from config import Config
+from kalman.filter import MultiTFKalmanFilter
+from kalman.smoother import FixedLagSmoother
+from signals import anomaly_threshold, horizon_matrices
+
+logger = logging.getLogger(__name__)
+
+_MINUTE_MS = 60_000
+_MIN_PERIODS = 20          # compute_trend_score rolling min_periods
+
+
+class Candle(NamedTuple):
+    """Egy lezárt 1m gyertya (a ccxt OHLCV sor sorrendjében)."""
+
+    timestamp: int         # nyitási idő, ms (UTC)
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+@dataclass
+class StreamUpdate:
+    """Egy perc publikált kimenete."""
+
+    timestamp: pd.Timestamp
+    step_idx: int
+    close: float
+    mu_hat: float
+    mu_dot_hat: float
+    mu_ddot_hat: float
+    trend_score: float                                   # NaN amíg nincs elég minta
+    predictions: dict[int, tuple[float, float, float]]   # τ → (predicted, ci_lower, ci_upper)
+    mahalanobis: float
+    n_active_tfs: int
+    anomaly: bool
+    warm: bool                                           # burn-in után
+    # Fixed-lag simítás (smooth_lag esetén): x_{t−L|t}, az L perccel korábbi állapot
+    smoothed_timestamp: Optional[pd.Timestamp] = None
+    mu_smooth: float = float("nan")
+    mu_dot_smooth: float = float("nan")
+    mu_ddot_smooth: float = float("nan")
+
+
+# ── Gördülő hozamok ──────────────────────────────────────────────────────────
+
+
+class RollingReturns:
+    """
+    Inkrementális multi-TF log hozam: log(P_t) − log(P_{t−n}).
+
+    A compute_log_returns() időbélyeg alapú definícióját követi: a t epoch
+    percben az n perces TF akkor ad mérést, ha t % n == 0 és a t − n perces
+    gyertya is megérkezett. Csak az utolsó max(n)+1 perc log árát tartja
+    meg, perc szerint indexelt gyűrűben (a perc bélyeggel együtt, így egy
+    rés miatt felül nem írt régi érték nem számít mérésnek).
+    """
+
+    def __init__(self, tf_minutes: dict[str, int]):
+        self.tf_minutes = dict(tf_minutes)
+        self._size = max(tf_minutes.values()) + 1
+        self._log_p = np.empty(self._size)
+        self._minute = np.full(self._size, -1, dtype=np.int64)
+        self.n_seen = 0
+
+    def push(self, minute: int, close: float) -> dict[str, float]:
+        """Új záróár a `minute` epoch percben → az ebben a lépésben elérhető mérések."""
+        log_p = float(np.log(close))
+        self._log_p[minute % self._size] = log_p
+        self._minute[minute % self._size] = minute
+        self.n_seen += 1
+
+        measurements = {}
+        for label, n in self.tf_minutes.items():
+            if minute % n == 0:
+                j = (minute - n) % self._size
+                if self._minute[j] == minute - n:
+                    measurements[label] = log_p - self._log_p[j]
+        return measurements
+
+
+class RollingTrend:
+    """
+    compute_trend_score() percenként: gördülő szórás egy fix [W x 3] gyűrűn.
+
+    σ-k a pandas rolling(W, min_periods=20).std() megfelelői (ddof=1).
+    """
+
+    def __init__(
+        self,
+        w_mu: float = 0.50,
+        w_mu_dot: float = 0.35,
+        w_mu_ddot: float = 0.15,
+        rolling_window: int = 120,
+    ):
+        self.weights = np.array([w_mu, w_mu_dot, w_mu_ddot])
+        self.window = rolling_window
+        self._buf = np.empty((rolling_window, 3))
+        self.n_seen = 0
+
+    def push(self, x: np.ndarray) -> float:
+        self._buf[self.n_seen % self.window] = x
+        self.n_seen += 1
+        n = min(self.n_seen, self.window)
+        if n < _MIN_PERIODS:
+            return float("nan")
+        sigma = self._buf[:n].std(axis=0, ddof=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            norm = np.where(sigma > 0, x / sigma, np.nan)
+        return float(self.weights @ norm)
+
+
+# ── Runner ───────────────────────────────────────────────────────────────────
+
+
+class StreamingRunner:
+    """
+    Gyertyánként léptetett szűrő + jelzések, korlátos memóriával.
+
+    Az utolsó `buffer_size` kimenet a `recent` gyűrűben érhető el; a szűrő
+    saját step() history-ja is fix méretű gyűrű (from_config: csak a
+    simításhoz kellő x / P / x_pred / P_pred mezők). `smooth_lag` = L esetén
+    percenként az L perccel korábbi állapot fixed-lag RTS simítása is
+    publikálódik (lépésenként O(L)).
+    """
+
+    def __init__(
+        self,
+        kf: MultiTFKalmanFilter,
+        horizons_minutes: tuple[int, ...] = (5, 15, 60),
+        trend: Optional[RollingTrend] = None,
+        significance: float = 0.05,
+        burn_in: int = 50,
+        buffer_size: int = 1440,
+        smooth_lag: Optional[int] = None,
+    ):
+        self.kf = kf
+        self.returns = RollingReturns(kf.tf_minutes)
+        self.trend = trend or RollingTrend()
+        self.horizons = list(horizons_minutes)
+        self._H, self._W = horizon_matrices(self.horizons, kf.h_mode)
+        self.significance = significance
+        self.burn_in = burn_in
+        self.recent: deque[StreamUpdate] = deque(maxlen=buffer_size)
+        self.last_ts: Optional[int] = None
+        self.smoother = FixedLagSmoother(kf.F, smooth_lag) if smooth_lag else None
+        self._ts_ring: deque[int] = deque(maxlen=(smooth_lag or 0) + 1)
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Config,
+        sigma2_1m: float,
+        buffer_size: int = 1440,
+        **kwargs,
+    ) -> StreamingRunner:
+        """Runner a config szűrő- és trend beállításaival."""
+        kf = MultiTFKalmanFilter(
+            tf_minutes=config.tf_minutes,
+            q=config.kalman.q,
+            sigma2_1m=sigma2_1m,
+            h_mode=config.kalman.h_mode,
+            r_mode=config.kalman.r_mode,
+            P0_scale=config.kalman.P0_scale,
+            steady_state=config.kalman.steady_state,
+            steady_tol=config.kalman.steady_state_tol,
+            update_mode=config.kalman.update_mode,
+            covariance_form=config.kalman.covariance_form,
+            init=config.kalman.init,
+            history_size=buffer_size,
+            history_fields=("x", "P", "x_pred", "P_pred"),
+        )
+        trend = RollingTrend(
+            w_mu=config.trend.w_mu,
+            w_mu_dot=config.trend.w_mu_dot,
+            w_mu_ddot=config.trend.w_mu_ddot,
+            rolling_window=config.trend.rolling_window,
+        )
+        return cls(kf, trend=trend, buffer_size=buffer_size, **kwargs)
+
+    def on_candle(self, candle: Candle) -> Optional[StreamUpdate]:
+        """
+        Egy lezárt gyertya feldolgozása.
+
+        Returns:
+            a perc kimenete, vagy None ha a gyertya duplikált / régebbi
+        """
+        ts = int(candle.timestamp)
+        if self.last_ts is not None:
+            if ts <= self.last_ts:
+                logger.debug(f"Duplikált / régi gyertya eldobva: {ts}")
+                return None
+            if ts - self.last_ts > _MINUTE_MS:
+                missing = (ts - self.last_ts) // _MINUTE_MS - 1
+                logger.warning(f"Rés a gyertyafolyamban: {missing} hiányzó perc "
+                               f"(egyetlen F(dt) / Q(dt) ugrással átlépve)")
+        self.last_ts = ts
+
+        # Lépés index = epoch perc: a TF ütemezés és a rés-ugrás is ebből adódik
+        step_idx = ts // _MINUTE_MS
+        measurements = self.returns.push(step_idx, candle.close)
+        state = self.kf.step(step_idx, measurements)
+
+        x = state.x[:, 0]
+        P = state.P
+        P_upper = np.array([P[0, 0], P[1, 1], P[2, 2], P[0, 1], P[0, 2], P[1, 2]])
+        pred = self._H @ x
+        ci = 1.96 * np.sqrt(np.maximum(self._W @ P_upper, 0.0))
+
+        warm = self.returns.n_seen > self.burn_in
+        # A trend ablak (mint a batch úton) csak a burn-in után töltődik
+        trend_score = self.trend.push(x) if warm else float("nan")
+
+        n_active = len(state.active_tf_minutes)
+        anomaly = bool(
+            n_active >= 1
+            and state.mahalanobis > anomaly_threshold(n_active, self.significance)
+        )
+
+        update = StreamUpdate(
+            timestamp=pd.Timestamp(ts, unit="ms", tz="UTC"),
+            step_idx=step_idx,
+            close=float(candle.close),
+            mu_hat=float(x[0]),
+            mu_dot_hat=float(x[1]),
+            mu_ddot_hat=float(x[2]),
+            trend_score=trend_score,
+            predictions={
+                tau: (float(pred[j]), float(pred[j] - ci[j]), float(pred[j] + ci[j]))
+                for j, tau in enumerate(self.horizons)
+            },
+            mahalanobis=float(state.mahalanobis),
+            n_active_tfs=n_active,
+            anomaly=anomaly,
+            warm=warm,
+        )
+        if self.smoother is not None:
+            self._ts_ring.append(ts)
+            lagged = self.smoother.push(state)
+            if lagged is not None:
+                _, smoothed = lagged
+                update.smoothed_timestamp = pd.Timestamp(self._ts_ring[0], unit="ms", tz="UTC")
+                update.mu_smooth, update.mu_dot_smooth, update.mu_ddot_smooth = (
+                    float(v) for v in smoothed.x[:, 0]
+                )
+        self.recent.append(update)
+        return update
+
+    def warmup(self, df_1m: pd.DataFrame) -> int:
+        """Történeti gyertyák szinkron betáplálása (kimenet nélkül). Returns: lépések."""
+        n = 0
+        ts = df_1m.index.as_unit("ms").asi8
+        for t, close in zip(ts, df_1m["close"].to_numpy(dtype=float)):
+            if self.on_candle(Candle(int(t), close, close, close, close, 0.0)) is not None:
+                n += 1
+        return n
+
+    async def run(self, source: AsyncIterator[Candle]) -> AsyncIterator[StreamUpdate]:
+        """A forrás gyertyáinak feldolgozása, percenkénti kimenetekkel."""
+        async for candle in source:
+            update = self.on_candle(candle)
+            if update is not None:
+                yield update
+
+    def recent_df(self) -> pd.DataFrame:
+        """A gyűrűben tartott utolsó kimenetek DataFrame-ként."""
+        rows = [
+            {
+                "mu_hat": u.mu_hat,
+                "mu_dot_hat": u.mu_dot_hat,
+                "mu_ddot_hat": u.mu_ddot_hat,
+                "trend_score": u.trend_score,
+                "mahalanobis": u.mahalanobis,
+                "n_active_tfs": u.n_active_tfs,
+                "anomaly": u.anomaly,
+            }
+            for u in self.recent
+        ]
+        return pd.DataFrame(rows, index=pd.DatetimeIndex([u.timestamp for u in self.recent]))
+
+
+# ── Gyertya források ─────────────────────────────────────────────────────────
+
+
+class ReplaySource:
+    """
+    Tárolt 1m gyertyák visszajátszása async iterátorként (offline futtatás).
+
+    Args:
+        df_1m: OHLCV DataFrame (UTC DatetimeIndex)
+        delay: várakozás gyertyánként mp-ben (0 = amilyen gyorsan csak lehet)
+    """
+
+    def __init__(self, df_1m: pd.DataFrame, delay: float = 0.0):
+        self.df = df_1m
+        self.delay = delay
+
+    async def __aiter__(self) -> AsyncIterator[Candle]:
+        ts = self.df.index.as_unit("ms").asi8
+        cols = [c for c in ("open", "high", "low", "close", "volume") if c in self.df]
+        values = {c: self.df[c].to_numpy(dtype=float) for c in cols}
+        close = values["close"]
+        for i, t in enumerate(ts):
+            yield Candle(
+                int(t),
+                values.get("open", close)[i],
+                values.get("high", close)[i],
+                values.get("low", close)[i],
+                close[i],
+                values["volume"][i] if "volume" in values else 0.0,
+            )
+            await asyncio.sleep(self.delay)
+
+
+class ExchangeSource:
+    """
+    Élő 1m gyertyák ccxt pollinggal — csak a már lezárt gyertyák jönnek.
+
+    Args:
+        exchange: ccxt exchange id vagy kész exchange objektum
+        since_ms: az első kért gyertya (None = a következő lezáruló)
+        poll_interval: lekérdezési periódus mp-ben
+    """
+
+    def __init__(
+        self,
+        exchange: str | Any,
+        symbol: str,
+        since_ms: Optional[int] = None,
+        poll_interval: float = 5.0,
+        limit: int = 1000,
+    ):
+        if isinstance(exchange, str):
+            exchange_class = getattr(ccxt, exchange, None)
+            if exchange_class is None:
+                raise ValueError(f"Ismeretlen exchange: {exchange}")
+            exchange = exchange_class({"enableRateLimit": True})
+        self.exchange = exchange
+        self.symbol = symbol
+        self.since_ms = since_ms
+        self.poll_interval = poll_interval
+        self.limit = limit
+
+    async def __aiter__(self) -> AsyncIterator[Candle]:
+        cursor = self.since_ms
+        if cursor is None:
+            cursor = int(time.time() * 1000) // _MINUTE_MS * _MINUTE_MS
+        try:
+            while True:
+                last_closed = int(time.time() * 1000) // _MINUTE_MS * _MINUTE_MS - _MINUTE_MS
+                if cursor <= last_closed:
+                    before = cursor
+                    try:
+                        rows = await asyncio.to_thread(
+                            self.exchange.fetch_ohlcv,
+                            self.symbol, "1m", cursor, self.limit,
+                        )
+                    except ccxt.NetworkError as e:
+                        logger.warning(f"Hálózati hiba, újrapróbálás: {e}")
+                        rows = []
+                    for row in rows:
+                        if cursor <= row[0] <= last_closed:
+                            yield Candle(*row[:6])
+                            cursor = int(row[0]) + _MINUTE_MS
+                    if len(rows) >= self.limit and cursor > before:
+                        continue          # lemaradás → azonnal a következő lap
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            if hasattr(self.exchange, "close"):
+                self.exchange.close()
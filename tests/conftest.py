@@ -0,0 +1,10 @@
+"""Egységteszt közös beállítás — a projekt root a path-ra (mint a benchmarks/ alatt)."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
@@ -0,0 +1,79 @@
+"""Batch-elt szűrő — rés-ugrás futások között, egyezés a MultiTFKalmanFilter-rel."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from kalman.batched import BatchedMultiTFKalmanFilter, FilterParams
+from kalman.filter import MultiTFKalmanFilter
+
+_TF = {"1m": 1, "5m": 5, "15m": 15}
+_PARAMS = [FilterParams(q=1e-8, sigma2_1m=2.5e-7), FilterParams(q=1e-7, sigma2_1m=2.5e-7)]
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(4)
+    minutes = np.r_[np.arange(0, 600), np.arange(700, 1300)].astype(np.int64)
+    Z = 5e-4 * rng.standard_normal((minutes.size, len(_TF)))
+    return minutes, Z
+
+
+def _single(params: FilterParams) -> MultiTFKalmanFilter:
+    return MultiTFKalmanFilter(_TF, q=params.q, sigma2_1m=params.sigma2_1m, backend="numpy")
+
+
+def test_second_run_jumps_the_gap_since_previous_run(data):
+    minutes, Z = data
+    split = 600                                    # a második futás 100 perces rés után indul
+
+    whole = BatchedMultiTFKalmanFilter(_TF, _PARAMS).run_matrix(Z, progress_interval=0, minutes=minutes)
+    batched = BatchedMultiTFKalmanFilter(_TF, _PARAMS)
+    batched.run_matrix(Z[:split], progress_interval=0, minutes=minutes[:split])
+    assert batched.last_step == 599
+    second = batched.run_matrix(Z[split:], progress_interval=0, minutes=minutes[split:])
+    assert batched.last_step == 1299
+
+    for m, params in enumerate(_PARAMS):
+        np.testing.assert_allclose(second[m].x, whole[m].x[split:], rtol=1e-10, atol=1e-18)
+        np.testing.assert_allclose(second[m].P, whole[m].P[split:], rtol=1e-10, atol=1e-24)
+
+        # Ugyanaz a folytatás az egyszerű szűrővel
+        kf = _single(params)
+        kf.run_matrix(Z[:split], progress_interval=0, minutes=minutes[:split])
+        ref = kf.run_matrix(Z[split:], progress_interval=0, minutes=minutes[split:])
+        np.testing.assert_allclose(second[m].x, ref.x, rtol=1e-8, atol=1e-16)
+        np.testing.assert_allclose(second[m].P, ref.P, rtol=1e-8, atol=1e-22)
+
+
+def test_rerun_over_earlier_steps_is_rejected(data):
+    minutes, Z = data
+    batched = BatchedMultiTFKalmanFilter(_TF, _PARAMS)
+    batched.run_matrix(Z[:100], progress_interval=0, minutes=minutes[:100])
+    with pytest.raises(ValueError):
+        batched.run_matrix(Z[50:150], progress_interval=0, minutes=minutes[50:150])
+
+
+def test_loglik_only_mode_matches_full_run(data):
+    minutes, Z = data
+    full = BatchedMultiTFKalmanFilter(_TF, _PARAMS)
+    arrays = full.run_matrix(Z, progress_interval=0, minutes=minutes)
+    light = BatchedMultiTFKalmanFilter(_TF, _PARAMS)
+    assert light.run_matrix(Z, progress_interval=0, minutes=minutes, store_states=False) == []
+
+    np.testing.assert_array_equal(light.loglik, full.loglik)
+    np.testing.assert_array_equal(light.x, full.x)
+    assert light.last_step == full.last_step
+    assert np.isfinite(full.loglik).all() and arrays[0].x.shape == (minutes.size, 3)
+
+
+def test_tuning_evaluate_matches_loglik(data):
+    from kalman.tuning import evaluate
+
+    minutes, Z = data
+    kf = BatchedMultiTFKalmanFilter(_TF, _PARAMS)
+    kf.run_matrix(Z, progress_interval=0, minutes=minutes)
+    expected = kf.loglik[:, 100:].sum(axis=1)
+    got = evaluate(Z, _TF, _PARAMS, burn_in=100, max_workers=2, chunk_size=1, minutes=minutes)
+    np.testing.assert_allclose(got, expected, rtol=1e-12)
@@ -0,0 +1,107 @@
+"""StateStore / resume — napi partíciók újraírása és folytatás a checkpointból."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from config import Config
+from data.fetcher import compute_log_returns, estimate_sigma2_1m
+from data.synthetic import make_gbm_ohlcv
+from kalman.checkpoint import StateStore, resume
+from kalman.filter import MultiTFKalmanFilter
+
+_SYMBOL = "BTC/USDT"
+
+
+@pytest.fixture(scope="module")
+def config():
+    return Config(timeframes=["1m", "5m", "15m", "1h"])
+
+
+@pytest.fixture(scope="module")
+def df_1m():
+    return make_gbm_ohlcv(4 * 1440, start="2024-01-01 06:00", seed=2, missing=[(3000, 3050)])
+
+
+def _filter(config, sigma2_1m):
+    return MultiTFKalmanFilter(tf_minutes=config.tf_minutes, q=1e-8, sigma2_1m=sigma2_1m,
+                               backend="numpy")
+
+
+def _full_run(config, df, sigma2_1m, store):
+    returns = compute_log_returns(df, config)
+    kf = _filter(config, sigma2_1m)
+    kf.run(returns, progress_interval=0)
+    store.save_run(kf, returns.index, 0)
+    return kf
+
+
+def _mtimes(store):
+    return {p.name: p.stat().st_mtime_ns for p in store._day_files()}
+
+
+def test_full_rerun_skips_identical_days_and_drops_stale_ones(tmp_path, config, df_1m):
+    sigma2_1m = estimate_sigma2_1m(compute_log_returns(df_1m, config)["1m"])
+    store = StateStore(tmp_path, _SYMBOL)
+    _full_run(config, df_1m, sigma2_1m, store)
+    before = _mtimes(store)
+    assert sorted(before) == ["2024-01-01.npz", "2024-01-02.npz", "2024-01-03.npz",
+                              "2024-01-04.npz", "2024-01-05.npz"]
+
+    # Azonos adat → egyetlen nap sem íródik újra
+    _full_run(config, df_1m, sigma2_1m, store)
+    assert _mtimes(store) == before
+
+    # Egy nappal később induló ablak: a kiesett nap törlődik, a többi
+    # (más kezdőállapotból szűrt) nap újraíródik
+    _full_run(config, df_1m.iloc[1440:], sigma2_1m, store)
+    after = _mtimes(store)
+    assert "2024-01-01.npz" not in after
+    assert set(after) == set(before) - {"2024-01-01.npz"}
+    assert all(after[name] != before[name] for name in after)
+
+
+def test_full_rerun_rewrites_from_first_changed_day(tmp_path, config, df_1m):
+    sigma2_1m = estimate_sigma2_1m(compute_log_returns(df_1m, config)["1m"])
+    store = StateStore(tmp_path, _SYMBOL)
+    _full_run(config, df_1m, sigma2_1m, store)
+    before = _mtimes(store)
+
+    changed = df_1m.copy()
+    changed.loc["2024-01-03 12:00":, "close"] *= 1.01
+    _full_run(config, changed, sigma2_1m, store)
+    after = _mtimes(store)
+    unchanged = {name for name in after if after[name] == before[name]}
+    assert unchanged == {"2024-01-01.npz", "2024-01-02.npz"}
+
+
+def test_resume_matches_full_run(tmp_path, config, df_1m):
+    returns = compute_log_returns(df_1m, config)
+    sigma2_1m = estimate_sigma2_1m(returns["1m"])
+    store = StateStore(tmp_path, _SYMBOL)
+    _full_run(config, df_1m.iloc[:3 * 1440], sigma2_1m, store)
+
+    kf = _filter(config, sigma2_1m)
+    start = resume(kf, returns, store)
+    assert start == 3 * 1440
+    store.save_run(kf, returns.index, start)
+
+    ref = _filter(config, sigma2_1m)
+    ref.run(returns, progress_interval=0)
+    np.testing.assert_array_equal(kf.arrays.x, ref.arrays.x)
+    np.testing.assert_array_equal(kf.arrays.P, ref.arrays.P)
+    _, stored = store.read(returns.index[0], returns.index[-1])
+    np.testing.assert_array_equal(stored.x, ref.arrays.x)
+
+
+def test_plain_analyze_writes_no_state(tmp_path, config, df_1m):
+    from run_research import analyze
+
+    config = config.model_copy(update={"data": config.data.model_copy(update={"cache_dir": str(tmp_path)})})
+    analyze(config, df_1m.iloc[:1440])
+    assert not any(tmp_path.rglob("*"))
+
+    analyze(config, df_1m.iloc[:1440], save_checkpoint=True)
+    store = StateStore(tmp_path, _SYMBOL)
+    assert store.load_checkpoint() is not None and store._day_files()
@@ -0,0 +1,139 @@
+"""Párhuzamos letöltő — ablakolás, szekvenciálissal egyező összefésülés, token-bucket ráta."""
+
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from data.downloader import TokenBucket, download_ranges, rows_to_df, split_windows
+from data.synthetic import SyntheticExchange
+
+_MIN_MS = 60_000
+_START_MS = int(pd.Timestamp("2024-01-01", tz="UTC").value // 10**6)
+
+
+# ── split_windows ────────────────────────────────────────────────────────────
+
+
+@pytest.mark.parametrize("n_candles, window", [(1, 5), (5, 5), (6, 5), (10, 5), (1234, 100)])
+def test_split_windows_cover_range_exactly(n_candles, window):
+    until = _START_MS + (n_candles - 1) * _MIN_MS
+    windows = split_windows(_START_MS, until, _MIN_MS, window)
+
+    assert windows[0][0] == _START_MS
+    assert windows[-1][1] == until
+    assert len(windows) == -(-n_candles // window)
+    for (a, b), (c, _) in zip(windows, windows[1:]):
+        assert c == b + _MIN_MS                       # hézag és átfedés nélkül
+    for a, b in windows:
+        assert a <= b
+        assert (b - a) // _MIN_MS + 1 <= window
+
+
+def test_split_windows_empty_range():
+    assert split_windows(_START_MS, _START_MS - _MIN_MS, _MIN_MS, 10) == []
+
+
+# ── Párhuzamos vs szekvenciális ──────────────────────────────────────────────
+
+
+def _sequential(exchange: SyntheticExchange, since_ms: int, until_ms: int, limit: int) -> pd.DataFrame:
+    """Referencia: egyetlen kurzorral végiglapozott tartomány (mint data.fetcher.fetch_ohlcv)."""
+    rows: list[list] = []
+    cursor = since_ms
+    while cursor <= until_ms:
+        batch = exchange.fetch_ohlcv("BTC/USDT", "1m", since=cursor, limit=limit)
+        if not batch:
+            break
+        rows.extend(batch)
+        cursor = max(int(batch[-1][0]) + _MIN_MS, cursor + _MIN_MS)
+        if len(batch) < limit:
+            break
+    return rows_to_df(rows, since_ms, until_ms)
+
+
+@pytest.fixture
+def exchange():
+    return SyntheticExchange(_START_MS, 5000, seed=3, missing=[(700, 820), (2990, 3010)])
+
+
+def test_concurrent_matches_sequential(exchange):
+    since, until = _START_MS + 17 * _MIN_MS, _START_MS + 4900 * _MIN_MS
+    expected = _sequential(exchange, since, until, limit=100)
+
+    df = download_ranges(exchange, "BTC/USDT", "1m", [(since, until)],
+                         limit=100, max_workers=6, pages_per_window=2, rate_per_sec=1e6)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_overlapping_ranges_are_merged_and_deduped(exchange):
+    ranges = [
+        (_START_MS + 100 * _MIN_MS, _START_MS + 1500 * _MIN_MS),
+        (_START_MS + 1200 * _MIN_MS, _START_MS + 2600 * _MIN_MS),     # átfed az elsővel
+        (_START_MS + 3500 * _MIN_MS, _START_MS + 3900 * _MIN_MS),     # külön tartomány
+    ]
+    full = _sequential(exchange, _START_MS, _START_MS + 4999 * _MIN_MS, limit=1000)
+    ts = full.index.as_unit("ms").asi8
+    inside = pd.Series(False, index=full.index)
+    for a, b in ranges:
+        inside |= (ts >= a) & (ts <= b)
+    expected = full[inside.to_numpy()]
+
+    df = download_ranges(exchange, "BTC/USDT", "1m", ranges,
+                         limit=100, max_workers=8, pages_per_window=3, rate_per_sec=1e6)
+    assert df.index.is_unique and df.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(df, expected)
+
+    serial = download_ranges(exchange, "BTC/USDT", "1m", ranges,
+                             limit=100, max_workers=1, pages_per_window=3, rate_per_sec=1e6)
+    pd.testing.assert_frame_equal(df, serial)
+
+
+# ── TokenBucket ──────────────────────────────────────────────────────────────
+
+
+class _FakeClock:
+    """Kézi óra: a sleep csak előreteker (a teszt nem vár valós időt)."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_rate():
+    clock = _FakeClock()
+    bucket = TokenBucket(rate=10.0, capacity=4, clock=clock, sleep=clock.sleep)
+
+    for _ in range(4):                       # a teljes löket várakozás nélkül
+        bucket.acquire()
+    assert clock.now == 0.0 and not clock.sleeps
+
+    for _ in range(20):                      # utána tartósan 10 kérés / mp
+        bucket.acquire()
+    assert clock.now == pytest.approx(2.0)
+    assert all(s == pytest.approx(0.1) for s in clock.sleeps)
+
+
+def test_token_bucket_refills_up_to_capacity():
+    clock = _FakeClock()
+    bucket = TokenBucket(rate=5.0, capacity=2, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 60.0                        # hosszú szünet: legfeljebb capacity token gyűlik
+    bucket.acquire()
+    bucket.acquire()
+    assert not clock.sleeps
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.2)]
+
+
+def test_token_bucket_rejects_nonpositive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0.0)
@@ -0,0 +1,55 @@
+"""Numba kernel — a backend="numba" forward pass egyezése a NumPy úttal (joint / sequential)."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from config import Config
+from data.fetcher import compute_log_returns, estimate_sigma2_1m
+from data.synthetic import make_gbm_ohlcv
+from kalman.filter import MultiTFKalmanFilter
+from kalman.tuning import log_likelihood
+
+pytest.importorskip("numba")
+
+
+@pytest.fixture(scope="module")
+def returns():
+    config = Config(timeframes=["1m", "5m", "15m", "1h", "4h"])
+    df = make_gbm_ohlcv(4000, start="2024-01-01", seed=11, missing=[(250, 260), (1900, 2150)])
+    return compute_log_returns(df, config), config.tf_minutes
+
+
+def _run(returns, tf_minutes, backend: str, update_mode: str):
+    kf = MultiTFKalmanFilter(
+        tf_minutes=tf_minutes,
+        q=1e-8,
+        sigma2_1m=estimate_sigma2_1m(returns["1m"]),
+        backend=backend,
+        update_mode=update_mode,
+    )
+    return kf, kf.run(returns)
+
+
+@pytest.mark.parametrize("update_mode", ["joint", "sequential"])
+def test_numba_matches_numpy(returns, update_mode, caplog):
+    returns, tf_minutes = returns
+    kf_nb, nb = _run(returns, tf_minutes, "numba", update_mode)
+    assert "NumPy útvonal" not in caplog.text          # a kernel futott, nem a tartalék
+    kf_np, ref = _run(returns, tf_minutes, "numpy", update_mode)
+    assert kf_nb.backend == "numba" and kf_np.backend == "numpy"
+
+    np.testing.assert_array_equal(nb.active, ref.active)
+    np.testing.assert_array_equal(nb.step_idx, ref.step_idx)
+    # A diffúz induló P mellett az első lépések kerekítése eltérhet → a mező
+    # skálájához mért abszolút tolerancia; inaktív TF-eknél mindkét út NaN innováció
+    for field in ("x", "P", "x_pred", "P_pred", "innovation", "mahalanobis"):
+        actual, expected = getattr(nb, field), getattr(ref, field)
+        np.testing.assert_allclose(actual, expected, rtol=1e-9,
+                                   atol=1e-7 * np.nanmax(np.abs(expected)), err_msg=field)
+    assert log_likelihood(nb) == pytest.approx(log_likelihood(ref), rel=1e-9)
+
+    # A futás végi állapot (folytatáshoz) is egyezik
+    np.testing.assert_allclose(kf_nb.x, kf_np.x, rtol=1e-9, atol=1e-16)
+    np.testing.assert_allclose(kf_nb.P, kf_np.P, rtol=1e-9, atol=1e-20)
@@ -0,0 +1,51 @@
+"""MultiTFKalmanFilter.step — nézet-kimenet, return_state=False, ring history."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from kalman.filter import MultiTFKalmanFilter
+
+_TF = {"1m": 1, "5m": 5, "15m": 15}
+
+
+def _measurements(n: int, seed: int = 0) -> list[dict[str, float]]:
+    rng = np.random.default_rng(seed)
+    return [
+        {label: float(5e-4 * rng.standard_normal()) for label, m in _TF.items() if i % m == 0}
+        for i in range(n)
+    ]
+
+
+def _filter(**kwargs) -> MultiTFKalmanFilter:
+    return MultiTFKalmanFilter(_TF, q=1e-8, sigma2_1m=2.5e-7, **kwargs)
+
+
+def test_state_is_readonly_view_of_filter():
+    kf = _filter()
+    state = kf.step(0, {"1m": 1e-3, "5m": 2e-3, "15m": 3e-3})
+    assert np.shares_memory(state.x, kf.x) and np.shares_memory(state.P, kf.P)
+    with pytest.raises(ValueError):
+        state.x[0, 0] = 1.0
+    assert state.active_tf_minutes == [1, 5, 15]
+    assert state.innovation.shape == (3, 1)
+
+    # A következő lépés új tömböket állít elő: a korábbi nézet nem változik
+    x0 = state.x.copy()
+    kf.step(1, {"1m": -1e-3})
+    np.testing.assert_array_equal(state.x, x0)
+
+
+def test_without_state_matches_with_state():
+    data = _measurements(300)
+    with_state = _filter(history_size=50, history_fields=("x", "P"))
+    without = _filter(history_size=50, history_fields=("x", "P"))
+    xs = [with_state.step(i, m).x[:, 0].copy() for i, m in enumerate(data)]
+    assert all(without.step(i, m, return_state=False) is None for i, m in enumerate(data))
+
+    np.testing.assert_array_equal(without.x, with_state.x)
+    np.testing.assert_array_equal(without.P, with_state.P)
+    hist = without.history.to_arrays()
+    assert len(hist) == 50
+    np.testing.assert_array_equal(hist.x, np.array(xs[-50:]))
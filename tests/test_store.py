@@ -0,0 +1,90 @@
+"""OHLCVStore — napi parquet partíciók és a napi Arrow IPC close szegmensek."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.store import OHLCVStore
+from data.synthetic import make_gbm_ohlcv
+
+_DAY_MS = 24 * 3600 * 1000
+
+
+def _ms(ts: pd.Timestamp) -> int:
+    return int(ts.value // 10**6)
+
+
+def _store_with(tmp_path, df: pd.DataFrame) -> OHLCVStore:
+    store = OHLCVStore(tmp_path, "BTC/USDT")
+    store.append(df, _ms(df.index[0]), _ms(df.index[-1]))
+    return store
+
+
+def test_read_close_matches_parquet(tmp_path):
+    df = make_gbm_ohlcv(3 * 1440 + 100, start="2024-01-01 12:00", missing=[(500, 620)])
+    store = _store_with(tmp_path, df)
+    since, until = _ms(df.index[200]), _ms(df.index[-50])
+
+    close = store.read_close(since, until)
+    expected = store.read(since, until, columns=["close"])["close"]
+    np.testing.assert_array_equal(close.to_numpy(), expected.to_numpy())
+    assert close.index.equals(expected.index)
+
+
+def test_single_day_read_is_zero_copy(tmp_path):
+    df = make_gbm_ohlcv(2 * 1440, start="2024-01-01")
+    store = _store_with(tmp_path, df)
+    close = store.read_close(_ms(df.index[10]), _ms(df.index[1000]))
+    assert len(close) == 991
+    assert not close.to_numpy().flags.writeable       # a leképezett pufferre mutat
+
+
+def test_append_rewrites_only_touched_segments(tmp_path):
+    df = make_gbm_ohlcv(4 * 1440, start="2024-01-01")
+    head, tail = df.iloc[:3 * 1440 + 60], df.iloc[3 * 1440 + 60:]
+    store = _store_with(tmp_path, head)
+    store.read_close(_ms(df.index[0]), _ms(df.index[-1]))
+    segments = sorted(store.ipc_dir.glob("*.arrow"))
+    assert len(segments) == 4
+    before = {p.name: p.stat().st_mtime_ns for p in segments}
+
+    store.append(tail, _ms(tail.index[0]), _ms(tail.index[-1]))
+    after = {p.name: p.stat().st_mtime_ns for p in sorted(store.ipc_dir.glob("*.arrow"))}
+    changed = sorted(name for name in after if after[name] != before.get(name))
+    assert changed == ["2024-01-04.arrow"]
+
+    close = store.read_close(_ms(df.index[0]), _ms(df.index[-1]))
+    np.testing.assert_array_equal(close.to_numpy(), df["close"].to_numpy())
+
+
+def test_missing_segment_is_built_from_parquet(tmp_path):
+    df = make_gbm_ohlcv(2 * 1440, start="2024-01-01")
+    store = _store_with(tmp_path, df)
+    for p in store.ipc_dir.glob("*.arrow"):
+        p.unlink()                                   # pl. a napi szegmensek előtti tároló
+    close = store.read_close(_ms(df.index[0]), _ms(df.index[-1]))
+    np.testing.assert_array_equal(close.to_numpy(), df["close"].to_numpy())
+    assert len(list(store.ipc_dir.glob("*.arrow"))) == 2
+
+
+def test_empty_store_reads_keep_schema(tmp_path):
+    store = OHLCVStore(tmp_path, "BTC/USDT")
+    df = store.read(0, _DAY_MS)
+    assert df.empty and list(df.columns) == ["open", "high", "low", "close", "volume"]
+    assert isinstance(df.index, pd.DatetimeIndex) and str(df.index.tz) == "UTC"
+    close = store.read_close(0, _DAY_MS)
+    assert close.empty and str(close.index.tz) == "UTC"
+
+
+@pytest.mark.parametrize("mmap_close", [False, True])
+def test_fetch_or_load_without_data_raises(tmp_path, monkeypatch, mmap_close):
+    from config import Config
+    from data import fetcher
+
+    # A tőzsde semmit nem ad vissza a hiányzó tartományokra
+    monkeypatch.setattr(fetcher, "download_ranges", lambda *a, **kw: make_gbm_ohlcv(0))
+    config = Config(data={"cache_dir": str(tmp_path), "days_back": 1, "mmap_close": mmap_close})
+    with pytest.raises(RuntimeError, match="Nem érkezett OHLCV adat"):
+        fetcher.fetch_or_load(config)
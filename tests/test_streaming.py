@@ -0,0 +1,114 @@
+"""Streaming mód — ReplaySource + StreamingRunner.run egyezése a batch úttal, korlátos pufferek."""
+
+from __future__ import annotations
+
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import Config
+from data.fetcher import compute_log_returns, estimate_sigma2_1m
+from data.synthetic import make_gbm_ohlcv
+from kalman.filter import MultiTFKalmanFilter
+from signals import compute_anomaly_flags, compute_predictions
+from streaming import ReplaySource, RollingReturns, StreamingRunner
+
+_HORIZONS = (5, 15, 60)
+
+
+def _assert_close(actual, expected, rtol=1e-7):
+    """Egyezés az oszlop skálájához mérten (NaN == NaN)."""
+    # A diffúz induló P mellett az első lépések kerekítése (batch kernel vs
+    # step()) ~1e-8 relatív eltérést ad, utána ~1e-14-et
+    actual, expected = np.asarray(actual, dtype=float), np.asarray(expected, dtype=float)
+    tol = rtol * np.nanmax(np.abs(expected), axis=0)
+    diff = np.abs(actual - expected)
+    ok = (diff <= tol) | (np.isnan(actual) & np.isnan(expected))
+    assert ok.all(), f"{(~ok).sum()} eltérés, max {np.nanmax(diff / tol):.2f}×tol"
+
+
+def _collect(runner: StreamingRunner, df_1m: pd.DataFrame) -> list:
+    async def consume():
+        return [u async for u in runner.run(ReplaySource(df_1m))]
+    return asyncio.run(consume())
+
+
+@pytest.fixture(scope="module")
+def config():
+    return Config(timeframes=["1m", "5m", "15m", "1h"])
+
+
+@pytest.fixture(scope="module")
+def df_1m():
+    # Rések: egy rövid és egy óra-határon átnyúló kiesés
+    return make_gbm_ohlcv(3000, start="2024-01-01", seed=5, missing=[(400, 407), (1190, 1330)])
+
+
+@pytest.fixture(scope="module")
+def batch(config, df_1m):
+    returns = compute_log_returns(df_1m, config)
+    sigma2_1m = estimate_sigma2_1m(returns["1m"])
+    kf = MultiTFKalmanFilter(
+        tf_minutes=config.tf_minutes,
+        q=config.kalman.q,
+        sigma2_1m=sigma2_1m,
+        h_mode=config.kalman.h_mode,
+        r_mode=config.kalman.r_mode,
+        P0_scale=config.kalman.P0_scale,
+        steady_state=config.kalman.steady_state,
+        steady_tol=config.kalman.steady_state_tol,
+        update_mode=config.kalman.update_mode,
+        covariance_form=config.kalman.covariance_form,
+        init=config.kalman.init,
+    )
+    states_df = kf.run(returns).to_states_df(df_1m.index)
+    return sigma2_1m, states_df
+
+
+def test_replay_matches_batch(config, df_1m, batch):
+    sigma2_1m, states_df = batch
+    runner = StreamingRunner.from_config(config, sigma2_1m, horizons_minutes=_HORIZONS)
+    updates = _collect(runner, df_1m)
+
+    assert len(updates) == len(df_1m)
+    assert [u.timestamp for u in updates] == list(df_1m.index)
+
+    x = np.array([[u.mu_hat, u.mu_dot_hat, u.mu_ddot_hat] for u in updates])
+    _assert_close(x, states_df[["mu_hat", "mu_dot_hat", "mu_ddot_hat"]].to_numpy())
+    np.testing.assert_array_equal([u.n_active_tfs for u in updates], states_df["n_active_tfs"])
+    _assert_close([u.mahalanobis for u in updates], states_df["mahalanobis"])
+
+    preds = compute_predictions(states_df, list(_HORIZONS), h_mode=config.kalman.h_mode)
+    for tau in _HORIZONS:
+        stream = np.array([u.predictions[tau] for u in updates])
+        expected = preds[tau][["predicted", "ci_lower", "ci_upper"]].to_numpy()
+        _assert_close(stream, expected)
+
+    flags = compute_anomaly_flags(states_df)
+    assert flags.any()
+    np.testing.assert_array_equal([u.anomaly for u in updates], flags.to_numpy())
+
+
+def test_buffers_stay_bounded(config, df_1m, batch):
+    sigma2_1m, _ = batch
+    runner = StreamingRunner.from_config(config, sigma2_1m, buffer_size=100)
+    updates = _collect(runner, df_1m)
+
+    recent = runner.recent_df()
+    assert len(recent) == 100
+    assert list(recent.index) == [u.timestamp for u in updates[-100:]]
+    assert runner.returns._log_p.shape == (max(config.tf_minutes.values()) + 1,)
+    assert runner.trend._buf.shape == (config.trend.rolling_window, 3)
+    assert len(runner.kf.history) <= 100
+
+
+def test_rolling_returns_skip_gaps():
+    rolling = RollingReturns({"1m": 1, "5m": 5})
+    assert rolling.push(100, 1.0) == {}
+    assert rolling.push(101, np.e)["1m"] == pytest.approx(1.0)
+    # 102–104 kiesett: a 105. perc 5m hozamához a 100. perc ára megvan, az 1m-hez nincs előző
+    assert rolling.push(105, np.e ** 2) == {"5m": pytest.approx(2.0)}
+    # A gyűrű egy teljes körrel korábbi (felül nem írt) értéke nem számít mérésnek
+    assert rolling.push(111, 1.0) == {}
@@ -15,6 +15,7 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from config import Config
+from profiling import span
 
 logger = logging.getLogger(__name__)
 
@@ -50,13 +51,15 @@ class BasePlot:
 
         if fmt in ("html", "both"):
             path = self.output_dir / f"{filename}.html"
-            fig.write_html(str(path), include_plotlyjs="cdn")
+            with span("viz.write_html", file=path.name):
+                fig.write_html(str(path), include_plotlyjs="cdn")
             logger.info(f"  Mentve: {path}")
 
         if fmt in ("png", "both"):
             path_png = self.output_dir / f"{filename}.png"
             try:
-                fig.write_image(str(path_png), width=self.viz.width, height=self.viz.height, scale=2)
+                with span("viz.write_image", file=path_png.name):
+                    fig.write_image(str(path_png), width=self.viz.width, height=self.viz.height, scale=2)
                 logger.info(f"  Mentve: {path_png}")
             except Exception as e:
                 logger.warning(f"  PNG export hiba: {e}")
@@ -9,19 +9,15 @@ from __future__ import annotations
 
 import logging
 from pathlib import Path
-from typing import TYPE_CHECKING
-
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from config import Config
+from kalman.filter import KalmanArrays, KalmanState
 from visualizations.base import BasePlot
 
-if TYPE_CHECKING:
-    from kalman.filter import KalmanState
-
 logger = logging.getLogger(__name__)
 
 # TF szín- és címke mapping
@@ -41,55 +37,36 @@ class GainPlot(BasePlot):
     def __init__(self, config: Config, price_series: pd.Series):
         super().__init__(config, price_series)
 
-    def generate(self, history: list) -> Path:
+    def generate(self, history: KalmanArrays | list[KalmanState]) -> Path:
         """
         Kalman gain dinamika ábrázolása.
 
         Args:
-            history: KalmanState objektumok listája.
-                     Minden elemnek van: .K (np.ndarray [3xk] vagy None),
-                     .active_tf_minutes (list[int]), .step_idx (int)
+            history: a szűrő oszlopos history-ja (KalmanArrays: .K [N x 3 x k],
+                     .active [N x k], .step_idx [N]), vagy KalmanState lista.
 
         Returns:
             Az elmentett fájl útvonala.
         """
-        # ── Adatok előkészítése ──────────────────────────────────────────
-        steps = []
-        frob_norms = []
-        gain_mu = []       # sum(|K[0,:]|)
-        gain_mu_dot = []   # sum(|K[1,:]|)
-        gain_mu_ddot = []  # sum(|K[2,:]|)
-        active_tfs_list = []
-
-        for state in history:
-            steps.append(state.step_idx)
-            active_tfs_list.append(state.active_tf_minutes)
-
-            if state.K is not None:
-                K = state.K
-                frob_norms.append(np.linalg.norm(K, "fro"))
-                gain_mu.append(np.sum(np.abs(K[0, :])))
-                gain_mu_dot.append(np.sum(np.abs(K[1, :])))
-                gain_mu_ddot.append(np.sum(np.abs(K[2, :])))
-            else:
-                frob_norms.append(0.0)
-                gain_mu.append(0.0)
-                gain_mu_dot.append(0.0)
-                gain_mu_ddot.append(0.0)
-
-        steps = np.array(steps)
-        frob_norms = np.array(frob_norms)
-        gain_mu = np.array(gain_mu)
-        gain_mu_dot = np.array(gain_mu_dot)
-        gain_mu_ddot = np.array(gain_mu_ddot)
+        if not isinstance(history, KalmanArrays):
+            history = KalmanArrays.from_history(history)
+
+        # ── Adatok előkészítése (inaktív TF oszlopai K-ban 0) ────────────
+        # x tengely: percek az első lépéstől (a step_idx epoch perc is lehet)
+        steps = history.step_idx - (history.step_idx[0] if len(history) else 0)
+        K = history.K
+        frob_norms = np.sqrt(np.sum(K**2, axis=(1, 2)))
+        gain_mu = np.sum(np.abs(K[:, 0, :]), axis=1)       # sum(|K[0,:]|)
+        gain_mu_dot = np.sum(np.abs(K[:, 1, :]), axis=1)   # sum(|K[1,:]|)
+        gain_mu_ddot = np.sum(np.abs(K[:, 2, :]), axis=1)  # sum(|K[2,:]|)
 
         # ── TF határok megkeresése (első előfordulás) ────────────────────
         # Azon lépések, ahol először jelenik meg egy nagyobb TF
         tf_first_seen: dict[int, int] = {}
-        for i, atfs in enumerate(active_tfs_list):
-            for tf_min in atfs:
-                if tf_min not in tf_first_seen:
-                    tf_first_seen[tf_min] = steps[i]
+        for j, tf_min in enumerate(history.tf_values):
+            seen = np.flatnonzero(history.active[:, j])
+            if seen.size:
+                tf_first_seen[tf_min] = int(steps[seen[0]])
 
         # ── Subplots ────────────────────────────────────────────────────
         fig = make_subplots(
@@ -109,7 +86,7 @@ class GainPlot(BasePlot):
                 x=steps, y=frob_norms,
                 name="‖K‖_F",
                 line=dict(color="#1f77b4", width=1.0),
-                hovertemplate="lépés: %{x}<br>‖K‖_F: %{y:.6f}",
+                hovertemplate="perc: %{x}<br>‖K‖_F: %{y:.6f}",
             ),
             row=1, col=1,
         )
@@ -135,7 +112,7 @@ class GainPlot(BasePlot):
                 x=steps, y=gain_mu,
                 name="Σ|K[μ,:]|",
                 line=dict(color="#1f77b4", width=1.2),
-                hovertemplate="lépés: %{x}<br>Σ|K[μ,:]|: %{y:.6f}",
+                hovertemplate="perc: %{x}<br>Σ|K[μ,:]|: %{y:.6f}",
             ),
             row=2, col=1,
         )
@@ -144,7 +121,7 @@ class GainPlot(BasePlot):
                 x=steps, y=gain_mu_dot,
                 name="Σ|K[μ̇,:]|",
                 line=dict(color="#2ca02c", width=1.2),
-                hovertemplate="lépés: %{x}<br>Σ|K[μ̇,:]|: %{y:.6f}",
+                hovertemplate="perc: %{x}<br>Σ|K[μ̇,:]|: %{y:.6f}",
             ),
             row=2, col=1,
         )
@@ -153,7 +130,7 @@ class GainPlot(BasePlot):
                 x=steps, y=gain_mu_ddot,
                 name="Σ|K[μ̈,:]|",
                 line=dict(color="#ff7f0e", width=1.2),
-                hovertemplate="lépés: %{x}<br>Σ|K[μ̈,:]|: %{y:.6f}",
+                hovertemplate="perc: %{x}<br>Σ|K[μ̈,:]|: %{y:.6f}",
             ),
             row=2, col=1,
         )
@@ -168,7 +145,7 @@ class GainPlot(BasePlot):
                 )
 
         fig.update_yaxes(title_text="Σ|K[i,:]|", row=2, col=1)
-        fig.update_xaxes(title_text="Lépés index", row=2, col=1)
+        fig.update_xaxes(title_text="Perc (az első lépéstől)", row=2, col=1)
 
         # ── Layout ──────────────────────────────────────────────────────
         self.apply_layout(fig, title="Kalman-nyereség dinamika", height=900)
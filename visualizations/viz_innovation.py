@@ -16,7 +16,7 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from scipy.stats import chi2
 
-from config import Config
+from config import Config, epoch_minutes
 from visualizations.base import BasePlot
 
 logger = logging.getLogger(__name__)
@@ -115,7 +115,6 @@ class InnovationPlot(BasePlot):
         # egy adott tf aktív minden n-edik lépésnél.
 
         tf_minutes_sorted = sorted(self.config.tf_minutes.items(), key=lambda x: x[1])
-        n_steps = len(states_df)
 
         # Gyűjtsük össze a scatter adatokat TF-enként
         # A Mahalanobis-távolság a teljes innováció normája;
@@ -126,13 +125,13 @@ class InnovationPlot(BasePlot):
         # elosztás az aktív TF-ek között.
         mahal_vals = states_df["mahalanobis"].values
         n_active = states_df["n_active_tfs"].values
+        step_minutes = epoch_minutes(states_df.index)
 
         # Per-TF normalizált innováció scatter pontok
         already_in_legend = set()
         for tf_label, tf_min in tf_minutes_sorted:
-            # Azon lépések ahol ez a TF aktív (step_idx % tf_min == 0)
-            step_indices = np.arange(n_steps)
-            active_mask = (step_indices % tf_min == 0) & (n_active > 0)
+            # Azon lépések ahol ez a TF aktív (epoch perc % tf_min == 0)
+            active_mask = (step_minutes % tf_min == 0) & (n_active > 0)
             active_indices = np.where(active_mask)[0]
 
             if len(active_indices) == 0:
@@ -16,6 +16,7 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from config import Config
+from data.returns import SparseReturns
 from visualizations.base import BasePlot
 
 logger = logging.getLogger(__name__)
@@ -66,7 +67,7 @@ class PredictionPlot(BasePlot):
     def generate(
         self,
         states_df: pd.DataFrame,
-        returns: dict[str, pd.Series],
+        returns: SparseReturns,
         predictions: dict[int, pd.DataFrame],
         tf_minutes: dict[str, int],
     ) -> Path:
@@ -75,7 +76,7 @@ class PredictionPlot(BasePlot):
 
         Args:
             states_df: Kalman szűrő állapotok.
-            returns: Nyers hozamok timeframe-enként {'1m': Series, '5m': Series, ...}.
+            returns: compute_log_returns() outputja (TF → kompakt Series, csak mérési pontok).
             predictions: {5: DataFrame(predicted, ci_lower, ci_upper), 15: ..., 60: ...}.
             tf_minutes: {'1m': 1, '5m': 5, ...}.
 
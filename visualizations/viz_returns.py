@@ -16,6 +16,7 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from config import Config
+from data.returns import SparseReturns
 from kalman.matrices import build_H_matrix
 from visualizations.base import BasePlot
 
@@ -31,7 +32,7 @@ class ReturnsPlot(BasePlot):
     def generate(
         self,
         states_df: pd.DataFrame,
-        returns: dict[str, pd.Series],
+        returns: SparseReturns,
         tf_minutes: dict[str, int],
         h_mode: str,
     ) -> Path:
@@ -40,7 +41,7 @@ class ReturnsPlot(BasePlot):
 
         Args:
             states_df: szűrt állapotok (mu_hat, mu_dot_hat, mu_ddot_hat, ...)
-            returns: nyers log hozam sorozatok TF-enként {'1m': Series, ...}
+            returns: compute_log_returns() outputja (TF → kompakt Series)
             tf_minutes: TF → percek mapping {'1m': 1, '5m': 5, ...}
             h_mode: 'continuous' vagy 'discrete' — H mátrix mód
 
@@ -75,16 +76,14 @@ class ReturnsPlot(BasePlot):
 
             # Nyers hozam
             if tf_label in returns:
+                # Kompakt sorozat (csak mérési pontok): sor pozíciók a közös tengelyen
                 raw_series = returns[tf_label]
-                # Reindex a states_df indexéhez (közös tengely)
-                raw_aligned = raw_series.reindex(idx)
-                raw_vals = raw_aligned.values
-
-                # Csak ott mutatjuk a rekonstruált értéket, ahol a nyers nem NaN
-                valid_mask = np.isfinite(raw_vals)
-                valid_idx = idx[valid_mask]
+                pos = idx.get_indexer(raw_series.index)
+                raw_vals = raw_series.to_numpy(dtype=float)
+                valid_mask = (pos >= 0) & np.isfinite(raw_vals)
+                valid_idx = raw_series.index[valid_mask]
                 raw_valid = raw_vals[valid_mask]
-                recon_valid = reconstructed[valid_mask]
+                recon_valid = reconstructed[pos[valid_mask]]
 
                 # Nyers hozam — szürke
                 fig.add_trace(
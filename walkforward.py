@@ -0,0 +1,327 @@
+"""
+Walk-forward kiértékelés — predikció pontosság gördülő out-of-sample foldokon.
+
+Foldonként egy tanuló ablakon újrabecsüljük a σ²_1m-et (és opcionálisan
+egy q rácson log-likelihood szerint a q-t), majd a rákövetkező teszt
+ablakon a szűrt állapotokból `compute_predictions`-szel előrejelzünk, és
+a tényleges előre néző hozamokkal vetjük össze:
+
+    r̂_{t→t+τ}  vs  r_{t→t+τ} = log P_{t+τ} − log P_t
+
+Metrikák foldonként és horizontonként: RMSE, MAE, hit rate (előjel-
+egyezés %), CI lefedettség (a tényleges hozam a 95% sávban, %).
+
+Melegindítás: a foldhatárokon a szűrő nem hidegen (x = 0, P = P0) indul,
+hanem egy alap paraméterekkel futó, szegmensenként léptetett menet
+(x, P) állapotából — így nincs foldonkénti burn-in, és a tanuló ablakot
+csak a q rács kiértékelése járja be. A foldok ezután egymástól
+függetlenek, process poolon párhuzamosan futnak.
+
+A szűrő lépés indexe az epoch perc, így a szeletelt mérésmátrixon is a
+teljes sorozattal azonos az ütemezés (`perc % n == 0`) fázisa, és a
+tényleges hozamok is időbélyeg szerint párosulnak — a foldhatárok
+tetszőleges sorra eshetnek, a kiesett gyertyák nem tolják el a horizontot.
+
+Használat:
+    folds = make_folds(len(df_1m), 14 * 1440, 7 * 1440)
+    metrics = walk_forward(df_1m, config, [5, 15, 60, 240], folds, q_grid=[1e-9, 1e-8])
+    table = summarize(metrics)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from data.fetcher import compute_log_returns
+from kalman.filter import MultiTFKalmanFilter, returns_to_matrix
+from kalman.tuning import log_likelihood
+from signals import compute_predictions
+
+logger = logging.getLogger(__name__)
+
+METRIC_COLUMNS = ["rmse", "mae", "hit_rate", "coverage"]
+
+
+@dataclass(frozen=True)
+class Fold:
+    """Egy fold lépésindexei: tanuló [train_start, test_start), teszt [test_start, test_end)."""
+
+    index: int
+    train_start: int
+    test_start: int
+    test_end: int
+
+
+@dataclass
+class _FoldTask:
+    """Egy worker feladata: a fold szeletei és a melegindító állapotok."""
+
+    fold: Fold
+    index: pd.DatetimeIndex          # teszt ablak időbélyegei
+    Z_train: np.ndarray              # [train x k]
+    Z_test: np.ndarray               # [test x k]
+    minutes_train: np.ndarray        # [train] epoch perc
+    minutes_test: np.ndarray         # [test] epoch perc
+    actual: dict[int, np.ndarray]    # horizont → [test] tényleges előre néző hozam
+    train_state: tuple               # (x, P, utolsó lépés) a tanuló ablak előtt
+    test_state: tuple                # (x, P, utolsó lépés) a teszt ablak előtt
+
+
+def make_folds(
+    n_steps: int,
+    train_steps: int,
+    test_steps: int,
+    align: int = 1,
+) -> list[Fold]:
+    """
+    Gördülő foldok: rögzített hosszú tanuló ablak, utána a teszt ablak,
+    `test_steps` lépésenként előre tolva (a teszt ablakok nem fednek át).
+
+    Args:
+        align: az ablakhosszak felfelé erre kerekítődnek (pl. 1440 = egész napok)
+    """
+    if train_steps <= 0 or test_steps <= 0:
+        raise ValueError(f"Pozitív ablakhossz kell: train={train_steps}, test={test_steps}")
+    train_steps = -(-train_steps // align) * align
+    test_steps = -(-test_steps // align) * align
+    folds = []
+    for test_start in range(train_steps, n_steps, test_steps):
+        folds.append(Fold(
+            index=len(folds),
+            train_start=test_start - train_steps,
+            test_start=test_start,
+            test_end=min(test_start + test_steps, n_steps),
+        ))
+    return folds
+
+
+def prediction_metrics(
+    predicted: np.ndarray,
+    actual: np.ndarray,
+    lower: Optional[np.ndarray] = None,
+    upper: Optional[np.ndarray] = None,
+) -> dict[str, float]:
+    """RMSE, MAE, hit rate (%) és — ha van CI — lefedettség (%) a közös véges pontokon."""
+    ok = np.isfinite(predicted) & np.isfinite(actual)
+    n = int(ok.sum())
+    if n == 0:
+        return {"n": 0, **{c: np.nan for c in METRIC_COLUMNS}}
+    pred, act = predicted[ok], actual[ok]
+    errors = pred - act
+    coverage = np.nan
+    if lower is not None and upper is not None:
+        coverage = float(((act >= lower[ok]) & (act <= upper[ok])).mean() * 100)
+    return {
+        "n": n,
+        "rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "mae": float(np.mean(np.abs(errors))),
+        "hit_rate": float((np.sign(pred) == np.sign(act)).mean() * 100),
+        "coverage": coverage,
+    }
+
+
+def _make_filter(config: Config, q: float, sigma2_1m: float) -> MultiTFKalmanFilter:
+    k = config.kalman
+    return MultiTFKalmanFilter(
+        config.tf_minutes, q, sigma2_1m,
+        h_mode=k.h_mode, r_mode=k.r_mode, P0_scale=k.P0_scale,
+        backend=k.backend, update_mode=k.update_mode, covariance_form=k.covariance_form,
+        init=k.init,
+    )
+
+
+def _sigma2_1m(Z: np.ndarray, base_minutes: int) -> float:
+    """σ²_1m a legkisebb TF hozamaiból (random walk: variancia / perc)."""
+    col = Z[:, 0]
+    col = col[np.isfinite(col)]
+    if len(col) < 2:
+        raise ValueError("Túl kevés mérés a σ²_1m becsléshez")
+    return float(np.var(col, ddof=1)) / base_minutes
+
+
+def forward_returns(minutes: np.ndarray, log_price: np.ndarray, tau: int) -> np.ndarray:
+    """
+    r_{t→t+τ} = log P_{t+τ} − log P_t soronként, időbélyeg szerint párosítva.
+
+    NaN, ahol a t + τ perces gyertya hiányzik (rés vagy a sorozat vége).
+    """
+    target = minutes + tau
+    pos = np.searchsorted(minutes, target)
+    found = pos < len(minutes)
+    found[found] = minutes[pos[found]] == target[found]
+    out = np.full(len(minutes), np.nan)
+    out[found] = log_price[pos[found]] - log_price[found]
+    return out
+
+
+def boundary_states(
+    kf: MultiTFKalmanFilter,
+    Z: np.ndarray,
+    boundaries: list[int],
+    minutes: Optional[np.ndarray] = None,
+) -> dict[int, tuple[np.ndarray, np.ndarray, Optional[int]]]:
+    """
+    (x, P, utolsó lépés) a megadott sorok előtt, egyetlen szegmensenként
+    léptetett menetben.
+
+    A szűrő a határok között `run_matrix`-szal fut tovább (az állapot és
+    az utolsó lépés a szegmensek között megmarad), így a memória a
+    leghosszabb szegmenssel, nem a teljes sorozattal arányos.
+    """
+    if minutes is None:
+        minutes = np.arange(len(Z))
+    states: dict[int, tuple[np.ndarray, np.ndarray, Optional[int]]] = {}
+    pos = 0
+    for b in sorted(set(boundaries)):
+        if b > pos:
+            kf.run_matrix(Z[pos:b], progress_interval=0, minutes=minutes[pos:b])
+            pos = b
+        states[b] = (kf.x.copy(), kf.P.copy(), kf.last_step)
+    return states
+
+
+def _evaluate_fold(
+    task: _FoldTask,
+    config: Config,
+    horizons: list[int],
+    q_grid: Optional[list[float]],
+) -> list[dict[str, Any]]:
+    """Egy fold: refit a tanuló ablakon → melegindított szűrés és kiértékelés a teszten."""
+    fold = task.fold
+    base_minutes = min(config.tf_minutes.values())
+    sigma2_1m = _sigma2_1m(task.Z_train, base_minutes)
+
+    q = config.kalman.q
+    if q_grid:
+        # Rácspontonként egy melegindított szűrő a tanuló ablakon (a numba
+        # backenddel ez gyorsabb, mint a NumPy batch motor a teljes rácson)
+        loglik = []
+        for q_val in q_grid:
+            kf = _make_filter(config, q_val, sigma2_1m)
+            kf.set_state(*task.train_state)
+            arrays = kf.run_matrix(task.Z_train, progress_interval=0, minutes=task.minutes_train)
+            loglik.append(log_likelihood(arrays))
+        q = float(q_grid[int(np.argmax(loglik))])
+
+    kf = _make_filter(config, q, sigma2_1m)
+    kf.set_state(*task.test_state)
+    arrays = kf.run_matrix(task.Z_test, progress_interval=0, minutes=task.minutes_test)
+    predictions = compute_predictions(
+        arrays.to_states_df(task.index), horizons, h_mode=config.kalman.h_mode,
+    )
+
+    rows = []
+    for tau in horizons:
+        actual = task.actual[tau]
+        pred_df = predictions[tau]
+        rows.append({
+            "fold": fold.index,
+            "test_start": task.index[0],
+            "test_end": task.index[-1],
+            "horizon": tau,
+            "q": q,
+            "sigma2_1m": sigma2_1m,
+            **prediction_metrics(
+                pred_df["predicted"].to_numpy(),
+                actual,
+                pred_df["ci_lower"].to_numpy(),
+                pred_df["ci_upper"].to_numpy(),
+            ),
+        })
+    return rows
+
+
+def walk_forward(
+    df_1m: pd.DataFrame,
+    config: Config,
+    horizons: list[int],
+    folds: list[Fold],
+    q_grid: Optional[list[float]] = None,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Walk-forward kiértékelés a megadott foldokon.
+
+    Args:
+        df_1m: 1m OHLCV (close oszlop kell)
+        horizons: előrejelzési horizontok percben (tetszőleges lista)
+        folds: `make_folds` kimenete (sor pozíciók a df_1m-ben)
+        q_grid: foldonkénti q refit rácsa (None = a config q-ja marad)
+        max_workers: worker processzek száma (None = CPU-k száma)
+
+    Returns:
+        DataFrame, soronként egy (fold, horizont): fold, test_start, test_end,
+        horizon, q, sigma2_1m, n, rmse, mae, hit_rate, coverage
+    """
+    if not folds:
+        raise ValueError("Nincs fold — túl rövid az adat a tanuló + teszt ablakhoz")
+    horizons = sorted(set(int(h) for h in horizons))
+    returns = compute_log_returns(df_1m, config)
+    Z, tf_values = returns_to_matrix(returns, config.tf_minutes)
+    minutes = returns.minutes
+
+    # ── Melegindító állapotok: alap paraméterek, egyetlen szegmentált menet ──
+    first = folds[0]
+    sigma2_base = _sigma2_1m(Z[first.train_start:first.test_start], tf_values[0])
+    kf = _make_filter(config, config.kalman.q, sigma2_base)
+    states = boundary_states(
+        kf, Z, [b for f in folds for b in (f.train_start, f.test_start)], minutes,
+    )
+    logger.info(f"Walk-forward: {len(folds)} fold, horizontok: {horizons}, "
+                f"melegindító menet kész ({max(states)} lépés)")
+
+    # ── Fold feladatok ──────────────────────────────────────────────────────
+    log_price = np.log(df_1m["close"].to_numpy(dtype=float))
+    actual = {tau: forward_returns(minutes, log_price, tau) for tau in horizons}
+    tasks = [
+        _FoldTask(
+            fold=f,
+            index=returns.index[f.test_start:f.test_end],
+            Z_train=Z[f.train_start:f.test_start],
+            Z_test=Z[f.test_start:f.test_end],
+            minutes_train=minutes[f.train_start:f.test_start],
+            minutes_test=minutes[f.test_start:f.test_end],
+            actual={tau: a[f.test_start:f.test_end] for tau, a in actual.items()},
+            train_state=states[f.train_start],
+            test_state=states[f.test_start],
+        )
+        for f in folds
+    ]
+
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks)))
+    n = len(tasks)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(
+            _evaluate_fold, tasks, [config] * n, [horizons] * n, [q_grid] * n,
+        )
+        rows = [row for fold_rows in results for row in fold_rows]
+    return pd.DataFrame(rows)
+
+
+def summarize(metrics: pd.DataFrame) -> pd.DataFrame:
+    """
+    Horizontonkénti összesítés a foldokon át, mintaszámmal súlyozva
+    (RMSE: a négyzetes hibák súlyozott átlagának gyöke).
+    """
+    def agg(g: pd.DataFrame) -> pd.Series:
+        w = g["n"].to_numpy(dtype=float)
+        total = w.sum()
+        if total == 0:
+            return pd.Series({"folds": len(g), "n": 0, **{c: np.nan for c in METRIC_COLUMNS}})
+        return pd.Series({
+            "folds": len(g),
+            "n": int(total),
+            "rmse": float(np.sqrt(np.nansum(w * g["rmse"] ** 2) / total)),
+            **{c: float(np.nansum(w * g[c]) / total) for c in ("mae", "hit_rate", "coverage")},
+        })
+
+    table = metrics.groupby("horizon").apply(agg, include_groups=False)
+    return table.astype({"folds": int, "n": int})